@@ -0,0 +1,219 @@
+"""
+Load-test the WSGI (gunicorn) and ASGI (uvicorn) builds side by side.
+
+Starts both servers against DATABASE_URL, drives the same endpoints through
+each with a keep-alive asyncio HTTP client at a fixed concurrency and prints
+throughput and latency percentiles:
+
+    pip install -e ".[asgi]" gunicorn
+    python benchmarks/bench_asgi_vs_wsgi.py --concurrency 64 --duration 10
+
+Pass ``--wsgi-url`` / ``--asgi-url`` to measure servers that are already
+running instead. Only read endpoints are driven unless ``--writes`` is given;
+the write mix posts small receipts and equal issues against one existing
+item, so the stock level is unchanged but ledger rows are kept.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client; enough for JSON endpoints."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def request(self, method: str, path: str, body: bytes | None = None) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + (body or b""))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+        length, chunked, close = 0, False, False
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+        if chunked:
+            while size := int((await self.reader.readline()).strip(), 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        elif length:
+            await self.reader.readexactly(length)
+        if close:
+            await self.close()
+        return status
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+async def drive(base_url: str, requests: list[tuple[str, str, bytes | None]], concurrency: int, duration: float):
+    """Run ``concurrency`` workers cycling through ``requests`` for ``duration`` seconds."""
+    url = urlsplit(base_url)
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset: int) -> None:
+        nonlocal errors
+        conn = Connection(url.hostname, url.port or 80)
+        i = offset
+        while time.perf_counter() < deadline:
+            method, path, body = requests[i % len(requests)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                status = await conn.request(method, path, body)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                await conn.close()
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+        await conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": q[49] * 1000,
+        "p95_ms": q[94] * 1000,
+        "p99_ms": q[98] * 1000,
+    }
+
+
+def build_requests(base_url: str, writes: bool) -> dict[str, list[tuple[str, str, bytes | None]]]:
+    with urllib.request.urlopen(f"{base_url}/api/items?cursor=&limit=20") as resp:
+        items = json.load(resp)["items"]
+    if not items:
+        raise SystemExit("no items in the database; create some first")
+    ids = [i["id"] for i in items]
+    words = [i["name"][:3] for i in items]
+
+    scenarios = {
+        "GET /api/items/<id>": [("GET", f"/api/items/{i}", None) for i in ids],
+        "GET /api/stocks (page)": [("GET", "/api/stocks?cursor=&limit=50", None)],
+        "GET /api/transactions (page)": [("GET", "/api/transactions?cursor=&limit=50", None)],
+        "GET /api/items/<id>/transactions": [("GET", f"/api/items/{i}/transactions", None) for i in ids],
+        "GET /api/suggestions": [
+            ("GET", "/api/suggestions?q=" + urllib.request.quote(w), None) for w in words
+        ],
+    }
+    if writes:
+        receipt = json.dumps({"quantity": 1, "reason": "bench"}).encode()
+        issue = json.dumps({"quantity": 1, "reason": "bench"}).encode()
+        scenarios["POST receipts/issues"] = [
+            ("POST", f"/api/items/{ids[0]}/receipts", receipt),
+            ("POST", f"/api/items/{ids[0]}/issues", issue),
+        ]
+    return scenarios
+
+
+def wait_ready(base_url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/stocktakes", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"server at {base_url} did not start")
+
+
+@contextmanager
+def server(argv: list[str], base_url: str):
+    proc = subprocess.Popen(argv, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(base_url)
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per endpoint and server")
+    parser.add_argument("--workers", type=int, default=2, help="processes per server")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--wsgi-url", help="measure a running WSGI server instead of starting gunicorn")
+    parser.add_argument("--asgi-url", help="measure a running ASGI server instead of starting uvicorn")
+    parser.add_argument("--writes", action="store_true", help="include the receipt/issue write mix")
+    args = parser.parse_args()
+
+    targets = {
+        "wsgi": (
+            args.wsgi_url,
+            [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "--threads", str(args.threads),
+             "-b", "127.0.0.1:18001", "inventory_app.app:app"],
+            "http://127.0.0.1:18001",
+        ),
+        "asgi": (
+            args.asgi_url,
+            [sys.executable, "-m", "uvicorn", "--workers", str(args.workers), "--no-access-log",
+             "--host", "127.0.0.1", "--port", "18002", "inventory_app.asgi.app:app"],
+            "http://127.0.0.1:18002",
+        ),
+    }
+
+    results: dict[str, dict[str, dict]] = {}
+    for name, (url, argv, default_url) in targets.items():
+        if url:
+            ctx = contextmanager(lambda u=url: (yield u))()
+        else:
+            ctx = server(argv, default_url)
+        with ctx as base_url:
+            for label, reqs in build_requests(base_url, args.writes).items():
+                results.setdefault(label, {})[name] = asyncio.run(
+                    drive(base_url, reqs, args.concurrency, args.duration)
+                )
+
+    print(f"concurrency={args.concurrency} duration={args.duration}s workers={args.workers}")
+    print(f"{'endpoint':34} {'server':5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for label, by_server in results.items():
+        for name, r in by_server.items():
+            print(
+                f"{label:34} {name:5} {r['rps']:9.1f} {r['p50_ms']:8.2f} "
+                f"{r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {r['errors']:6d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
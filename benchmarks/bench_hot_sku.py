@@ -0,0 +1,117 @@
+"""
+Measure /issues throughput on one hot SKU with and without write coalescing.
+
+Creates a bench item, then starts gunicorn twice against DATABASE_URL: once
+as is (every request takes the stock row lock itself) and once with the item
+in HOT_ITEM_IDS, so concurrent requests are grouped into shared
+transactions. Each run drives ``--concurrency`` writers (default 50) posting
+issues of 1 to that item, then checks that stock never went negative and
+still matches the ledger:
+
+    pip install -e . gunicorn
+    python benchmarks/bench_hot_sku.py --concurrency 50 --duration 10
+
+With ``--initial`` below the number of requests the item runs out during
+the run; the extra issues must fail with 409 and stock must end at 0. The
+bench item and its ledger rows are deleted at the end.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from bench_asgi_vs_wsgi import drive, server
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, delete, select, text
+from sqlalchemy.orm import Session
+
+from inventory_app.db import get_database_url
+from inventory_app.models import Item, Stock
+from inventory_app.services.partitions import retained_since
+from inventory_app.services.reconciliation import discrepancy_query
+
+BASE_URL = "http://127.0.0.1:18003"
+
+
+def seed(engine):
+    with Session(engine) as s:
+        item = Item(sku="BENCH-HOT-SKU", name="Bench hot SKU", unit="pcs")
+        s.add(item)
+        s.flush()
+        s.add(Stock(item_id=item.id, quantity=0))
+        s.commit()
+        return item.id
+
+
+def reset(engine, item_id, quantity: float) -> None:
+    """Start each run from ``quantity`` on hand, backed by a single receipt."""
+    with Session(engine) as s:
+        s.execute(text("DELETE FROM inventory_transactions WHERE item_id = :id"), {"id": item_id})
+        s.execute(text("DELETE FROM item_daily_movements WHERE item_id = :id"), {"id": item_id})
+        s.execute(text("UPDATE stocks SET quantity = :q WHERE item_id = :id"), {"q": quantity, "id": item_id})
+        s.execute(
+            text(
+                "INSERT INTO inventory_transactions (item_id, delta_quantity, txn_type, reason) "
+                "VALUES (:id, :q, 'RECEIPT', 'bench')"
+            ),
+            {"q": quantity, "id": item_id},
+        )
+        s.commit()
+
+
+def check(engine, item_id) -> dict:
+    with Session(engine) as s:
+        quantity = float(s.execute(select(Stock.quantity).where(Stock.item_id == item_id)).scalar_one())
+        applied = s.execute(
+            text("SELECT count(*) FROM inventory_transactions WHERE item_id = :id AND txn_type = 'ISSUE'"),
+            {"id": item_id},
+        ).scalar_one()
+        drift = s.execute(discrepancy_query(floor=retained_since(s), item_ids=[item_id])).all()
+    return {"quantity": quantity, "applied": applied, "consistent": quantity >= 0 and not drift}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn processes")
+    parser.add_argument("--threads", type=int, default=50, help="gunicorn threads per process")
+    parser.add_argument("--initial", type=float, default=1_000_000, help="starting stock of the bench item")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(get_database_url())
+    item_id = seed(engine)
+    argv = [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "--threads", str(args.threads),
+            "-b", BASE_URL.removeprefix("http://"), "inventory_app.app:app"]
+    body = json.dumps({"quantity": 1, "reason": "bench"}).encode()
+    requests = [("POST", f"/api/items/{item_id}/issues", body)]
+
+    results = {}
+    try:
+        for mode, hot in (("row lock", ""), ("coalesced", str(item_id))):
+            reset(engine, item_id, args.initial)
+            os.environ["HOT_ITEM_IDS"] = hot
+            with server(argv, BASE_URL):
+                r = asyncio.run(drive(BASE_URL, requests, args.concurrency, args.duration))
+            results[mode] = r | check(engine, item_id)
+    finally:
+        os.environ.pop("HOT_ITEM_IDS", None)
+        with Session(engine) as s:
+            s.execute(delete(Item).where(Item.id == item_id))
+            s.commit()
+
+    print(f"concurrency={args.concurrency} duration={args.duration}s workers={args.workers} threads={args.threads}")
+    print(f"{'mode':10} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'applied':>8} {'failed':>6} {'stock':>10} ok")
+    for mode, r in results.items():
+        print(
+            f"{mode:10} {r['rps']:9.1f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+            f"{r['applied']:8d} {r['errors']:6d} {r['quantity']:10.0f} {'yes' if r['consistent'] else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Compare list endpoint serialization: ORM entities + Pydantic/hand-built dicts
+(the previous code path) against column projections + FastJSONProvider.
+
+Seeds synthetic items/stocks inside a transaction that is rolled back at the
+end, so it can be pointed at a development database:
+
+    python benchmarks/bench_list_serialization.py --rows 100000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import warnings
+
+from dotenv import load_dotenv
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from inventory_app.db import get_database_url
+from inventory_app.jsonprovider import FastJSONProvider, orjson
+from inventory_app.models import Item, Stock
+from inventory_app.routes.items import ITEM_COLUMNS
+from inventory_app.schemas.items import ItemOut
+
+
+def seed(session: Session, rows: int) -> None:
+    session.execute(
+        text(
+            "INSERT INTO items (sku, name, unit, category, manufacturer) "
+            "SELECT 'BENCH-' || g, 'Bench item ' || g, 'pcs', 'cat-' || (g % 50), 'maker-' || (g % 200) "
+            "FROM generate_series(1, :n) AS g"
+        ),
+        {"n": rows},
+    )
+    session.execute(
+        text(
+            "INSERT INTO stocks (item_id, quantity, shelf_location) "
+            "SELECT id, (random() * 1000)::numeric(14, 3), 'A-' || (random() * 100)::int "
+            "FROM items WHERE sku LIKE 'BENCH-%'"
+        )
+    )
+
+
+def items_before(session: Session, provider) -> tuple[int, str]:
+    q = session.execute(select(Item).order_by(Item.id.desc())).scalars().all()
+    return len(q), provider.dumps([ItemOut.from_orm(i).model_dump() for i in q])
+
+
+def items_after(session: Session, provider) -> tuple[int, str]:
+    rows = session.execute(select(*ITEM_COLUMNS).order_by(Item.id.desc())).all()
+    return len(rows), provider.dumps([r._asdict() for r in rows])
+
+
+def stocks_before(session: Session, provider) -> tuple[int, str]:
+    rows = session.execute(select(Stock, Item).join(Item, Item.id == Stock.item_id).order_by(Item.name.asc())).all()
+    data = [
+        {
+            "id": st.id,
+            "item_id": str(it.id),
+            "sku": it.sku,
+            "name": it.name,
+            "unit": it.unit,
+            "quantity": float(st.quantity or 0),
+            "shelf_location": st.shelf_location,
+            "shelf_location_note": st.shelf_location_note,
+            "updated_at": st.updated_at.isoformat() if st.updated_at else None,
+        }
+        for st, it in rows
+    ]
+    return len(data), provider.dumps(data)
+
+
+def stocks_after(session: Session, provider) -> tuple[int, str]:
+    rows = session.execute(
+        select(
+            Stock.id,
+            Stock.item_id,
+            Item.sku,
+            Item.name,
+            Item.unit,
+            Stock.quantity,
+            Stock.shelf_location,
+            Stock.shelf_location_note,
+            Stock.updated_at,
+        )
+        .join(Item, Item.id == Stock.item_id)
+        .order_by(Item.name.asc())
+    ).all()
+    return len(rows), provider.dumps([r._asdict() for r in rows])
+
+
+def measure(fn, session: Session, provider, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        rows, _ = fn(session, provider)
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # The "before" path deliberately keeps the deprecated ItemOut.from_orm call
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    load_dotenv()
+    app = Flask(__name__)
+    before_provider = DefaultJSONProvider(app)
+    after_provider = FastJSONProvider(app)
+
+    engine = create_engine(get_database_url())
+    with engine.connect() as conn:
+        trans = conn.begin()
+        session = Session(bind=conn)
+        try:
+            seed(session, args.rows)
+            print(f"rows seeded: {args.rows}  orjson: {'yes' if orjson else 'no'}")
+            for name, before, after in (
+                ("list_items", items_before, items_after),
+                ("list_stocks", stocks_before, stocks_after),
+            ):
+                t_before, n = measure(before, session, before_provider, args.repeat)
+                t_after, _ = measure(after, session, after_provider, args.repeat)
+                print(
+                    f"{name:12s} before {n / t_before:>12,.0f} rows/s   "
+                    f"after {n / t_after:>12,.0f} rows/s   x{t_before / t_after:.1f}"
+                )
+        finally:
+            session.close()
+            trans.rollback()
+
+
+if __name__ == "__main__":
+    main()
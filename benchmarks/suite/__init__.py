@@ -0,0 +1,14 @@
+"""
+Endpoint benchmark suite against a synthetic warehouse.
+
+    python -m benchmarks.suite generate --items 20000 --history-days 180 --ledger-rows 500000
+    python -m benchmarks.suite run --out benchmarks/baseline.json
+    python -m benchmarks.suite run --compare benchmarks/baseline.json --threshold 0.25
+
+``generate`` replaces the previous synthetic data (items with the ``BENCH-WH-``
+SKU prefix and ``bench`` stocktakes) in DATABASE_URL; point it at a
+dedicated database. ``run`` drives every scenario through the Flask test
+client, first one request at a time (latency and SQL statement counts),
+then from concurrent threads (throughput), and writes or compares a JSON
+baseline.
+"""
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import suite
+from benchmarks.suite.generator import WarehouseSpec, analyze, generate_warehouse, warehouse_size
+from benchmarks.suite.runner import DEFAULT_THRESHOLD, compare, run_suite
+from benchmarks.suite.scenarios import SCENARIOS, load_fixture
+
+
+def _session():
+    from inventory_app.db import SessionLocal, init_db
+
+    init_db()
+    return SessionLocal.session_factory()
+
+
+def generate(args: argparse.Namespace) -> int:
+    spec = WarehouseSpec(
+        items=args.items,
+        categories=args.categories,
+        ledger_rows=args.ledger_rows,
+        history_days=args.history_days,
+        stocktakes=args.stocktakes,
+        seed=args.seed,
+    )
+    start = time.perf_counter()
+    with _session() as session:
+        counts = generate_warehouse(session, spec)
+        session.commit()
+        analyze(session)
+        session.commit()
+    print(json.dumps(counts), f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def run(args: argparse.Namespace) -> int:
+    from inventory_app.app import create_app
+
+    app = create_app()
+    with _session() as session:
+        fixture = load_fixture(session)
+        dataset = warehouse_size(session)
+    scenarios = [s for s in SCENARIOS if not args.only or any(o in s.name for o in args.only)]
+    current = run_suite(
+        app, scenarios, fixture, dataset=dataset, iterations=args.iterations, warmup=args.warmup,
+        concurrency=args.concurrency, duration=args.duration,
+    )
+    if args.out:
+        Path(args.out).write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.out}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline["meta"].get("dataset") != dataset:
+            print(f"warning: baseline dataset {baseline['meta'].get('dataset')} differs from {dataset}")
+        regressions = compare(baseline, current, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.suite",
+        description=suite.__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="replace the synthetic warehouse in DATABASE_URL")
+    defaults = WarehouseSpec()
+    gen.add_argument("--items", type=int, default=defaults.items)
+    gen.add_argument("--categories", type=int, default=defaults.categories)
+    gen.add_argument("--ledger-rows", type=int, default=defaults.ledger_rows)
+    gen.add_argument("--history-days", type=int, default=defaults.history_days)
+    gen.add_argument("--stocktakes", type=int, default=defaults.stocktakes)
+    gen.add_argument("--seed", type=float, default=defaults.seed, help="Postgres setseed() value in [-1, 1]")
+    gen.set_defaults(func=generate)
+
+    bench = commands.add_parser("run", help="measure every scenario")
+    bench.add_argument("--iterations", type=int, default=50, help="sequential requests per scenario")
+    bench.add_argument("--warmup", type=int, default=5)
+    bench.add_argument("--concurrency", type=int, default=8, help="threads for the throughput pass (0 skips it)")
+    bench.add_argument("--duration", type=float, default=5.0, help="seconds per throughput pass")
+    bench.add_argument("--only", action="append", help="run scenarios whose name contains this (repeatable)")
+    bench.add_argument("--out", help="write the results to this JSON baseline")
+    bench.add_argument("--compare", help="fail if results regressed against this JSON baseline")
+    bench.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="allowed latency/throughput drift as a fraction (default 0.25)")
+    bench.set_defaults(func=run)
+
+    args = parser.parse_args(argv)
+    # slow-request and slow-query warnings would drown the output; Server-Timing is all we need
+    logging.getLogger("inventory_app").setLevel(logging.ERROR)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
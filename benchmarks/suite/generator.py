@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from inventory_app.models import Stocktake
+from inventory_app.services.partitions import ensure_ledger_partitions
+from inventory_app.services.stocktakes import generate_stocktake_lines
+
+SKU_PREFIX = "BENCH-WH-"
+STOCKTAKE_TITLE = "bench stocktake"
+# title and ledger reason of what `run` writes, kept out of warehouse_size()
+RUN_TAG = "bench run"
+LEDGER_REASONS = ("bench", "bench opening")
+WORDS = (
+    "bolt", "nut", "washer", "bearing", "gasket", "hinge", "bracket", "spring",
+    "valve", "fuse", "relay", "cable", "sensor", "filter", "clamp", "pulley",
+)
+
+
+class WarehouseSpec(NamedTuple):
+    """Size and shape of a synthetic warehouse."""
+    items: int = 10_000
+    categories: int = 40
+    ledger_rows: int = 200_000
+    history_days: int = 90
+    stocktakes: int = 3
+    seed: float = 0.42
+
+
+def clear_warehouse(session: Session) -> None:
+    """Delete a previously generated warehouse (the cascades take stocks, ledger and rollups)."""
+    session.execute(
+        text("DELETE FROM stocktakes WHERE title LIKE :t OR title LIKE :r"),
+        {"t": f"{STOCKTAKE_TITLE}%", "r": f"{RUN_TAG}%"},
+    )
+    session.execute(text("DELETE FROM items WHERE sku LIKE :p"), {"p": f"{SKU_PREFIX}%"})
+
+
+def generate_warehouse(session: Session, spec: WarehouseSpec) -> dict[str, int]:
+    """
+    Replace the synthetic warehouse with one shaped by ``spec``; every step is one set-based statement.
+
+    Ledger activity is skewed towards a few fast movers. Each item opens
+    with a receipt large enough that its running balance never goes
+    negative, and stocks are set to the ledger sum, so the data passes
+    `flask ledger reconcile`. Postgres' random() is seeded from
+    ``spec.seed``; item ids are still random.
+
+    Returns:
+        Row counts per table
+    """
+    clear_warehouse(session)
+    session.execute(text("SELECT setseed(:seed)"), {"seed": spec.seed})
+    ensure_ledger_partitions(session, months_back=spec.history_days // 28 + 1)
+
+    session.execute(
+        text(
+            "INSERT INTO items (sku, name, unit, category, manufacturer, usage) "
+            "SELECT :prefix || lpad(g::text, 7, '0'), "
+            "initcap((CAST(:words AS text[]))[1 + g % cardinality(CAST(:words AS text[]))]) "
+            "  || ' ' || (g % 97) || 'mm type ' || g, "
+            "'pcs', 'cat-' || lpad((g % :categories)::text, 3, '0'), 'maker-' || (g % 200), NULL "
+            "FROM generate_series(1, :items) AS g"
+        ),
+        {"prefix": SKU_PREFIX, "items": spec.items, "categories": spec.categories, "words": list(WORDS)},
+    )
+    session.execute(
+        text(
+            "INSERT INTO stocks (item_id, quantity, shelf_location) "
+            "SELECT id, 0, chr(65 + abs(hashtext(sku)) % 8) || '-' || lpad((abs(hashtext(sku)) % 40)::text, 2, '0') "
+            "FROM items WHERE sku LIKE :pattern"
+        ),
+        {"pattern": f"{SKU_PREFIX}%"},
+    )
+
+    # power(random(), 3) puts most movements on a few low-numbered items
+    session.execute(
+        text(
+            "INSERT INTO inventory_transactions (item_id, delta_quantity, txn_type, reason, created_at) "
+            "SELECT i.id, m.delta, m.txn_type, :reason, m.created_at "
+            "FROM ("
+            "  SELECT 1 + floor(power(random(), 3) * :items)::int AS n, r, "
+            "    now() - random() * make_interval(days => :days) AS created_at "
+            "  FROM (SELECT random() AS r FROM generate_series(1, :rows)) AS g"
+            ") AS pick "
+            "CROSS JOIN LATERAL (SELECT "
+            "  CASE WHEN pick.r < 0.55 THEN 'RECEIPT' WHEN pick.r < 0.95 THEN 'ISSUE' ELSE 'ADJUST' END AS txn_type, "
+            "  CASE WHEN pick.r < 0.55 THEN 1 + floor(random() * 20) "
+            "       WHEN pick.r < 0.95 THEN -(1 + floor(random() * 10)) "
+            "       ELSE (floor(random() * 7) - 3) END AS delta, "
+            "  pick.created_at"
+            ") AS m "
+            "JOIN items AS i ON i.sku = :prefix || lpad(pick.n::text, 7, '0') "
+            "WHERE m.delta <> 0"
+        ),
+        {
+            "prefix": SKU_PREFIX, "items": spec.items, "rows": spec.ledger_rows, "days": spec.history_days,
+            "reason": LEDGER_REASONS[0],
+        },
+    )
+    session.execute(
+        text(
+            "INSERT INTO inventory_transactions (item_id, delta_quantity, txn_type, reason, created_at) "
+            "SELECT i.id, coalesce(o.outflow, 0) + 1 + floor(random() * 100), 'RECEIPT', :reason, "
+            "  now() - make_interval(days => :days + 1) "
+            "FROM items AS i LEFT JOIN ("
+            "  SELECT item_id, -sum(delta_quantity) AS outflow FROM inventory_transactions "
+            "  WHERE delta_quantity < 0 GROUP BY item_id"
+            ") AS o ON o.item_id = i.id "
+            "WHERE i.sku LIKE :pattern"
+        ),
+        {"pattern": f"{SKU_PREFIX}%", "days": spec.history_days, "reason": LEDGER_REASONS[1]},
+    )
+    session.execute(
+        text(
+            "UPDATE stocks SET quantity = t.total, updated_at = now() "
+            "FROM (SELECT item_id, sum(delta_quantity) AS total FROM inventory_transactions GROUP BY item_id) AS t "
+            "JOIN items AS i ON i.id = t.item_id AND i.sku LIKE :pattern "
+            "WHERE stocks.item_id = t.item_id"
+        ),
+        {"pattern": f"{SKU_PREFIX}%"},
+    )
+
+    for n in range(spec.stocktakes):
+        stocktake = Stocktake(title=f"{STOCKTAKE_TITLE} {n + 1}")
+        session.add(stocktake)
+        session.flush()
+        generate_stocktake_lines(session, stocktake.id, category=f"cat-{n % spec.categories:03d}")
+        session.execute(
+            text(
+                "UPDATE stocktake_lines SET counted_quantity = greatest(expected_quantity + floor(random() * 5) - 2, 0) "
+                "WHERE stocktake_id = :id AND random() < 0.3"
+            ),
+            {"id": stocktake.id},
+        )
+
+    return warehouse_size(session)
+
+
+def warehouse_size(session: Session) -> dict[str, int]:
+    """Row counts of the generated warehouse (not what runs added), recorded with each baseline."""
+    row = session.execute(
+        text(
+            "SELECT "
+            "(SELECT count(*) FROM items WHERE sku LIKE :pattern) AS items, "
+            "(SELECT count(*) FROM inventory_transactions t JOIN items i ON i.id = t.item_id "
+            " WHERE i.sku LIKE :pattern AND t.reason IN (:reason, :opening)) AS ledger_rows, "
+            "(SELECT count(*) FROM stocktakes WHERE title LIKE :title) AS stocktakes, "
+            "(SELECT count(*) FROM stocktake_lines l JOIN stocktakes s ON s.id = l.stocktake_id "
+            " WHERE s.title LIKE :title) AS stocktake_lines"
+        ),
+        {"pattern": f"{SKU_PREFIX}%", "title": f"{STOCKTAKE_TITLE}%",
+         "reason": LEDGER_REASONS[0], "opening": LEDGER_REASONS[1]},
+    ).one()
+    return row._asdict()
+
+
+def analyze(session: Session) -> None:
+    """Refresh planner statistics after a bulk load (ANALYZE cannot run inside the load transaction)."""
+    for table in ("items", "stocks", "inventory_transactions", "item_daily_movements", "stocktake_lines"):
+        session.execute(text(f"ANALYZE {table}"))
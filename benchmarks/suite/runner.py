@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import platform
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+from flask import Flask
+
+from benchmarks.suite.scenarios import Fixture, Scenario
+
+STATEMENTS_RE = re.compile(r'desc="(\d+) statements"')
+# a result this much worse than the baseline is a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (which must not be empty)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def _latency_summary(latencies: list[float]) -> dict[str, float]:
+    if not latencies:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {f"p{p}_ms": round(percentile(latencies, p) * 1000, 3) for p in (50, 95, 99)}
+
+
+def measure_sequential(app: Flask, scenario: Scenario, fixture: Fixture, *, iterations: int, warmup: int,
+                       seed: int = 0) -> dict:
+    """
+    Time ``iterations`` requests one after another (after ``warmup`` untimed ones).
+
+    The statement count is the median of the counts reported in each
+    response's Server-Timing header.
+    """
+    client = app.test_client()
+    rng = random.Random(seed)
+    latencies: list[float] = []
+    statements: list[int] = []
+    errors = 0
+    for n in range(warmup + iterations):
+        req = scenario.build(client, fixture, rng)
+        start = time.perf_counter()
+        response = client.open(req.path, method=req.method, json=req.body, headers=req.headers)
+        elapsed = time.perf_counter() - start
+        if n < warmup:
+            continue
+        latencies.append(elapsed)
+        if response.status_code >= 400:
+            errors += 1
+        if match := STATEMENTS_RE.search(response.headers.get("Server-Timing", "")):
+            statements.append(int(match.group(1)))
+    return {
+        "requests": iterations,
+        "errors": errors,
+        **_latency_summary(latencies),
+        "statements": int(statistics.median(statements)) if statements else None,
+    }
+
+
+def measure_concurrent(app: Flask, scenario: Scenario, fixture: Fixture, *, concurrency: int, duration: float,
+                       seed: int = 0) -> dict:
+    """Drive the scenario from ``concurrency`` threads, each with its own test client, for ``duration`` seconds."""
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(n: int) -> None:
+        nonlocal errors
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + n)
+        mine: list[float] = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            req = scenario.build(client, fixture, rng)
+            start = time.perf_counter()
+            response = client.open(req.path, method=req.method, json=req.body, headers=req.headers)
+            mine.append(time.perf_counter() - start)
+            failed += response.status_code >= 400
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        **_latency_summary(latencies),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def run_suite(app: Flask, scenarios: list[Scenario], fixture: Fixture, *, dataset: dict, iterations: int,
+              warmup: int, concurrency: int, duration: float) -> dict:
+    """Measure every scenario and return the baseline document."""
+    results = {}
+    for scenario in scenarios:
+        result = {
+            "sequential": measure_sequential(app, scenario, fixture, iterations=iterations, warmup=warmup),
+        }
+        if scenario.concurrent and concurrency > 0:
+            result["concurrent"] = measure_concurrent(
+                app, scenario, fixture, concurrency=concurrency, duration=duration
+            )
+        results[scenario.name] = result
+        print(format_result(scenario.name, result), flush=True)
+    return {
+        "meta": {
+            "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "dataset": dataset,
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "duration": duration,
+        },
+        "results": results,
+    }
+
+
+def format_result(name: str, result: dict) -> str:
+    seq = result["sequential"]
+    line = (
+        f"{name:<28} p50 {seq['p50_ms']:8.2f} ms  p95 {seq['p95_ms']:8.2f} ms  "
+        f"p99 {seq['p99_ms']:8.2f} ms  {seq['statements'] if seq['statements'] is not None else '-':>4} stmts"
+    )
+    if conc := result.get("concurrent"):
+        line += f"  | {conc['rps']:8.1f} req/s  p95 {conc['p95_ms']:8.2f} ms"
+    errors = seq["errors"] + result.get("concurrent", {}).get("errors", 0)
+    if errors:
+        line += f"  ({errors} errors)"
+    return line
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    The regressions of ``current`` against ``baseline``.
+
+    A scenario regresses when its sequential p50 or p95 latency grows, or
+    its concurrent throughput falls, by more than ``threshold`` (a
+    fraction), when it executes more SQL statements than before, or when it
+    starts returning errors. Scenarios missing from either side are skipped.
+    """
+    regressions = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        seq, base_seq = cur["sequential"], base["sequential"]
+        for key in ("p50_ms", "p95_ms"):
+            if base_seq[key] > 0 and seq[key] > base_seq[key] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {key} {base_seq[key]:.2f} -> {seq[key]:.2f} "
+                    f"(+{seq[key] / base_seq[key] - 1:.0%})"
+                )
+        if None not in (seq["statements"], base_seq["statements"]) and seq["statements"] > base_seq["statements"]:
+            regressions.append(f"{name}: statements {base_seq['statements']} -> {seq['statements']}")
+        conc, base_conc = cur.get("concurrent"), base.get("concurrent")
+        if conc and base_conc and base_conc["rps"] > 0 and conc["rps"] < base_conc["rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {base_conc['rps']:.1f} -> {conc['rps']:.1f} req/s "
+                f"({conc['rps'] / base_conc['rps'] - 1:.0%})"
+            )
+        errors = seq["errors"] + (conc or {}).get("errors", 0)
+        base_errors = base_seq["errors"] + (base_conc or {}).get("errors", 0)
+        if errors and not base_errors:
+            regressions.append(f"{name}: {errors} error responses (baseline had none)")
+    return regressions
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any, NamedTuple
+
+from flask.testing import FlaskClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from benchmarks.suite.generator import RUN_TAG, SKU_PREFIX, STOCKTAKE_TITLE, WORDS
+
+
+class Fixture(NamedTuple):
+    """Ids sampled from the generated warehouse that scenarios pick from."""
+    item_ids: list[str]
+    hot_item_ids: list[str]
+    categories: list[str]
+    stocktake_ids: list[str]
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    body: Any = None
+    headers: dict[str, str] | None = None
+
+
+class Scenario(NamedTuple):
+    """
+    One endpoint under test.
+
+    ``build`` returns the request to time; it may issue untimed setup
+    requests of its own through the client it is given. Scenarios that are
+    not ``concurrent`` are only measured one request at a time.
+    """
+    name: str
+    build: Callable[[FlaskClient, Fixture, random.Random], Request]
+    concurrent: bool = True
+
+
+def load_fixture(session: Session, sample: int = 500) -> Fixture:
+    """
+    Sample the ids scenarios use from the generated warehouse.
+
+    Raises:
+        RuntimeError: If no synthetic warehouse has been generated
+    """
+    pattern = {"pattern": f"{SKU_PREFIX}%"}
+    item_ids = session.execute(
+        text("SELECT id::text FROM items WHERE sku LIKE :pattern ORDER BY random() LIMIT :n"),
+        {**pattern, "n": sample},
+    ).scalars().all()
+    if not item_ids:
+        raise RuntimeError("no synthetic warehouse found; run `python -m benchmarks.suite generate` first")
+    # the generator skews ledger activity towards the lowest-numbered SKUs
+    hot_item_ids = session.execute(
+        text("SELECT id::text FROM items WHERE sku LIKE :pattern ORDER BY sku LIMIT 20"), pattern
+    ).scalars().all()
+    categories = session.execute(
+        text("SELECT DISTINCT category FROM items WHERE sku LIKE :pattern ORDER BY category"), pattern
+    ).scalars().all()
+    stocktake_ids = session.execute(
+        text("SELECT id::text FROM stocktakes WHERE title LIKE :title ORDER BY title"),
+        {"title": f"{STOCKTAKE_TITLE}%"},
+    ).scalars().all()
+    return Fixture(list(item_ids), list(hot_item_ids), list(categories), list(stocktake_ids))
+
+
+def _get(path: str) -> Callable[[FlaskClient, Fixture, random.Random], Request]:
+    """A GET whose path is formatted with ``item_id``, ``category`` and ``stocktake_id`` picks."""
+    def build(client: FlaskClient, fx: Fixture, rng: random.Random) -> Request:
+        return Request("GET", path.format(
+            item_id=rng.choice(fx.item_ids),
+            hot_item_id=rng.choice(fx.hot_item_ids),
+            category=rng.choice(fx.categories),
+            stocktake_id=rng.choice(fx.stocktake_ids) if fx.stocktake_ids else "",
+            word=rng.choice(WORDS)[: rng.randint(2, 5)],
+            since=(datetime.now(UTC) - timedelta(days=7)).strftime("%Y-%m-%dT%H:%M:%S"),
+        ))
+    return build
+
+
+def _revalidate(path: str) -> Callable[[FlaskClient, Fixture, random.Random], Request]:
+    """A conditional GET of ``path`` with the ETag of an untimed first GET (answered 304)."""
+    def build(client: FlaskClient, fx: Fixture, rng: random.Random) -> Request:
+        etag = client.get(path).headers["ETag"]
+        return Request("GET", path, headers={"If-None-Match": etag})
+    return build
+
+
+def _receipt_or_issue(client: FlaskClient, fx: Fixture, rng: random.Random) -> Request:
+    # alternate receipts and issues of 1 so stock levels stay where the generator left them
+    kind = rng.choice(("receipts", "issues"))
+    return Request("POST", f"/api/items/{rng.choice(fx.item_ids)}/{kind}", {"quantity": 1, "reason": RUN_TAG})
+
+
+def _batch(client: FlaskClient, fx: Fixture, rng: random.Random) -> Request:
+    lines = []
+    for item_id in rng.sample(fx.item_ids, 20):
+        lines.append({"item_id": item_id, "txn_type": "RECEIPT", "delta": 1, "reason": RUN_TAG})
+        lines.append({"item_id": item_id, "txn_type": "ISSUE", "delta": -1, "reason": RUN_TAG})
+    return Request("POST", "/api/transactions/batch", {"lines": lines})
+
+
+def _confirm_stocktake(client: FlaskClient, fx: Fixture, rng: random.Random) -> Request:
+    category = rng.choice(fx.categories)
+    created = client.post("/api/stocktakes", json={"title": f"{RUN_TAG} confirm", "category": category})
+    stocktake_id = created.get_json()["id"]
+    lines = client.get(f"/api/stocktakes/{stocktake_id}").get_json()["lines"]
+    for line in rng.sample(lines, min(5, len(lines))):
+        counted = max(float(line["expected_quantity"]) + rng.choice((-1, 1)), 0)
+        client.patch(f"/api/stocktakes/lines/{line['id']}", json={"counted_quantity": counted})
+    return Request("POST", f"/api/stocktakes/{stocktake_id}/confirm")
+
+
+SCENARIOS: tuple[Scenario, ...] = (
+    Scenario("items.list", _get("/api/items?category={category}")),
+    Scenario("items.page", _get("/api/items?cursor=&limit=50")),
+    Scenario("items.detail", _get("/api/items/{item_id}")),
+    Scenario("items.transactions", _get("/api/items/{hot_item_id}/transactions?limit=20")),
+    Scenario("stocks.list", _get("/api/stocks?category={category}")),
+    Scenario("stocks.page", _get("/api/stocks?cursor=&limit=50")),
+    Scenario("stocks.not_modified", _revalidate("/api/stocks")),
+    Scenario("stocks.low", _get("/api/stocks?cursor=&max_quantity=50&sort=quantity&limit=50")),
+    Scenario("transactions.page", _get("/api/transactions?cursor=&limit=50")),
+    Scenario("transactions.since", _get("/api/transactions?cursor=&since={since}&limit=50")),
+    Scenario("suggestions", _get("/api/suggestions?q={word}")),
+    Scenario("reports.movements", _get("/api/reports/movements?group_by=category&days=30")),
+    Scenario("reports.stock_by_category", _get("/api/reports/stock-by-category")),
+    Scenario("stocks.as_of", _get("/api/items/{hot_item_id}/stock-as-of?at={since}")),
+    Scenario("stocktakes.detail", _get("/api/stocktakes/{stocktake_id}")),
+    Scenario("transactions.post", _receipt_or_issue),
+    Scenario("transactions.batch", _batch),
+    Scenario("stocktakes.confirm", _confirm_stocktake, concurrent=False),
+)
@@ -0,0 +1,40 @@
+"""add_ledger_keyset_indexes
+
+Revision ID: 127696c52196
+Revises: 207aaed68472
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '127696c52196'
+down_revision = '207aaed68472'
+branch_label = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keyset index for the global ledger: ORDER BY created_at DESC, id DESC
+    op.create_index(
+        'ix_inventory_transactions_created_at_id',
+        'inventory_transactions',
+        [sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+
+    # Per-item ledger, newest first, with id as tie-breaker.
+    # Supersedes ix_inventory_transactions_item_id_created_at.
+    op.create_index(
+        'ix_inventory_transactions_item_id_created_at_desc',
+        'inventory_transactions',
+        ['item_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    op.drop_index('ix_inventory_transactions_item_id_created_at', table_name='inventory_transactions')
+
+
+def downgrade() -> None:
+    op.create_index('ix_inventory_transactions_item_id_created_at', 'inventory_transactions', ['item_id', 'created_at'])
+    op.drop_index('ix_inventory_transactions_item_id_created_at_desc', table_name='inventory_transactions')
+    op.drop_index('ix_inventory_transactions_created_at_id', table_name='inventory_transactions')
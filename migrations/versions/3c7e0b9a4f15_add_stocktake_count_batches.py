@@ -0,0 +1,37 @@
+"""add_stocktake_count_batches
+
+Revision ID: 3c7e0b9a4f15
+Revises: d6f3a8b1c254
+Create Date: 2026-10-18 19:02:41.538114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7e0b9a4f15'
+down_revision = 'd6f3a8b1c254'
+branch_label = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('stocktake_lines', sa.Column('counted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_table(
+        'stocktake_count_batches',
+        sa.Column('stocktake_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('device_id', sa.String(length=100), nullable=False),
+        sa.Column('sequence', sa.BigInteger(), nullable=False),
+        sa.Column('applied', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rejected', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['stocktake_id'], ['stocktakes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('stocktake_id', 'device_id', 'sequence'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('stocktake_count_batches')
+    op.drop_column('stocktake_lines', 'counted_at')
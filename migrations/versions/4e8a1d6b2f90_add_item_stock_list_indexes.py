@@ -0,0 +1,52 @@
+"""add_item_stock_list_indexes
+
+Revision ID: 4e8a1d6b2f90
+Revises: 9b0f3c2d7e41
+Create Date: 2026-10-18 11:40:08.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8a1d6b2f90'
+down_revision = '9b0f3c2d7e41'
+branch_label = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # /api/items keyset sorts and filters
+    op.create_index('ix_items_name_id', 'items', ['name', 'id'])
+    op.create_index('ix_items_created_at_id', 'items', ['created_at', 'id'])
+    op.create_index('ix_items_updated_at_id', 'items', ['updated_at', 'id'])
+    op.create_index('ix_items_category_name_id', 'items', ['category', 'name', 'id'])
+    op.create_index('ix_items_manufacturer_name_id', 'items', ['manufacturer', 'name', 'id'])
+
+    # /api/stocks keyset sorts and filters
+    op.create_index('ix_stocks_quantity_id', 'stocks', ['quantity', 'id'])
+    op.create_index('ix_stocks_updated_at_id', 'stocks', ['updated_at', 'id'])
+    op.create_index(
+        'ix_stocks_shelf_location_sort',
+        'stocks',
+        [sa.text("coalesce(shelf_location, '')"), 'id'],
+    )
+    op.create_index(
+        'ix_stocks_shelf_location_prefix',
+        'stocks',
+        [sa.text('shelf_location text_pattern_ops')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stocks_shelf_location_prefix', table_name='stocks')
+    op.drop_index('ix_stocks_shelf_location_sort', table_name='stocks')
+    op.drop_index('ix_stocks_updated_at_id', table_name='stocks')
+    op.drop_index('ix_stocks_quantity_id', table_name='stocks')
+
+    op.drop_index('ix_items_manufacturer_name_id', table_name='items')
+    op.drop_index('ix_items_category_name_id', table_name='items')
+    op.drop_index('ix_items_updated_at_id', table_name='items')
+    op.drop_index('ix_items_created_at_id', table_name='items')
+    op.drop_index('ix_items_name_id', table_name='items')
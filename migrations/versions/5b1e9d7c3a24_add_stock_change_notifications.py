@@ -0,0 +1,77 @@
+"""add_stock_change_notifications
+
+Revision ID: 5b1e9d7c3a24
+Revises: 8d2f6c1e0a93
+Create Date: 2026-10-18 21:06:37.118420
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5b1e9d7c3a24'
+down_revision = '8d2f6c1e0a93'
+branch_label = None
+depends_on = None
+
+# Stamps a stock row with the id of the transaction that last changed what the
+# stock change stream sends (quantity or shelf location). The stream delivers a
+# row once every transaction with a lower id has finished, so the stamp doubles
+# as a resume token.
+STAMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION stamp_stock_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT'
+       OR (NEW.quantity, NEW.shelf_location, NEW.shelf_location_note)
+          IS DISTINCT FROM (OLD.quantity, OLD.shelf_location, OLD.shelf_location_note) THEN
+        NEW.change_xid := pg_current_xact_id();
+    END IF;
+    RETURN NEW;
+END
+$$;
+"""
+
+# One notification per statement that stamped a row; NOTIFY is delivered on
+# commit, and identical payloads within a transaction are sent once.
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_stock_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM changed_stocks WHERE change_xid = pg_current_xact_id()) THEN
+        PERFORM pg_notify('stock_changes', pg_current_xact_id()::text);
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    # xid8 has no SQLAlchemy type; it is compared as text casts in the app
+    op.execute('ALTER TABLE stocks ADD COLUMN change_xid xid8')
+    op.create_index('ix_stocks_change_xid', 'stocks', ['change_xid'])
+
+    op.execute(STAMP_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER stocks_stamp_change BEFORE INSERT OR UPDATE ON stocks '
+        'FOR EACH ROW EXECUTE FUNCTION stamp_stock_change();'
+    )
+    op.execute(NOTIFY_FUNCTION)
+    # Transition tables need one trigger per event
+    for event in ('INSERT', 'UPDATE'):
+        op.execute(
+            f'CREATE TRIGGER stocks_notify_{event.lower()} '
+            f'AFTER {event} ON stocks '
+            f'REFERENCING NEW TABLE AS changed_stocks '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION notify_stock_changes();'
+        )
+
+
+def downgrade() -> None:
+    for event in ('insert', 'update'):
+        op.execute(f'DROP TRIGGER IF EXISTS stocks_notify_{event} ON stocks;')
+    op.execute('DROP FUNCTION IF EXISTS notify_stock_changes();')
+    op.execute('DROP TRIGGER IF EXISTS stocks_stamp_change ON stocks;')
+    op.execute('DROP FUNCTION IF EXISTS stamp_stock_change();')
+    op.drop_index('ix_stocks_change_xid', table_name='stocks')
+    op.drop_column('stocks', 'change_xid')
@@ -0,0 +1,63 @@
+"""add_stock_checkpoints
+
+Revision ID: 5b8f0c3e1d72
+Revises: e7d24b6a9c51
+Create Date: 2026-10-18 15:10:27.335902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8f0c3e1d72'
+down_revision = 'e7d24b6a9c51'
+branch_label = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_checkpoints',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('items_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('taken_at'),
+    )
+    # Only non-zero quantities are stored; a missing line means 0
+    op.create_table(
+        'stock_checkpoint_lines',
+        sa.Column('checkpoint_id', sa.BigInteger(), nullable=False),
+        sa.Column('item_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('quantity', sa.Numeric(precision=14, scale=3), nullable=False),
+        sa.ForeignKeyConstraint(['checkpoint_id'], ['stock_checkpoints.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('checkpoint_id', 'item_id'),
+    )
+    op.create_index('ix_stock_checkpoint_lines_item_id', 'stock_checkpoint_lines', ['item_id'])
+
+    # A checkpoint holds SHARE on stocks while it copies quantities. Every ledger
+    # writer must hold ROW EXCLUSIVE on stocks before its rows are stamped, so a
+    # writer is either fully before the checkpoint or stamped after it; now()
+    # would stamp the transaction start instead, which can precede the checkpoint.
+    op.execute('ALTER TABLE inventory_transactions ALTER COLUMN created_at SET DEFAULT clock_timestamp();')
+    op.execute(
+        'CREATE OR REPLACE FUNCTION lock_stocks_for_ledger() RETURNS trigger '
+        'LANGUAGE plpgsql AS $$ BEGIN LOCK TABLE stocks IN ROW EXCLUSIVE MODE; RETURN NULL; END $$;'
+    )
+    op.execute(
+        'CREATE TRIGGER inventory_transactions_lock_stocks '
+        'BEFORE INSERT ON inventory_transactions '
+        'FOR EACH STATEMENT EXECUTE FUNCTION lock_stocks_for_ledger();'
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS inventory_transactions_lock_stocks ON inventory_transactions;')
+    op.execute('DROP FUNCTION IF EXISTS lock_stocks_for_ledger();')
+    op.execute('ALTER TABLE inventory_transactions ALTER COLUMN created_at SET DEFAULT now();')
+    op.drop_index('ix_stock_checkpoint_lines_item_id', table_name='stock_checkpoint_lines')
+    op.drop_table('stock_checkpoint_lines')
+    op.drop_table('stock_checkpoints')
@@ -0,0 +1,109 @@
+"""add_stocktake_counters
+
+Revision ID: 8d2f6c1e0a93
+Revises: 3c7e0b9a4f15
+Create Date: 2026-10-18 19:48:12.604291
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f6c1e0a93'
+down_revision = '3c7e0b9a4f15'
+branch_label = None
+depends_on = None
+
+# Per-stocktake aggregates of one statement's line rows, signed +1 / -1
+COUNTER_DELTAS = """
+    SELECT stocktake_id,
+           sum(sign) AS lines,
+           sum(sign) FILTER (WHERE counted_quantity <> expected_quantity) AS diffs,
+           sum(sign) FILTER (WHERE counted_at IS NOT NULL) AS counted,
+           sum(sign * (counted_quantity - expected_quantity)) AS variance
+    FROM ({rows}) AS r
+    GROUP BY stocktake_id
+"""
+APPLY_DELTAS = """
+        UPDATE stocktakes AS s
+        SET lines_count = s.lines_count + d.lines,
+            diff_count = s.diff_count + coalesce(d.diffs, 0),
+            counted_count = s.counted_count + coalesce(d.counted, 0),
+            variance_total = s.variance_total + d.variance
+        FROM ({deltas}) AS d
+        WHERE s.id = d.stocktake_id
+          AND (d.lines, coalesce(d.diffs, 0), coalesce(d.counted, 0), d.variance) <> (0, 0, 0, 0);
+"""
+LINE_COLUMNS = "stocktake_id, counted_quantity, expected_quantity, counted_at"
+NEW_ROWS = f"SELECT {LINE_COLUMNS}, 1 AS sign FROM new_lines"
+OLD_ROWS = f"SELECT {LINE_COLUMNS}, -1 AS sign FROM old_lines"
+
+# Keeps the stocktakes counters in step with every statement on stocktake_lines.
+# A note-only update leaves the stocktake row alone (all deltas are zero).
+COUNTER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION maintain_stocktake_counters() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+{APPLY_DELTAS.format(deltas=COUNTER_DELTAS.format(rows=NEW_ROWS))}
+    ELSIF TG_OP = 'UPDATE' THEN
+{APPLY_DELTAS.format(deltas=COUNTER_DELTAS.format(rows=NEW_ROWS + " UNION ALL " + OLD_ROWS))}
+    ELSE
+{APPLY_DELTAS.format(deltas=COUNTER_DELTAS.format(rows=OLD_ROWS))}
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    op.add_column('stocktakes', sa.Column('lines_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('stocktakes', sa.Column('diff_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('stocktakes', sa.Column('counted_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column(
+        'stocktakes',
+        sa.Column('variance_total', sa.Numeric(precision=14, scale=3), server_default='0', nullable=False),
+    )
+
+    op.execute(COUNTER_FUNCTION)
+    # Transition tables need one trigger per event
+    for event, referencing in (
+        ('INSERT', 'NEW TABLE AS new_lines'),
+        ('UPDATE', 'NEW TABLE AS new_lines OLD TABLE AS old_lines'),
+        ('DELETE', 'OLD TABLE AS old_lines'),
+    ):
+        op.execute(
+            f'CREATE TRIGGER stocktake_lines_counters_{event.lower()} '
+            f'AFTER {event} ON stocktake_lines '
+            f'REFERENCING {referencing} '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION maintain_stocktake_counters();'
+        )
+
+    # Backfill from the existing lines
+    op.execute(
+        'UPDATE stocktakes AS s SET lines_count = d.lines, diff_count = coalesce(d.diffs, 0), '
+        'counted_count = coalesce(d.counted, 0), variance_total = d.variance '
+        f'FROM ({COUNTER_DELTAS.format(rows=f"SELECT {LINE_COLUMNS}, 1 AS sign FROM stocktake_lines")}) AS d '
+        'WHERE s.id = d.stocktake_id;'
+    )
+
+    # Diff-only line pages
+    op.create_index(
+        'ix_stocktake_lines_diff',
+        'stocktake_lines',
+        ['stocktake_id', 'id'],
+        postgresql_where=sa.text('counted_quantity <> expected_quantity'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stocktake_lines_diff', table_name='stocktake_lines')
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f'DROP TRIGGER IF EXISTS stocktake_lines_counters_{event} ON stocktake_lines;')
+    op.execute('DROP FUNCTION IF EXISTS maintain_stocktake_counters();')
+    op.drop_column('stocktakes', 'variance_total')
+    op.drop_column('stocktakes', 'counted_count')
+    op.drop_column('stocktakes', 'diff_count')
+    op.drop_column('stocktakes', 'lines_count')
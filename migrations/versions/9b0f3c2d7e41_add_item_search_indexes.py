@@ -0,0 +1,55 @@
+"""add_item_search_indexes
+
+Revision ID: 9b0f3c2d7e41
+Revises: 127696c52196
+Create Date: 2026-10-18 10:02:17.554930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b0f3c2d7e41'
+down_revision = '127696c52196'
+branch_label = None
+depends_on = None
+
+# Katakana (ァ..ヶ) -> hiragana (ぁ..ゖ); mirrors services/search.normalize_search_text
+KATAKANA = ''.join(chr(c) for c in range(0x30A1, 0x30F7))
+HIRAGANA = ''.join(chr(c) for c in range(0x3041, 0x3097))
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+
+    # NFKC folds full-width/half-width forms; translate() folds katakana onto hiragana
+    op.execute(
+        "CREATE OR REPLACE FUNCTION search_normalize(value text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ "
+        f"SELECT lower(translate(normalize(value, NFKC), '{KATAKANA}', '{HIRAGANA}')) "
+        "$$;"
+    )
+
+    for column in ('name', 'sku', 'manufacturer'):
+        op.create_index(
+            f'ix_items_{column}_search_trgm',
+            'items',
+            [sa.text(f'search_normalize({column}) gin_trgm_ops')],
+            postgresql_using='gin',
+        )
+
+    # Exact SKU prefix lookups (LIKE 'abc%')
+    op.create_index(
+        'ix_items_sku_search_prefix',
+        'items',
+        [sa.text('search_normalize(sku) text_pattern_ops')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_items_sku_search_prefix', table_name='items')
+    for column in ('manufacturer', 'sku', 'name'):
+        op.drop_index(f'ix_items_{column}_search_trgm', table_name='items')
+    op.execute('DROP FUNCTION IF EXISTS search_normalize(text);')
+    op.execute('DROP EXTENSION IF EXISTS pg_trgm;')
@@ -0,0 +1,37 @@
+"""cover_ledger_item_index
+
+Revision ID: a41c7e9d3b08
+Revises: 5b8f0c3e1d72
+Create Date: 2026-10-18 16:02:51.774013
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c7e9d3b08'
+down_revision = '5b8f0c3e1d72'
+branch_label = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Same keys as ix_inventory_transactions_item_id_created_at_desc, plus the
+    # delta so per-item sums (reconciliation, as-of) are index-only scans.
+    op.create_index(
+        'ix_inventory_transactions_item_id_created_at_cover',
+        'inventory_transactions',
+        ['item_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        postgresql_include=['delta_quantity'],
+    )
+    op.drop_index('ix_inventory_transactions_item_id_created_at_desc', table_name='inventory_transactions')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_inventory_transactions_item_id_created_at_desc',
+        'inventory_transactions',
+        ['item_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    op.drop_index('ix_inventory_transactions_item_id_created_at_cover', table_name='inventory_transactions')
@@ -0,0 +1,156 @@
+"""add_change_validators
+
+Revision ID: a4c8e2f6b103
+Revises: 5b1e9d7c3a24
+Create Date: 2026-10-18 22:41:09.530176
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f6b103'
+down_revision = '5b1e9d7c3a24'
+branch_label = None
+depends_on = None
+
+# Every item write stamps the row with its transaction id; max(change_xid) is
+# then an index-only probe that moves whenever a committed write lands.
+ITEM_STAMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION stamp_item_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id();
+    RETURN NEW;
+END
+$$;
+"""
+
+# Stamped stock changes also bump updated_at, whichever path wrote them
+STOCK_STAMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION stamp_stock_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT'
+       OR (NEW.quantity, NEW.shelf_location, NEW.shelf_location_note)
+          IS DISTINCT FROM (OLD.quantity, OLD.shelf_location, OLD.shelf_location_note) THEN
+        NEW.change_xid := pg_current_xact_id();
+        NEW.updated_at := now();
+    END IF;
+    RETURN NEW;
+END
+$$;
+"""
+PREVIOUS_STOCK_STAMP_FUNCTION = STOCK_STAMP_FUNCTION.replace("        NEW.updated_at := now();\n", "")
+
+# Deletes leave no stamp behind, so they are counted per table
+DELETION_FUNCTION = """
+CREATE OR REPLACE FUNCTION count_table_deletions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO table_deletions (table_name, deleted)
+    SELECT TG_TABLE_NAME, count(*) FROM deleted_rows HAVING count(*) > 0
+    ON CONFLICT (table_name) DO UPDATE SET deleted = table_deletions.deleted + EXCLUDED.deleted;
+    RETURN NULL;
+END
+$$;
+"""
+
+# maintain_stocktake_counters() now touches the stocktake row on every line
+# statement (note-only and recount updates included), so the row's xmin and
+# updated_at version the whole stocktake detail.
+COUNTER_DELTAS = """
+    SELECT stocktake_id,
+           sum(sign) AS lines,
+           sum(sign) FILTER (WHERE counted_quantity <> expected_quantity) AS diffs,
+           sum(sign) FILTER (WHERE counted_at IS NOT NULL) AS counted,
+           sum(sign * (counted_quantity - expected_quantity)) AS variance
+    FROM ({rows}) AS r
+    GROUP BY stocktake_id
+"""
+APPLY_DELTAS = """
+        UPDATE stocktakes AS s
+        SET lines_count = s.lines_count + d.lines,
+            diff_count = s.diff_count + coalesce(d.diffs, 0),
+            counted_count = s.counted_count + coalesce(d.counted, 0),
+            variance_total = s.variance_total + d.variance{extra}
+        FROM ({deltas}) AS d
+        WHERE s.id = d.stocktake_id{condition};
+"""
+LINE_COLUMNS = "stocktake_id, counted_quantity, expected_quantity, counted_at"
+NEW_ROWS = f"SELECT {LINE_COLUMNS}, 1 AS sign FROM new_lines"
+OLD_ROWS = f"SELECT {LINE_COLUMNS}, -1 AS sign FROM old_lines"
+
+
+def counter_function(extra: str = "", condition: str = "") -> str:
+    def apply(rows: str) -> str:
+        return APPLY_DELTAS.format(extra=extra, condition=condition, deltas=COUNTER_DELTAS.format(rows=rows))
+
+    return f"""
+CREATE OR REPLACE FUNCTION maintain_stocktake_counters() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+{apply(NEW_ROWS)}
+    ELSIF TG_OP = 'UPDATE' THEN
+{apply(NEW_ROWS + " UNION ALL " + OLD_ROWS)}
+    ELSE
+{apply(OLD_ROWS)}
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    # xid8 has no SQLAlchemy type, like stocks.change_xid
+    op.execute('ALTER TABLE items ADD COLUMN change_xid xid8')
+    op.create_index('ix_items_change_xid', 'items', ['change_xid'])
+    op.execute(ITEM_STAMP_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER items_stamp_change BEFORE INSERT OR UPDATE ON items '
+        'FOR EACH ROW EXECUTE FUNCTION stamp_item_change();'
+    )
+    op.execute(STOCK_STAMP_FUNCTION)
+
+    op.create_table(
+        'table_deletions',
+        sa.Column('table_name', sa.Text(), nullable=False),
+        sa.Column('deleted', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('table_name'),
+    )
+    op.execute(DELETION_FUNCTION)
+    for table in ('items', 'stocks'):
+        op.execute(
+            f'CREATE TRIGGER {table}_count_deletions AFTER DELETE ON {table} '
+            f'REFERENCING OLD TABLE AS deleted_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION count_table_deletions();'
+        )
+
+    op.add_column(
+        'stocktakes',
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+    op.execute(counter_function(extra=",\n            updated_at = now()"))
+
+
+def downgrade() -> None:
+    # back to skipping statements that leave the counters as they are
+    op.execute(counter_function(condition=(
+        "\n          AND (d.lines, coalesce(d.diffs, 0), coalesce(d.counted, 0), d.variance)"
+        " <> (0, 0, 0, 0)"
+    )))
+    op.drop_column('stocktakes', 'updated_at')
+
+    for table in ('items', 'stocks'):
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_count_deletions ON {table};')
+    op.execute('DROP FUNCTION IF EXISTS count_table_deletions();')
+    op.drop_table('table_deletions')
+
+    op.execute(PREVIOUS_STOCK_STAMP_FUNCTION)
+    op.execute('DROP TRIGGER IF EXISTS items_stamp_change ON items;')
+    op.execute('DROP FUNCTION IF EXISTS stamp_item_change();')
+    op.drop_index('ix_items_change_xid', table_name='items')
+    op.drop_column('items', 'change_xid')
@@ -0,0 +1,87 @@
+"""add_item_daily_movements
+
+Revision ID: c3a9e5f17b20
+Revises: 4e8a1d6b2f90
+Create Date: 2026-10-18 13:05:41.218334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9e5f17b20'
+down_revision = '4e8a1d6b2f90'
+branch_label = None
+depends_on = None
+
+# Rolls one ledger statement's rows into item_daily_movements. Must stay in
+# sync with services/reports.rebuild_daily_movements.
+ROLLUP_FUNCTION = """
+CREATE OR REPLACE FUNCTION rollup_inventory_movements() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO item_daily_movements AS m (day, item_id, txn_type, qty_in, qty_out, txn_count)
+    SELECT ledger_day(created_at), item_id, txn_type,
+           sum(greatest(delta_quantity, 0)), sum(greatest(-delta_quantity, 0)), count(*)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (day, item_id, txn_type) DO UPDATE
+    SET qty_in = m.qty_in + EXCLUDED.qty_in,
+        qty_out = m.qty_out + EXCLUDED.qty_out,
+        txn_count = m.txn_count + EXCLUDED.txn_count,
+        updated_at = now();
+    RETURN NULL;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    # Reporting day of a ledger timestamp. Redefine (and run `flask reports rebuild`)
+    # to bucket by another time zone.
+    op.execute(
+        "CREATE OR REPLACE FUNCTION ledger_day(ts timestamptz) RETURNS date "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT (ts AT TIME ZONE 'UTC')::date $$;"
+    )
+
+    op.create_table(
+        'item_daily_movements',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('item_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('txn_type', sa.Text(), nullable=False),
+        sa.Column('qty_in', sa.Numeric(precision=14, scale=3), server_default='0', nullable=False),
+        sa.Column('qty_out', sa.Numeric(precision=14, scale=3), server_default='0', nullable=False),
+        sa.Column('txn_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('day', 'item_id', 'txn_type'),
+    )
+    # Per-item series and the items FK cascade
+    op.create_index('ix_item_daily_movements_item_id_day', 'item_daily_movements', ['item_id', 'day'])
+
+    op.execute(ROLLUP_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER inventory_transactions_rollup '
+        'AFTER INSERT ON inventory_transactions '
+        'REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION rollup_inventory_movements();'
+    )
+
+    # Backfill from the existing ledger
+    op.execute(
+        'INSERT INTO item_daily_movements (day, item_id, txn_type, qty_in, qty_out, txn_count) '
+        'SELECT ledger_day(created_at), item_id, txn_type, '
+        'sum(greatest(delta_quantity, 0)), sum(greatest(-delta_quantity, 0)), count(*) '
+        'FROM inventory_transactions GROUP BY 1, 2, 3;'
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS inventory_transactions_rollup ON inventory_transactions;')
+    op.execute('DROP FUNCTION IF EXISTS rollup_inventory_movements();')
+    op.drop_index('ix_item_daily_movements_item_id_day', table_name='item_daily_movements')
+    op.drop_table('item_daily_movements')
+    op.execute('DROP FUNCTION IF EXISTS ledger_day(timestamptz);')
@@ -0,0 +1,53 @@
+"""collapse_search_whitespace
+
+Revision ID: c3e9a1d5f720
+Revises: a4c8e2f6b103
+Create Date: 2026-10-19 09:12:44.205318
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9a1d5f720'
+down_revision = 'a4c8e2f6b103'
+branch_label = None
+depends_on = None
+
+# Katakana (ァ..ヶ) -> hiragana (ぁ..ゖ); mirrors services/search.normalize_search_text
+KATAKANA = ''.join(chr(c) for c in range(0x30A1, 0x30F7))
+HIRAGANA = ''.join(chr(c) for c in range(0x3041, 0x3097))
+FOLDED = f"lower(translate(normalize(value, NFKC), '{KATAKANA}', '{HIRAGANA}'))"
+
+# Every index on search_normalize() has to be rebuilt once its result changes
+REINDEX_SEARCH_INDEXES = """
+DO $$
+DECLARE
+    index_name regclass;
+BEGIN
+    FOR index_name IN
+        SELECT indexrelid::regclass FROM pg_index
+        WHERE pg_get_indexdef(indexrelid) LIKE '%search_normalize(%'
+    LOOP
+        EXECUTE format('REINDEX INDEX %s', index_name);
+    END LOOP;
+END
+$$;
+"""
+
+
+def create_function(body: str) -> None:
+    op.execute(
+        "CREATE OR REPLACE FUNCTION search_normalize(value text) RETURNS text "
+        f"LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT {body} $$;"
+    )
+    op.execute(REINDEX_SEARCH_INDEXES)
+
+
+def upgrade() -> None:
+    # Runs of whitespace collapse to one space and the ends are trimmed, as in
+    # normalize_search_text(), so "foo bar" matches a stored "foo  bar"
+    create_function(f"btrim(regexp_replace({FOLDED}, '\\s+', ' ', 'g'))")
+
+
+def downgrade() -> None:
+    create_function(FOLDED)
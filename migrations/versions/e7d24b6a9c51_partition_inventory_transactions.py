@@ -0,0 +1,148 @@
+"""partition_inventory_transactions
+
+Revision ID: e7d24b6a9c51
+Revises: c3a9e5f17b20
+Create Date: 2026-10-18 14:22:09.640271
+
+Converts inventory_transactions into a table range-partitioned by created_at
+month (UTC), with a DEFAULT partition so inserts never fail if the monthly
+partitions were not created in time. The ledger is copied, so the table is
+locked for writes for the duration of the migration.
+
+A primary key on a partitioned table must include the partition key, so
+the key becomes (id, created_at). The self-reference on
+reverses_transaction_id can no longer be a foreign key (id alone is not
+unique at the table level) and is kept as an indexed column; the reverse
+endpoint already checks that the original transaction exists.
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7d24b6a9c51'
+down_revision = 'c3a9e5f17b20'
+branch_label = None
+depends_on = None
+
+# Mirrors services/partitions; monthly partitions are named <table>_yYYYYmMM
+TABLE = 'inventory_transactions'
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    'id uuid NOT NULL DEFAULT gen_random_uuid(), '
+    'item_id uuid NOT NULL, '
+    'delta_quantity numeric(14, 3) NOT NULL, '
+    'txn_type text NOT NULL, '
+    'reason text, '
+    'reverses_transaction_id uuid, '
+    'created_at timestamptz NOT NULL DEFAULT now(), '
+    'CONSTRAINT ck_inventory_transactions_delta_nonzero CHECK (delta_quantity <> 0), '
+    'CONSTRAINT inventory_transactions_item_id_fkey '
+    'FOREIGN KEY (item_id) REFERENCES items (id) ON DELETE CASCADE'
+)
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_indexes() -> None:
+    op.create_index(
+        'ix_inventory_transactions_created_at_id',
+        TABLE,
+        [sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    op.create_index(
+        'ix_inventory_transactions_item_id_created_at_desc',
+        TABLE,
+        ['item_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    op.create_index('ix_inventory_transactions_reverses_transaction_id', TABLE, ['reverses_transaction_id'])
+
+
+def _create_rollup_trigger() -> None:
+    # Same trigger as c3a9e5f17b20; statement-level, so it stays on the parent
+    op.execute(
+        'CREATE TRIGGER inventory_transactions_rollup '
+        'AFTER INSERT ON inventory_transactions '
+        'REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION rollup_inventory_movements();'
+    )
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    op.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned;')
+    op.execute(f'ALTER INDEX {TABLE}_pkey RENAME TO {TABLE}_unpartitioned_pkey;')
+
+    op.execute(
+        f'CREATE TABLE {TABLE} ({COLUMNS}, PRIMARY KEY (id, created_at)) '
+        'PARTITION BY RANGE (created_at);'
+    )
+    op.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT;')
+
+    oldest = conn.execute(
+        sa.text(
+            "SELECT date_trunc('month', min(created_at) AT TIME ZONE 'UTC')::date "
+            f"FROM {TABLE}_unpartitioned"
+        )
+    ).scalar()
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    month = min(oldest or current, current)
+    while month <= _add_months(current, MONTHS_AHEAD):
+        end = _add_months(month, 1)
+        op.execute(
+            f'CREATE TABLE {TABLE}_y{month.year:04d}m{month.month:02d} PARTITION OF {TABLE} '
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00');"
+        )
+        month = end
+
+    # Copy before creating the rollup trigger: these rows are already rolled up
+    op.execute(
+        f'INSERT INTO {TABLE} (id, item_id, delta_quantity, txn_type, reason, reverses_transaction_id, created_at) '
+        'SELECT id, item_id, delta_quantity, txn_type, reason, reverses_transaction_id, created_at '
+        f'FROM {TABLE}_unpartitioned;'
+    )
+    op.execute(f'DROP TABLE {TABLE}_unpartitioned;')
+
+    _create_indexes()
+    _create_rollup_trigger()
+    op.execute(f'ANALYZE {TABLE};')
+
+
+def downgrade() -> None:
+    op.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned;')
+    op.execute(f'ALTER INDEX {TABLE}_pkey RENAME TO {TABLE}_partitioned_pkey;')
+    op.execute('DROP TRIGGER IF EXISTS inventory_transactions_rollup ON inventory_transactions_partitioned;')
+    for index in (
+        'ix_inventory_transactions_reverses_transaction_id',
+        'ix_inventory_transactions_item_id_created_at_desc',
+        'ix_inventory_transactions_created_at_id',
+    ):
+        op.drop_index(index, table_name=f'{TABLE}_partitioned')
+
+    op.execute(f'CREATE TABLE {TABLE} ({COLUMNS}, PRIMARY KEY (id));')
+    op.execute(
+        f'INSERT INTO {TABLE} (id, item_id, delta_quantity, txn_type, reason, reverses_transaction_id, created_at) '
+        'SELECT id, item_id, delta_quantity, txn_type, reason, reverses_transaction_id, created_at '
+        f'FROM {TABLE}_partitioned;'
+    )
+    op.execute(f'DROP TABLE {TABLE}_partitioned;')
+
+    # Rows of archived partitions are gone, so dangling references are cleared first
+    op.execute(
+        f'UPDATE {TABLE} t SET reverses_transaction_id = NULL '
+        'WHERE reverses_transaction_id IS NOT NULL '
+        f'AND NOT EXISTS (SELECT 1 FROM {TABLE} o WHERE o.id = t.reverses_transaction_id);'
+    )
+    op.execute(
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT inventory_transactions_reverses_transaction_id_fkey '
+        f'FOREIGN KEY (reverses_transaction_id) REFERENCES {TABLE} (id) ON DELETE SET NULL;'
+    )
+    _create_indexes()
+    _create_rollup_trigger()
@@ -1,16 +1,38 @@
 from __future__ import annotations
 
 import os
+from uuid import UUID
 
 from dotenv import load_dotenv
 from flask import Flask
 
-from inventory_app.db import SessionLocal, init_db
+from inventory_app.cli import (
+    checkpoints_cli,
+    idempotency_cli,
+    items_cli,
+    ledger_cli,
+    partitions_cli,
+    reports_cli,
+)
+from inventory_app.compression import init_compression
+from inventory_app.db import SessionLocal, get_replica_engines, init_db
+from inventory_app.instrumentation import PROFILERS, init_instrumentation
+from inventory_app.jsonprovider import FastJSONProvider
+from inventory_app.replicas import init_replica_routing, read_router
+from inventory_app.routes.checkpoints import bp as checkpoints_bp
+from inventory_app.routes.exports import bp as exports_bp
 from inventory_app.routes.items import bp as items_bp
+from inventory_app.routes.metrics import bp as metrics_bp
+from inventory_app.routes.reconciliation import bp as reconciliation_bp
+from inventory_app.routes.reports import bp as reports_bp
 from inventory_app.routes.stocks import bp as stocks_bp
 from inventory_app.routes.stocktakes import bp as stocktakes_bp
 from inventory_app.routes.suggestions import bp as suggestions_bp
+from inventory_app.routes.system import bp as system_bp
 from inventory_app.routes.transactions import bp as transactions_bp
+from inventory_app.services.coalescing import delta_coalescer
+from inventory_app.services.search import suggestion_cache
+from inventory_app.services.stock_changes import stock_change_hub
 from inventory_app.ui.routes import bp as ui_bp
 
 
@@ -18,21 +40,76 @@ def create_app() -> Flask:
     load_dotenv()
 
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret")
     app.config["TEMPLATES_AUTO_RELOAD"] = os.getenv("TEMPLATES_AUTO_RELOAD", "0") == "1"
 
+    app.config["SUGGESTIONS_CACHE_SIZE"] = int(os.getenv("SUGGESTIONS_CACHE_SIZE", "1024"))
+    app.config["SUGGESTIONS_CACHE_TTL"] = float(os.getenv("SUGGESTIONS_CACHE_TTL", "30"))
+
+    app.config["HOT_ITEM_IDS"] = [
+        UUID(i.strip()) for i in os.getenv("HOT_ITEM_IDS", "").split(",") if i.strip()
+    ]
+    app.config["HOT_ITEM_MAX_BATCH"] = int(os.getenv("HOT_ITEM_MAX_BATCH", "256"))
+    app.config["IDEMPOTENCY_KEY_TTL_HOURS"] = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+    app.config["STOCK_STREAM_COALESCE_MS"] = float(os.getenv("STOCK_STREAM_COALESCE_MS", "200"))
+    app.config["STOCK_STREAM_HEARTBEAT_SECONDS"] = float(os.getenv("STOCK_STREAM_HEARTBEAT_SECONDS", "15"))
+
+    app.config["REPLICA_MAX_LAG_MS"] = float(os.getenv("REPLICA_MAX_LAG_MS", "5000"))
+    app.config["REPLICA_CHECK_INTERVAL_MS"] = float(os.getenv("REPLICA_CHECK_INTERVAL_MS", "1000"))
+
+    app.config["COMPRESS_MIN_BYTES"] = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+    app.config["REQUEST_SLOW_MS"] = float(os.getenv("REQUEST_SLOW_MS", "1000"))
+    app.config["PROFILE_SAMPLE_RATE"] = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    app.config["PROFILE_SLOW_REQUEST_MS"] = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "500"))
+    app.config["PROFILE_DIR"] = os.getenv("PROFILE_DIR", os.path.join(app.instance_path, "profiles"))
+    app.config["PROFILER"] = os.getenv("PROFILER", "auto")
+    if app.config["PROFILER"] not in PROFILERS:
+        raise RuntimeError(f"PROFILER must be one of: {', '.join(PROFILERS)}")
+
     init_db()
+    read_router.configure(
+        get_replica_engines(),
+        max_lag=app.config["REPLICA_MAX_LAG_MS"] / 1000,
+        check_interval=app.config["REPLICA_CHECK_INTERVAL_MS"] / 1000,
+    )
+    suggestion_cache.configure(
+        maxsize=app.config["SUGGESTIONS_CACHE_SIZE"], ttl=app.config["SUGGESTIONS_CACHE_TTL"]
+    )
+    delta_coalescer.configure(app.config["HOT_ITEM_IDS"], max_batch=app.config["HOT_ITEM_MAX_BATCH"])
+    stock_change_hub.configure(
+        coalesce=app.config["STOCK_STREAM_COALESCE_MS"] / 1000, poll=app.config["STOCK_STREAM_HEARTBEAT_SECONDS"]
+    )
+
+    init_instrumentation(app)
+    init_replica_routing(app)
+    init_compression(app)
 
     # Ensure SQLAlchemy sessions are cleaned up after each request
     app.teardown_appcontext(lambda exc: SessionLocal.remove())
 
     app.register_blueprint(ui_bp)
+    app.register_blueprint(metrics_bp)
 
     app.register_blueprint(items_bp, url_prefix="/api")
     app.register_blueprint(stocks_bp, url_prefix="/api")
     app.register_blueprint(stocktakes_bp, url_prefix="/api")
     app.register_blueprint(suggestions_bp, url_prefix="/api")
     app.register_blueprint(transactions_bp, url_prefix="/api")
+    app.register_blueprint(exports_bp, url_prefix="/api")
+    app.register_blueprint(reports_bp, url_prefix="/api")
+    app.register_blueprint(checkpoints_bp, url_prefix="/api")
+    app.register_blueprint(reconciliation_bp, url_prefix="/api")
+    app.register_blueprint(system_bp, url_prefix="/api")
+
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(partitions_cli)
+    app.cli.add_command(checkpoints_cli)
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(items_cli)
 
     return app
 
@@ -0,0 +1,9 @@
+"""
+Async ASGI entry point.
+
+Hot read endpoints and the single-item stock mutations run as native
+coroutines on SQLAlchemy's asyncio engine; everything else is served by
+the Flask app mounted underneath. Run with::
+
+    uvicorn inventory_app.asgi.app:app
+"""
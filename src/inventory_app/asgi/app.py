@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.routing import Mount
+
+from inventory_app.app import create_app
+from inventory_app.asgi.db import dispose_async_db, init_async_db
+from inventory_app.asgi.routes import routes
+from inventory_app.compression import GZIP_LEVEL
+
+
+def create_asgi_app() -> Starlette:
+    """
+    Build the ASGI app.
+
+    Requests matching an async route are handled on the event loop; every
+    other path (the UI, exports, stocktake writes, batches, ...) falls
+    through to the Flask app, which a2wsgi runs in a thread pool. Both sides
+    read the same DATABASE_URL and DB_* settings and keep separate pools.
+    """
+    flask_app = create_app()
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        init_async_db()
+        yield
+        await dispose_async_db()
+
+    middleware = []
+    if flask_app.config["COMPRESS_MIN_BYTES"] > 0:
+        # gzip for the async routes; Flask responses arrive already encoded and pass through
+        middleware.append(Middleware(
+            GZipMiddleware, minimum_size=flask_app.config["COMPRESS_MIN_BYTES"], compresslevel=GZIP_LEVEL
+        ))
+    app = Starlette(
+        routes=[*routes, Mount("/", app=WSGIMiddleware(flask_app))],
+        middleware=middleware,
+        lifespan=lifespan,
+    )
+    app.state.idempotency_ttl = timedelta(hours=flask_app.config["IDEMPOTENCY_KEY_TTL_HOURS"])
+    return app
+
+
+app = create_asgi_app()
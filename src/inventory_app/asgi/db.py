@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from inventory_app.db import (
+    _env_flag,
+    get_database_url,
+    get_engine_options,
+    get_timeouts,
+    instrument_engine,
+)
+
+_async_engine: AsyncEngine | None = None
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def init_async_db() -> AsyncEngine:
+    """
+    Create the async engine from DATABASE_URL and the same DB_* pool settings as init_db.
+
+    The URL keeps its ``postgresql+psycopg`` driver; psycopg 3 serves both the
+    sync and the async dialect.
+    """
+    global _async_engine
+    if _async_engine is not None:
+        return _async_engine
+
+    options = get_engine_options()
+    # asyncio engines need an asyncio-aware pool; keep the sizing, drop the class
+    options.pop("poolclass", None)
+    _async_engine = create_async_engine(get_database_url(), **options)
+    # slow-query log only: the async routes do not collect per-request stats
+    instrument_engine(_async_engine.sync_engine)
+
+    timeouts = get_timeouts()
+    if _env_flag("DB_PGBOUNCER", False) and timeouts:
+        settings = ", ".join(f"set_config('{name}', '{value}', true)" for name, value in timeouts.items())
+
+        @event.listens_for(_async_engine.sync_engine, "begin")
+        def _set_local_timeouts(conn):
+            conn.exec_driver_sql(f"SELECT {settings}")
+
+    AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+async def dispose_async_db() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+def get_async_session() -> AsyncSession:
+    return AsyncSessionLocal()
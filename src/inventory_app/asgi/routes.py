@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from functools import wraps
+from typing import Any
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import ColumnElement, Executable, Select, select
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+from werkzeug.http import http_date, parse_etags
+
+from inventory_app.asgi.db import get_async_session
+from inventory_app.jsonprovider import dumps_bytes
+from inventory_app.models import InventoryTransaction, Item, Stock, Stocktake
+from inventory_app.pagination import (
+    SortSpec,
+    int_arg,
+    keyset_query,
+    keyset_result,
+    row_estimate_query,
+)
+from inventory_app.routes.items import ITEM_COLUMNS, ITEM_SORTS, filter_items
+from inventory_app.routes.stocks import STOCK_COLUMNS, STOCK_SORTS, filter_stocks
+from inventory_app.routes.stocktakes import (
+    stocktake_detail_body,
+    stocktake_lines_page,
+    stocktake_list_query,
+)
+from inventory_app.routes.suggestions import SUGGESTIONS_LIMIT
+from inventory_app.routes.transactions import (
+    item_ledger_query,
+    ledger_page_body,
+    ledger_page_query,
+    ledger_range,
+)
+from inventory_app.schemas.items import ItemOut
+from inventory_app.schemas.transactions import (
+    AdjustmentRequest,
+    TransactionRequest,
+    TransactionResponse,
+)
+from inventory_app.services.idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    REPLAYED_HEADER,
+    StoredRequest,
+    claim_statement,
+    replay_error,
+    request_fingerprint,
+    save_response_statement,
+    stored_request_query,
+)
+from inventory_app.services.inventory import (
+    InsufficientStockError,
+    ItemNotFoundError,
+    apply_inventory_delta_async,
+)
+from inventory_app.services.search import (
+    normalize_search_text,
+    ranked_search_query,
+    sku_prefix_query,
+    suggestion_cache,
+)
+from inventory_app.services.versions import (
+    entity_tag,
+    read_version,
+    row_version_query,
+    table_version_query,
+)
+
+
+class JSONResponse(Response):
+    """JSON response rendered exactly like the Flask app's FastJSONProvider."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+
+def ok(data, status: int = 200) -> JSONResponse:
+    return JSONResponse(data, status)
+
+
+def error(message: str, status: int = 400, **extra) -> JSONResponse:
+    return JSONResponse({"error": message, **extra}, status)
+
+
+def conditional(version_query: Callable[..., Executable]):
+    """Async counterpart of http.conditional: same ETags, same 304 rule."""
+
+    def decorator(handler: Callable[[Request], Awaitable[Response]]):
+        @wraps(handler)
+        async def wrapper(request: Request) -> Response:
+            async with get_async_session() as s:
+                row = (await s.execute(version_query(**request.path_params))).one_or_none()
+            if row is None:
+                return await handler(request)
+            version = read_version(row)
+            # the path as Flask's request.full_path spells it, so both apps agree on ETags
+            path = request.url.path + (f"?{request.url.query}" if request.url.query else "?")
+            etag = entity_tag(path, version)
+            if parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+                response = Response(status_code=304)
+            else:
+                response = await handler(request)
+                if response.status_code != 200:
+                    return response
+            response.headers["etag"] = f'W/"{etag}"'
+            if version.last_modified is not None:
+                response.headers["last-modified"] = http_date(version.last_modified)
+            response.headers["cache-control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+async def _keyset_list(
+    request: Request,
+    query: Select,
+    *,
+    sorts: dict[str, SortSpec],
+    id_column: ColumnElement,
+    parse_id: Callable[[Any], Any],
+) -> JSONResponse:
+    """Cursor-mode body shared by /items and /stocks (see routes.items.list_items)."""
+    args = request.query_params
+    sort_key = args.get("sort", "name")
+    sort = sorts.get(sort_key.removeprefix("-"))
+    if sort is None:
+        return error(f"sort must be one of: {', '.join(sorts)}", 400)
+    limit = min(max(int_arg(args, "limit", 50), 1), 200)
+
+    try:
+        query = keyset_query(
+            query,
+            sort_key=sort_key,
+            sort=sort,
+            id_column=id_column,
+            parse_id=parse_id,
+            cursor=args.get("cursor"),
+            limit=limit,
+        )
+    except ValueError:
+        return error("Invalid cursor", 400)
+
+    async with get_async_session() as s:
+        rows = (await s.execute(query)).all()
+    rows, next_cursor = keyset_result(rows, sort_key=sort_key, sort=sort, id_field="id", limit=limit)
+
+    meta = {
+        "limit": limit,
+        "count": len(rows),
+        "sort": sort_key,
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
+    }
+    return ok({"items": [r._asdict() for r in rows], "meta": meta})
+
+
+@conditional(lambda: table_version_query("items"))
+async def list_items(request: Request) -> JSONResponse:
+    try:
+        query = filter_items(select(*ITEM_COLUMNS), request.query_params)
+    except ValueError:
+        return error("updated_since must be an ISO 8601 timestamp", 400)
+
+    if "cursor" not in request.query_params:
+        async with get_async_session() as s:
+            rows = (await s.execute(query.order_by(Item.id.desc()))).all()
+        return ok([r._asdict() for r in rows])
+
+    return await _keyset_list(request, query, sorts=ITEM_SORTS, id_column=Item.id, parse_id=UUID)
+
+
+@conditional(lambda item_id: row_version_query("items", item_id))
+async def get_item(request: Request) -> JSONResponse:
+    async with get_async_session() as s:
+        item = await s.get(Item, request.path_params["item_id"])
+    if not item:
+        return error("商品が見つかりません", 404)
+    return ok(ItemOut.model_validate(item).model_dump())
+
+
+@conditional(lambda: table_version_query("items", "stocks"))
+async def list_stocks(request: Request) -> JSONResponse:
+    try:
+        query = filter_stocks(
+            select(*STOCK_COLUMNS).join(Item, Item.id == Stock.item_id), request.query_params
+        )
+    except ValueError as e:
+        return error(str(e), 400)
+
+    if "cursor" not in request.query_params:
+        async with get_async_session() as s:
+            rows = (await s.execute(query.order_by(Item.name.asc()))).all()
+        return ok([r._asdict() for r in rows])
+
+    return await _keyset_list(request, query, sorts=STOCK_SORTS, id_column=Stock.id, parse_id=int)
+
+
+async def suggestions(request: Request) -> JSONResponse:
+    q = normalize_search_text(request.query_params.get("q", ""))
+    if not q:
+        return ok([])
+
+    key = (q, SUGGESTIONS_LIMIT)
+    data = suggestion_cache.get(key)
+    if data is None:
+        async with get_async_session() as s:
+            rows = list((await s.execute(sku_prefix_query(q, SUGGESTIONS_LIMIT))).all())
+            if len(rows) < SUGGESTIONS_LIMIT:
+                ranked = ranked_search_query(q, SUGGESTIONS_LIMIT - len(rows), [r.id for r in rows])
+                rows.extend((await s.execute(ranked)).all())
+        data = [
+            {
+                "id": str(r.id),
+                "name": r.name,
+                "sku": r.sku,
+                "category": r.category,
+                "manufacturer": r.manufacturer,
+            }
+            for r in rows
+        ]
+        suggestion_cache.set(key, data)
+    return ok(data)
+
+
+async def list_transactions(request: Request) -> JSONResponse:
+    try:
+        page = ledger_page_query(request.query_params)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    async with get_async_session() as s:
+        rows = (await s.execute(page.query)).all()
+
+        total = None
+        if page.total_mode == "exact":
+            total = (await s.execute(page.count_query)).scalar_one()
+        elif page.total_mode == "estimate":
+            estimate = (
+                await s.execute(row_estimate_query(InventoryTransaction.__tablename__))
+            ).scalar_one_or_none()
+            total = int(estimate) if estimate is not None and estimate >= 0 else None
+
+    return ok(ledger_page_body(page, rows, total))
+
+
+async def list_item_transactions(request: Request) -> JSONResponse:
+    try:
+        conditions = ledger_range(request.query_params)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    item_id = request.path_params["item_id"]
+    limit = min(max(int_arg(request.query_params, "limit", 20), 1), 100)
+    async with get_async_session() as s:
+        if await s.get(Item, item_id) is None:
+            return error("Item not found", 404)
+        rows = (await s.execute(item_ledger_query(item_id, limit, conditions))).all()
+    return ok([r._asdict() for r in rows])
+
+
+async def list_stocktakes(request: Request) -> JSONResponse:
+    async with get_async_session() as s:
+        rows = (await s.execute(stocktake_list_query())).all()
+    return ok([r._asdict() for r in rows])
+
+
+@conditional(lambda stocktake_id: row_version_query("stocktakes", stocktake_id, "items"))
+async def get_stocktake(request: Request) -> JSONResponse:
+    stocktake_id = request.path_params["stocktake_id"]
+    try:
+        page = stocktake_lines_page(stocktake_id, request.query_params)
+    except ValueError as e:
+        return error(str(e), 400)
+    async with get_async_session() as s:
+        st = await s.get(Stocktake, stocktake_id)
+        if not st:
+            return error("棚卸が見つかりません", 404)
+        lines = (await s.execute(page.query)).all()
+    return ok(stocktake_detail_body(st, lines, page))
+
+
+async def _post_delta(request: Request, txn_type: str) -> JSONResponse:
+    """Shared body of the receipt / issue / adjustment endpoints (see routes.transactions)."""
+    try:
+        payload = await request.json()
+        if txn_type == "ADJUST":
+            data = AdjustmentRequest(**payload)
+            delta = data.delta
+        else:
+            data = TransactionRequest(**payload)
+            delta = data.quantity if txn_type == "RECEIPT" else -data.quantity
+    except (ValueError, TypeError, ValidationError) as e:
+        return error(str(e), 400)
+
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        return error(f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters", 400)
+
+    async with get_async_session() as s:
+        if key is not None:
+            # same protocol as http.idempotent: the key and the response commit with the write
+            path = request.url.path + (f"?{request.url.query}" if request.url.query else "?")
+            fingerprint = request_fingerprint(request.method, path, await request.body())
+            claim = claim_statement(key, fingerprint, request.app.state.idempotency_ttl)
+            if (await s.execute(claim)).first() is None:
+                stored = StoredRequest(*(await s.execute(stored_request_query(key))).one())
+                await s.rollback()
+                if problem := replay_error(stored, fingerprint):
+                    return error(*problem)
+                return Response(
+                    stored.response_body,
+                    stored.status_code,
+                    headers={"content-type": stored.content_type, REPLAYED_HEADER: "true"},
+                )
+        try:
+            txn = await apply_inventory_delta_async(
+                session=s,
+                item_id=request.path_params["item_id"],
+                delta=delta,
+                txn_type=txn_type,
+                reason=data.reason,
+            )
+            response = TransactionResponse(
+                transaction_id=str(txn.id),
+                item_id=str(txn.item_id),
+                delta_quantity=float(txn.delta_quantity),
+                txn_type=txn.txn_type,
+                reason=txn.reason,
+                created_at=txn.created_at.isoformat(),
+            )
+            result = ok(response.model_dump(), 201)
+            if key is not None:
+                await s.execute(save_response_statement(key, 201, result.media_type, result.body))
+            await s.commit()
+        except ItemNotFoundError:
+            await s.rollback()
+            return error("Item not found", 404)
+        except InsufficientStockError as e:
+            await s.rollback()
+            return error(str(e), 409)
+        except Exception as e:
+            await s.rollback()
+            return error(str(e), 400)
+
+    return result
+
+
+async def create_receipt(request: Request) -> JSONResponse:
+    return await _post_delta(request, "RECEIPT")
+
+
+async def create_issue(request: Request) -> JSONResponse:
+    return await _post_delta(request, "ISSUE")
+
+
+async def create_adjustment(request: Request) -> JSONResponse:
+    return await _post_delta(request, "ADJUST")
+
+
+routes = [
+    Route("/api/items", list_items, methods=["GET"]),
+    Route("/api/items/{item_id:uuid}", get_item, methods=["GET"]),
+    Route("/api/items/{item_id:uuid}/transactions", list_item_transactions, methods=["GET"]),
+    Route("/api/items/{item_id:uuid}/receipts", create_receipt, methods=["POST"]),
+    Route("/api/items/{item_id:uuid}/issues", create_issue, methods=["POST"]),
+    Route("/api/items/{item_id:uuid}/adjustments", create_adjustment, methods=["POST"]),
+    Route("/api/stocks", list_stocks, methods=["GET"]),
+    Route("/api/suggestions", suggestions, methods=["GET"]),
+    Route("/api/transactions", list_transactions, methods=["GET"]),
+    Route("/api/stocktakes", list_stocktakes, methods=["GET"]),
+    Route("/api/stocktakes/{stocktake_id:uuid}", get_stocktake, methods=["GET"]),
+]
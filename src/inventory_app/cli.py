@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import click
+from flask.cli import AppGroup
+
+from inventory_app.db import get_session
+from inventory_app.services.checkpoints import prune_checkpoints, take_checkpoint
+from inventory_app.services.idempotency import purge_expired_keys
+from inventory_app.services.imports import (
+    IMPORT_FORMATS,
+    ImportFormatError,
+    detect_format,
+    import_items,
+)
+from inventory_app.services.partitions import (
+    archive_ledger_partition,
+    ensure_ledger_partitions,
+    expired_ledger_partitions,
+)
+from inventory_app.services.reconciliation import reconcile, write_adjustments
+from inventory_app.services.reports import ledger_today, rebuild_daily_movements
+
+reports_cli = AppGroup("reports", help="Reporting rollups.")
+partitions_cli = AppGroup("partitions", help="Monthly partitions of inventory_transactions.")
+checkpoints_cli = AppGroup("checkpoints", help="Stock snapshots for as-of queries.")
+ledger_cli = AppGroup("ledger", help="Ledger consistency checks.")
+idempotency_cli = AppGroup("idempotency", help="Stored Idempotency-Key responses.")
+items_cli = AppGroup("items", help="Item catalogue.")
+
+
+@reports_cli.command("rebuild")
+@click.option("--days", type=int, default=None, help="Only rebuild the last N reporting days.")
+def reports_rebuild(days: int | None) -> None:
+    """Recompute item_daily_movements from the ledger."""
+    since = ledger_today() - timedelta(days=days - 1) if days else None
+    s = get_session()
+    written = rebuild_daily_movements(s, since=since)
+    s.commit()
+    click.echo(f"rebuilt {written} rollup rows" + (f" since {since.isoformat()}" if since else ""))
+
+
+@partitions_cli.command("ensure")
+@click.option("--months-ahead", type=int, default=3, show_default=True)
+@click.option("--lock-timeout-ms", type=int, default=5000, show_default=True)
+def partitions_ensure(months_ahead: int, lock_timeout_ms: int) -> None:
+    """Create missing partitions from this month to N months ahead."""
+    s = get_session()
+    created = ensure_ledger_partitions(s, months_ahead=months_ahead, lock_timeout_ms=lock_timeout_ms)
+    s.commit()
+    for name in created:
+        click.echo(f"created {name}")
+    if not created:
+        click.echo("all partitions present")
+
+
+@partitions_cli.command("archive")
+@click.option("--keep-months", type=click.IntRange(min=1), required=True, help="Months to keep attached.")
+@click.option(
+    "--archive-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Write each partition to <dir>/<name>.csv.gz and drop it. Without it partitions are only detached.",
+)
+@click.option("--lock-timeout-ms", type=int, default=5000, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Only list the partitions that would be archived.")
+def partitions_archive(keep_months: int, archive_dir: Path | None, lock_timeout_ms: int, dry_run: bool) -> None:
+    """Detach (and optionally archive) partitions older than the kept window."""
+    s = get_session()
+    expired = expired_ledger_partitions(s, keep_months=keep_months)
+    s.rollback()
+    for partition in expired:
+        if dry_run:
+            click.echo(f"would archive {partition.name} ({partition.start} .. {partition.end})")
+            continue
+        # one transaction per partition, so a failure leaves earlier ones done
+        path = archive_ledger_partition(
+            s, partition, archive_dir=archive_dir, lock_timeout_ms=lock_timeout_ms
+        )
+        s.commit()
+        click.echo(f"archived {partition.name} to {path}" if path else f"detached {partition.name}")
+    if not expired:
+        click.echo("nothing to archive")
+
+
+@checkpoints_cli.command("take")
+def checkpoints_take() -> None:
+    """Snapshot all stock quantities (briefly pauses ledger writes)."""
+    s = get_session()
+    checkpoint = take_checkpoint(s)
+    s.commit()
+    click.echo(f"checkpoint {checkpoint.id} at {checkpoint.taken_at.isoformat()} ({checkpoint.items_count} items)")
+
+
+@checkpoints_cli.command("prune")
+@click.option("--keep-days", type=click.IntRange(min=1), required=True)
+def checkpoints_prune(keep_days: int) -> None:
+    """Delete checkpoints older than N days."""
+    s = get_session()
+    deleted = prune_checkpoints(s, before=datetime.now(UTC) - timedelta(days=keep_days))
+    s.commit()
+    click.echo(f"deleted {deleted} checkpoints")
+
+
+@ledger_cli.command("reconcile")
+@click.option("--chunks", type=click.IntRange(min=1), default=64, show_default=True, help="Item id ranges.")
+@click.option("--workers", type=click.IntRange(min=1), default=1, show_default=True, help="Worker processes.")
+@click.option("--fix", is_flag=True, help="Write ADJUST ledger rows for the items that disagree.")
+def ledger_reconcile(chunks: int, workers: int, fix: bool) -> None:
+    """Compare stocks with the sum of the ledger; exits 1 if discrepancies remain."""
+    s = get_session()
+    start = time.perf_counter()
+    found = []
+    for result in reconcile(s, chunks=chunks, workers=workers):
+        for d in result.discrepancies:
+            click.echo(f"{d.item_id}\tstock={d.stock_quantity}\tledger={d.ledger_quantity}\tdiff={d.difference}")
+        found.extend(result.discrepancies)
+    s.rollback()
+    click.echo(f"{len(found)} discrepancies in {chunks} ranges ({time.perf_counter() - start:.2f}s)")
+
+    if fix and found:
+        corrected = write_adjustments(s, [d.item_id for d in found])
+        s.commit()
+        click.echo(f"wrote {len(corrected)} ADJUST rows")
+        return
+    if found:
+        raise SystemExit(1)
+
+
+@idempotency_cli.command("purge")
+def idempotency_purge() -> None:
+    """Delete Idempotency-Key records past their TTL."""
+    s = get_session()
+    deleted = purge_expired_keys(s)
+    s.commit()
+    click.echo(f"deleted {deleted} expired keys")
+
+
+@items_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), default=None, help="Default: from the suffix.")
+@click.option("--dry-run", is_flag=True, help="Validate and report without committing.")
+def items_import(path: Path, fmt: str | None, dry_run: bool) -> None:
+    """Upsert items by SKU from a CSV/XLSX file; exits 1 if any row was rejected."""
+    s = get_session()
+    start = time.perf_counter()
+    try:
+        with path.open("rb") as f:
+            result = import_items(s, f, fmt or detect_format(path.name))
+    except ImportFormatError as e:
+        s.rollback()
+        raise click.ClickException(str(e)) from e
+    for e in result.errors:
+        click.echo(f"line {e.row}\t{e.sku or ''}\t{'; '.join(e.errors)}", err=True)
+    if dry_run:
+        s.rollback()
+    else:
+        s.commit()
+    click.echo(
+        f"{result.rows} rows: {result.inserted} inserted, {result.updated} updated, "
+        f"{result.unchanged} unchanged, {len(result.errors)} rejected "
+        f"({time.perf_counter() - start:.2f}s{', rolled back' if dry_run else ''})"
+    )
+    if result.errors:
+        raise SystemExit(1)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import gzip
+
+from flask import Flask, Response, current_app, request
+
+try:  # optional: pip install -e ".[fast]"
+    import brotli
+except ImportError:  # pragma: no cover - exercised when brotli is absent
+    brotli = None
+
+# Fast settings: the payloads are regenerated per request, not cached compressed
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Compress responses of COMPRESS_MIN_BYTES or more (0 disables).
+
+    Brotli is used when the client accepts it and the brotli package is
+    installed, gzip otherwise. Streamed bodies (exports, the stock change
+    stream) and file responses are left alone.
+    """
+    app.after_request(_compress)
+
+
+def _compressible(response: Response) -> bool:
+    return response.mimetype.startswith(COMPRESSIBLE_TYPES) or response.status_code == 304
+
+
+def _compress(response: Response) -> Response:
+    min_bytes = current_app.config["COMPRESS_MIN_BYTES"]
+    if min_bytes <= 0 or not _compressible(response):
+        return response
+    # caches must keep the encodings apart, including for uncompressed and 304 answers
+    response.vary.add("Accept-Encoding")
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.content_length is None
+        or response.content_length < min_bytes
+    ):
+        return response
+
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"])
+    if encoding == "br":
+        body = brotli.compress(response.get_data(), quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        body = gzip.compress(response.get_data(), compresslevel=GZIP_LEVEL, mtime=0)
+    else:
+        return response
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
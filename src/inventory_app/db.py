@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import logging
 import os
+import threading
+import time
+from contextvars import ContextVar
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event, make_url
 from sqlalchemy.orm import DeclarativeBase, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from inventory_app.metrics import slow_queries_total
 
 
 class Base(DeclarativeBase):
@@ -11,7 +18,120 @@ class Base(DeclarativeBase):
 
 
 _engine = None
+_replica_engines: list = []
 SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False))
+# Bound per request to the replica it was routed to (see get_session)
+ReplicaSessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False))
+
+
+class PoolMetrics:
+    """Checkout wait-time counters collected by InstrumentedQueuePool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.failures = 0
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            if failed:
+                self.failures += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_metrics.record(time.perf_counter() - start, failed=True)
+            raise
+        pool_metrics.record(time.perf_counter() - start)
+        return conn
+
+
+class QueryStats:
+    """Statements executed (and time spent in them) while one request is handled."""
+
+    __slots__ = ("seconds", "statements")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set by inventory_app.instrumentation for the duration of each request
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+# Set by inventory_app.replicas while a read-only request is served by a replica
+current_replica: ContextVar[Engine | None] = ContextVar("current_replica", default=None)
+slow_query_log = logging.getLogger("inventory_app.db.slow_query")
+
+_MAX_LOGGED_PARAMETERS = 1000
+
+
+def _format_parameters(parameters) -> str:
+    text = repr(parameters)
+    if len(text) > _MAX_LOGGED_PARAMETERS:
+        text = text[:_MAX_LOGGED_PARAMETERS] + f"... ({len(text)} chars)"
+    return text
+
+
+def instrument_engine(engine) -> None:
+    """
+    Time every statement on ``engine``.
+
+    Adds each statement to the current request's QueryStats (if any) and
+    logs statements slower than DB_SLOW_QUERY_MS (default 500, 0 disables)
+    to ``inventory_app.db.slow_query`` with their parameters.
+    """
+    slow_ms = _env_int("DB_SLOW_QUERY_MS", 500)
+    threshold = slow_ms / 1000 if slow_ms > 0 else None
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+        if threshold is not None and elapsed >= threshold:
+            slow_queries_total.inc()
+            slow_query_log.warning(
+                "slow query (%.1f ms): %s | parameters: %s",
+                elapsed * 1000,
+                " ".join(statement.split()),
+                _format_parameters(parameters),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _drop_timer(exception_context):
+        # a failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0") == "1"
 
 
 def get_database_url() -> str:
@@ -21,13 +141,146 @@ def get_database_url() -> str:
     return url
 
 
+def get_replica_urls() -> list[str]:
+    """
+    Return the read replica URLs from DATABASE_REPLICA_URLS (comma-separated).
+
+    A replica can be any server that follows the primary (or, for local
+    testing, the primary itself under another URL). Connections to replicas
+    give up after DB_REPLICA_CONNECT_TIMEOUT seconds (default 2).
+    """
+    return [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def get_listen_url() -> str:
+    """
+    Return a libpq URL for LISTEN connections.
+
+    DB_LISTEN_URL overrides DATABASE_URL; set it to a direct (or session
+    pooling) address when DB_PGBOUNCER=1, since LISTEN does not survive
+    transaction pooling.
+    """
+    url = make_url(os.getenv("DB_LISTEN_URL") or get_database_url())
+    return url.set(drivername=url.get_backend_name()).render_as_string(hide_password=False)
+
+
+def get_engine_options() -> dict:
+    """
+    Build create_engine() keyword arguments from the environment.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (seconds), DB_POOL_RECYCLE
+    (seconds, -1 disables) and DB_POOL_PRE_PING (1/0) tune the pool.
+    DB_STATEMENT_TIMEOUT_MS and DB_LOCK_TIMEOUT_MS (0 disables) are sent as
+    startup options. DB_PGBOUNCER=1 selects transaction-pooling mode: server-side
+    prepared statements are disabled and the timeouts are applied with
+    SET LOCAL at the start of each transaction instead, because PgBouncer
+    does not forward startup options.
+    """
+    options: dict = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", -1),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", True),
+    }
+    connect_args: dict = {}
+    if _env_flag("DB_PGBOUNCER", False):
+        # psycopg 3: never PREPARE; statements can land on any server connection
+        connect_args["prepare_threshold"] = None
+    else:
+        startup = [f"-c {name}={value}" for name, value in get_timeouts().items()]
+        if startup:
+            connect_args["options"] = " ".join(startup)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def get_timeouts() -> dict[str, int]:
+    """Return the configured non-zero Postgres timeouts in milliseconds."""
+    timeouts = {
+        "statement_timeout": _env_int("DB_STATEMENT_TIMEOUT_MS", 0),
+        "lock_timeout": _env_int("DB_LOCK_TIMEOUT_MS", 0),
+    }
+    return {name: value for name, value in timeouts.items() if value > 0}
+
+
+def _create_engine(url: str, **overrides) -> Engine:
+    engine = create_engine(url, **{**get_engine_options(), **overrides})
+    instrument_engine(engine)
+
+    timeouts = get_timeouts()
+    if _env_flag("DB_PGBOUNCER", False) and timeouts:
+        settings = ", ".join(f"set_config('{name}', '{value}', true)" for name, value in timeouts.items())
+
+        @event.listens_for(engine, "begin")
+        def _set_local_timeouts(conn):
+            conn.exec_driver_sql(f"SELECT {settings}")
+
+    return engine
+
+
 def init_db() -> None:
     global _engine
     if _engine is not None:
         return
-    _engine = create_engine(get_database_url(), pool_pre_ping=True)
+    _engine = _create_engine(get_database_url())
+    # same pool settings per replica; pool_metrics (and /api/system/db-pool) stay the primary's.
+    # A replica that stops answering has to fail fast rather than hold up the reads routed to it.
+    connect_args = {
+        **get_engine_options().get("connect_args", {}),
+        "connect_timeout": _env_int("DB_REPLICA_CONNECT_TIMEOUT", 2),
+    }
+    _replica_engines[:] = [
+        _create_engine(url, poolclass=QueuePool, connect_args=connect_args) for url in get_replica_urls()
+    ]
     SessionLocal.configure(bind=_engine)
 
 
+def get_engine():
+    if _engine is None:
+        raise RuntimeError("Database is not initialized; call init_db() first")
+    return _engine
+
+
+def get_read_engine() -> Engine:
+    """The current request's replica engine when it was routed to one, else the primary's."""
+    return current_replica.get() or get_engine()
+
+
+def get_replica_engines() -> list[Engine]:
+    """The engines of DATABASE_REPLICA_URLS (empty without replicas)."""
+    return list(_replica_engines)
+
+
+def get_pool_status() -> dict:
+    """Return pool utilization and checkout wait-time metrics."""
+    pool = get_engine().pool
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "utilization": checked_out / capacity if capacity else None,
+        "checkouts": pool_metrics.checkouts,
+        "checkout_failures": pool_metrics.failures,
+        "checkout_wait_seconds_total": pool_metrics.wait_seconds_total,
+        "checkout_wait_seconds_max": pool_metrics.wait_seconds_max,
+    }
+
+
 def get_session():
-    return SessionLocal()
+    """
+    Return the current request's session: on the primary, or on its replica
+    when inventory_app.replicas routed the request to one.
+    """
+    replica = current_replica.get()
+    if replica is None:
+        return SessionLocal()
+    if not ReplicaSessionLocal.registry.has():
+        return ReplicaSessionLocal(bind=replica)
+    return ReplicaSessionLocal()
@@ -1,6 +1,23 @@
 from __future__ import annotations
 
-from flask import Response, jsonify
+from collections.abc import Callable
+from datetime import timedelta
+from functools import wraps
+
+from flask import Response, current_app, jsonify, request
+from sqlalchemy import Executable
+
+from inventory_app.db import SessionLocal, get_engine, get_session
+from inventory_app.services.idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    REPLAYED_HEADER,
+    claim_idempotency_key,
+    replay_error,
+    request_fingerprint,
+    save_response_statement,
+)
+from inventory_app.services.versions import entity_tag, read_version
 
 
 def ok(data, status: int = 200) -> Response:
@@ -10,3 +27,101 @@ def ok(data, status: int = 200) -> Response:
 def error(message: str, status: int = 400, **extra) -> Response:
     payload = {"error": message, **extra}
     return jsonify(payload), status
+
+
+def idempotent(view):
+    """
+    Honour an ``Idempotency-Key`` header on a mutating endpoint.
+
+    The request's session is bound to one connection-level transaction, in
+    which the key is claimed before the view runs. The view's own commits
+    only release savepoints; its writes, the claim and the stored response
+    commit together once it returns, so a crash can neither apply a write
+    without recording the key nor leave the key claimed. A retry with the
+    same key and request gets the stored response (with
+    ``Idempotent-Replayed: true``) without running the view. Error responses
+    roll everything back, so a failed request can be retried. Requests
+    without the header are unaffected.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return error(f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters", 400)
+
+        fingerprint = request_fingerprint(request.method, request.full_path, request.get_data())
+        ttl = timedelta(hours=current_app.config["IDEMPOTENCY_KEY_TTL_HOURS"])
+        conn = get_engine().connect()
+        transaction = conn.begin()
+        SessionLocal.remove()
+        s = SessionLocal(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            stored = claim_idempotency_key(s, key, fingerprint, ttl)
+            if stored is not None:
+                transaction.rollback()
+                if problem := replay_error(stored, fingerprint):
+                    return error(*problem)
+                return Response(
+                    stored.response_body,
+                    stored.status_code,
+                    content_type=stored.content_type,
+                    headers={REPLAYED_HEADER: "true"},
+                )
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code < 400:
+                s.execute(
+                    save_response_statement(key, response.status_code, response.content_type, response.get_data())
+                )
+                s.commit()
+                transaction.commit()
+            else:
+                transaction.rollback()
+            return response
+        finally:
+            SessionLocal.remove()
+            conn.close()
+
+    return wrapper
+
+
+def conditional(version_query: Callable[..., Executable]):
+    """
+    Answer a GET with ``304 Not Modified`` while its data is unchanged.
+
+    ``version_query`` is called with the view's arguments and returns a
+    statement for read_version() (an index probe or a primary-key lookup).
+    When the request's ``If-None-Match`` holds the current ETag, the view
+    is not run. Otherwise its 200 response gets a weak ``ETag`` (weak
+    because compression changes the bytes, not the data), ``Last-Modified``
+    and ``Cache-Control: no-cache`` so clients revalidate every time. When
+    the statement returns no row (e.g. a missing resource) the view runs
+    as usual. ``If-Modified-Since`` is not used for 304s: commits do not
+    land in timestamp order, so only the ETag is exact.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            row = get_session().execute(version_query(**kwargs)).one_or_none()
+            if row is None:
+                return view(*args, **kwargs)
+            version = read_version(row)
+            etag = entity_tag(request.full_path, version)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.last_modified = version.last_modified
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
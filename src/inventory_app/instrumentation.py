@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import pstats
+import random
+import re
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from flask import Flask, Response, current_app, g, request
+
+from inventory_app.db import QueryStats, current_query_stats
+from inventory_app.metrics import (
+    request_db_duration,
+    request_db_statements,
+    request_duration,
+    requests_total,
+)
+
+try:  # optional: pip install -e ".[profiling]"
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pragma: no cover - exercised when pyinstrument is absent
+    PyinstrumentProfiler = None
+
+request_log = logging.getLogger("inventory_app.requests")
+
+PROFILERS = ("auto", "pyinstrument", "cprofile")
+
+
+class RequestProfile:
+    """A profile of one sampled request (pyinstrument or cProfile)."""
+
+    def __init__(self, kind: str):
+        if kind == "auto":
+            kind = "pyinstrument" if PyinstrumentProfiler is not None else "cprofile"
+        if kind == "pyinstrument" and PyinstrumentProfiler is None:
+            raise RuntimeError("PROFILER=pyinstrument but pyinstrument is not installed")
+        self.kind = kind
+        self._profiler = PyinstrumentProfiler() if kind == "pyinstrument" else cProfile.Profile()
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def render(self) -> str:
+        if self.kind == "pyinstrument":
+            return self._profiler.output_text(unicode=True, color=False)
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        return out.getvalue()
+
+
+class RequestTiming:
+    """Per-request instrumentation state, kept on ``g`` between the hooks."""
+
+    __slots__ = ("profile", "start", "stats", "token")
+
+    def __init__(self, stats: QueryStats):
+        self.start = time.perf_counter()
+        self.stats = stats
+        self.token = current_query_stats.set(stats)
+        self.profile: RequestProfile | None = None
+
+
+def init_instrumentation(app: Flask) -> None:
+    """
+    Time every request and count its SQL statements.
+
+    Latency, statement count and statement time are recorded per endpoint
+    (served at /metrics) and returned in a Server-Timing header. Requests
+    slower than REQUEST_SLOW_MS are logged to ``inventory_app.requests``.
+    A PROFILE_SAMPLE_RATE fraction of requests is profiled, and the
+    profiles of those slower than PROFILE_SLOW_REQUEST_MS are written to
+    PROFILE_DIR. Streamed bodies are timed up to the first byte.
+    """
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+
+
+def _start_request() -> None:
+    timing = RequestTiming(QueryStats())
+    rate = current_app.config["PROFILE_SAMPLE_RATE"]
+    if rate > 0 and random.random() < rate:
+        profile = RequestProfile(current_app.config["PROFILER"])
+        try:
+            profile.start()
+        except (RuntimeError, ValueError):  # another profiler is active on this thread
+            profile = None
+        timing.profile = profile
+    g.request_timing = timing
+
+
+def _finish_request(response: Response) -> Response:
+    timing = g.pop("request_timing", None)
+    if timing is not None:
+        elapsed = _record(timing, response.status_code)
+        response.headers["Server-Timing"] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={timing.stats.seconds * 1000:.1f};desc="{timing.stats.statements} statements"'
+        )
+    return response
+
+
+def _teardown_request(exc: BaseException | None) -> None:
+    # after_request is skipped when the view raised
+    timing = g.pop("request_timing", None)
+    if timing is not None:
+        _record(timing, 500)
+
+
+def _record(timing: RequestTiming, status: int) -> float:
+    elapsed = time.perf_counter() - timing.start
+    current_query_stats.reset(timing.token)
+    stats = timing.stats
+    endpoint = request.endpoint or "<unmatched>"
+    labels = (request.method, endpoint)
+    request_duration.observe(labels, elapsed)
+    requests_total.inc((*labels, str(status)))
+    request_db_statements.observe(labels, stats.statements)
+    request_db_duration.observe(labels, stats.seconds)
+
+    config = current_app.config
+    slow_ms = config["REQUEST_SLOW_MS"]
+    if slow_ms > 0 and elapsed * 1000 >= slow_ms:
+        request_log.warning(
+            "slow request %s %s (%s) -> %d: %.1f ms, %d statements, %.1f ms in the database",
+            request.method, request.path, endpoint, status,
+            elapsed * 1000, stats.statements, stats.seconds * 1000,
+        )
+
+    if timing.profile is not None:
+        timing.profile.stop()
+        if elapsed * 1000 >= config["PROFILE_SLOW_REQUEST_MS"]:
+            _save_profile(timing.profile, endpoint, status, elapsed, stats)
+    return elapsed
+
+
+def _save_profile(profile: RequestProfile, endpoint: str, status: int, elapsed: float, stats: QueryStats) -> None:
+    directory = Path(current_app.config["PROFILE_DIR"])
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    path = directory / f"{stamp}-{re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint)}-{elapsed * 1000:.0f}ms.txt"
+    header = (
+        f"{request.method} {request.full_path} -> {status}\n"
+        f"{elapsed * 1000:.1f} ms, {stats.statements} statements, "
+        f"{stats.seconds * 1000:.1f} ms in the database ({profile.kind})\n\n"
+    )
+    path.write_text(header + profile.render(), encoding="utf-8")
+    request_log.info("profile of %s %s written to %s", request.method, request.path, path)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+from flask.json.provider import DefaultJSONProvider
+
+try:  # optional: pip install -e ".[fast]"
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, UUID):
+        return str(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any, *, sort_keys: bool = True, ensure_ascii: bool = True) -> bytes:
+    """Serialize ``obj`` to UTF-8 JSON bytes with the same rules as FastJSONProvider."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, ensure_ascii=ensure_ascii, sort_keys=sort_keys).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes UUID, Decimal and datetime natively.
+
+    List endpoints can hand plain rows (``Row._asdict()``) straight to
+    ``jsonify`` without per-field ``str()`` / ``float()`` / ``isoformat()``.
+    Datetimes are written as ISO 8601, matching the strings the routes
+    built by hand before. Uses orjson when it is installed and the stdlib
+    encoder otherwise.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs:
+            return dumps_bytes(obj, sort_keys=self.sort_keys).decode()
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, ensure_ascii=self.ensure_ascii)
+        return self._app.response_class(body, mimetype=self.mimetype)
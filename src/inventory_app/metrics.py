@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections.abc import Sequence
+
+# Request latency buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements per request; the upper buckets are where N+1 loops show up
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Prometheus counter with labels, aggregated in this process."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, labelvalues: tuple[str, ...] = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, values)} {total:g}")
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram with labels, aggregated in this process."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # per label set: [per-bucket counts (not cumulative), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, labelvalues: tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts, strict=True):
+                    cumulative += n
+                    le = _labels(self.labelnames, values, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = _labels(self.labelnames, values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {total:g}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {count}")
+        return lines
+
+
+REQUEST_LABELS = ("method", "endpoint")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request.", REQUEST_LABELS
+)
+requests_total = Counter(
+    "http_requests_total", "Requests handled, by response status.", (*REQUEST_LABELS, "status")
+)
+request_db_statements = Histogram(
+    "http_request_db_statements", "SQL statements executed per request.", REQUEST_LABELS, STATEMENT_BUCKETS
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per request.", REQUEST_LABELS
+)
+slow_queries_total = Counter(
+    "db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS."
+)
+
+REGISTRY = (request_duration, requests_total, request_db_statements, request_db_duration, slow_queries_total)
+
+
+def render_metrics(extra: Sequence[str] = ()) -> str:
+    """
+    The registry in the Prometheus text exposition format.
+
+    Values are per process: behind several gunicorn workers each scrape sees
+    one worker, so scrape workers individually (or run one per container).
+    """
+    lines = [line for metric in REGISTRY for line in metric.render()]
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,23 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID
 
-from sqlalchemy import DateTime, ForeignKey, Numeric, String, Text, UniqueConstraint, func, text
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Identity,
+    Integer,
+    LargeBinary,
+    Numeric,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -24,6 +38,7 @@ class Item(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    # change_xid (xid8, unmapped) is stamped by a trigger and versions GET /api/items
 
     stock: Mapped["Stock"] = relationship(back_populates="item", uselist=False)
 
@@ -40,6 +55,7 @@ class Stock(Base):
     shelf_location_note: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # change_xid (xid8, unmapped) is stamped by a trigger for the stock change stream and GET /api/stocks
 
     item: Mapped[Item] = relationship(back_populates="stock")
 
@@ -52,6 +68,16 @@ class Stocktake(Base):
     started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Also bumped by the line counter trigger on every statement on stocktake_lines
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    # Aggregates of the lines, kept current by statement-level triggers on stocktake_lines
+    lines_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    diff_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    counted_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    variance_total: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
 
     lines: Mapped[list["StocktakeLine"]] = relationship(
         back_populates="stocktake", cascade="all, delete-orphan"
@@ -70,6 +96,8 @@ class StocktakeLine(Base):
 
     expected_quantity: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
     counted_quantity: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
+    # NULL until the line is counted; counted_quantity mirrors expected_quantity until then
+    counted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     shelf_location: Mapped[str | None] = mapped_column(String, nullable=True)
     shelf_location_note: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -81,6 +109,25 @@ class StocktakeLine(Base):
     item: Mapped[Item] = relationship()
 
 
+class StocktakeCountBatch(Base):
+    """
+    A count batch applied from one scanner, keyed by the scanner's own sequence number.
+
+    Resubmitting a (device_id, sequence) pair is a no-op, so an offline
+    scanner can replay its whole queue after reconnecting.
+    """
+    __tablename__ = "stocktake_count_batches"
+
+    stocktake_id: Mapped[UUID] = mapped_column(
+        PG_UUID(as_uuid=True), ForeignKey("stocktakes.id", ondelete="CASCADE"), primary_key=True
+    )
+    device_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    sequence: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    applied: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    rejected: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
 class InventoryTransaction(Base):
     __tablename__ = "inventory_transactions"
 
@@ -92,6 +139,69 @@ class InventoryTransaction(Base):
     reverses_transaction_id: Mapped[UUID | None] = mapped_column(
         PG_UUID(as_uuid=True), ForeignKey("inventory_transactions.id", ondelete="SET NULL"), nullable=True
     )
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # insert time, not transaction start; see services.checkpoints.take_checkpoint
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.clock_timestamp())
 
     item: Mapped[Item] = relationship()
+
+
+class ItemDailyMovement(Base):
+    """
+    Per-item, per-day, per-txn_type rollup of inventory_transactions.
+
+    Maintained by the inventory_transactions_rollup trigger (one upsert per
+    ledger INSERT statement); never written by the application directly
+    except by services.reports.rebuild_daily_movements.
+    """
+    __tablename__ = "item_daily_movements"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    item_id: Mapped[UUID] = mapped_column(
+        PG_UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), primary_key=True
+    )
+    txn_type: Mapped[str] = mapped_column(Text, primary_key=True)
+    qty_in: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
+    qty_out: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
+    txn_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class StockCheckpoint(Base):
+    """A snapshot of every non-zero stocks.quantity at ``taken_at``."""
+    __tablename__ = "stock_checkpoints"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    taken_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, unique=True)
+    items_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
+
+class StockCheckpointLine(Base):
+    __tablename__ = "stock_checkpoint_lines"
+
+    checkpoint_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("stock_checkpoints.id", ondelete="CASCADE"), primary_key=True
+    )
+    item_id: Mapped[UUID] = mapped_column(
+        PG_UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), primary_key=True
+    )
+    quantity: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False)
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a mutating API request sent with an Idempotency-Key header.
+
+    A row is claimed (status_code NULL) in the request's own transaction and
+    filled in with the response once it has committed; retries with the same
+    key get the stored response back. Expired rows are purged by
+    `flask idempotency purge`.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    content_type: Mapped[str | None] = mapped_column(String, nullable=True)
+    response_body: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import base64
+import json
+from collections.abc import Callable, Mapping
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from sqlalchemy import ColumnElement, Row, Select, TextClause, text, tuple_
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(values: list) -> str:
+    """Encode keyset values into an opaque, URL-safe cursor string."""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def int_arg(args: Mapping[str, str], name: str, default: int) -> int:
+    """Read an integer query parameter, falling back to ``default`` when missing or invalid."""
+    try:
+        return int(args.get(name, default)) or default
+    except (TypeError, ValueError):
+        return default
+
+
+def row_estimate_query(table_name: str) -> TextClause:
+    """
+    Statement returning the planner's row estimate (pg_class.reltuples) for a table.
+
+    For a partitioned table the estimates of its analyzed partitions are
+    summed, since autovacuum never analyzes the parent itself.
+    """
+    return text(
+        "SELECT CASE WHEN c.relkind = 'p' THEN ("
+        "  SELECT sum(p.reltuples) FILTER (WHERE p.reltuples >= 0) FROM pg_inherits i"
+        "  JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid"
+        ") ELSE c.reltuples END::bigint "
+        "FROM pg_class c WHERE c.oid = to_regclass(:name)"
+    ).bindparams(name=table_name)
+
+
+def estimate_row_count(session: Session, table_name: str) -> int | None:
+    """
+    Return the planner's row estimate for a table, or None if it was never analyzed.
+
+    This reads pg_class.reltuples instead of running count(*), so it costs a
+    single catalog lookup regardless of table size.
+    """
+    estimate = session.execute(row_estimate_query(table_name)).scalar_one_or_none()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+class SortSpec(NamedTuple):
+    """A keyset-sortable column: the output field, the SQL expression and a cursor value parser."""
+    field: str
+    expression: ColumnElement
+    parse: Callable[[Any], Any]
+
+
+def _is_cursor_scalar(value: Any) -> bool:
+    # what encode_cursor writes for sort values and ids; JSON true/false decode as int subclasses
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def keyset_query(
+    query: Select,
+    *,
+    sort_key: str,
+    sort: SortSpec,
+    id_column: ColumnElement,
+    parse_id: Callable[[Any], Any],
+    cursor: str | None,
+    limit: int,
+) -> Select:
+    """
+    Restrict and order ``query`` for one keyset page on ``(sort.expression, id_column)``.
+
+    ``sort_key`` is the public sort name (``name`` or ``-name``); a leading
+    ``-`` sorts descending. It is embedded in the cursor so a cursor cannot
+    be replayed against a different ordering. One extra row is fetched to
+    detect whether another page exists; see keyset_result.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    descending = sort_key.startswith("-")
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 3 or values[0] != sort_key or not all(map(_is_cursor_scalar, values[1:])):
+            raise ValueError("Invalid cursor")
+        try:
+            after = (sort.parse(values[1]), parse_id(values[2]))
+        except (TypeError, AttributeError, ArithmeticError) as e:
+            raise ValueError("Invalid cursor") from e
+        key = tuple_(sort.expression, id_column)
+        query = query.where(key < after if descending else key > after)
+
+    if descending:
+        query = query.order_by(sort.expression.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort.expression.asc(), id_column.asc())
+    return query.limit(limit + 1)
+
+
+def keyset_result(
+    rows: list[Row],
+    *,
+    sort_key: str,
+    sort: SortSpec,
+    id_field: str,
+    limit: int,
+) -> tuple[list[Row], str | None]:
+    """Trim the look-ahead row and build the next cursor (None on the last page)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]._mapping
+    return rows, encode_cursor([sort_key, sort.parse(last[sort.field]), last[id_field]])
+
+
+def keyset_page(
+    session: Session,
+    query: Select,
+    *,
+    sort_key: str,
+    sort: SortSpec,
+    id_column: ColumnElement,
+    id_field: str,
+    parse_id: Callable[[Any], Any],
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[Row], str | None]:
+    """
+    Fetch one keyset page of ``query`` ordered by ``(sort.expression, id_column)``.
+
+    Returns:
+        The page rows and the cursor for the next page (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    query = keyset_query(
+        query,
+        sort_key=sort_key,
+        sort=sort,
+        id_column=id_column,
+        parse_id=parse_id,
+        cursor=cursor,
+        limit=limit,
+    )
+    rows = session.execute(query).all()
+    return keyset_result(rows, sort_key=sort_key, sort=sort, id_field=id_field, limit=limit)
+
+
+def parse_datetime(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def parse_decimal(value: Any) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
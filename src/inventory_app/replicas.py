@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+
+from flask import Flask, Response, g, request
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from inventory_app.db import ReplicaSessionLocal, current_replica, get_engine
+
+log = logging.getLogger("inventory_app.replicas")
+
+# GET endpoints named like this only read, so any replica that is fresh enough can serve them
+READ_ONLY_PREFIXES = ("list_", "get_")
+# ...and these read-only endpoints (blueprint.view), mostly the heavy reads replicas are for
+READ_ONLY_ENDPOINTS = frozenset({
+    "suggestions.suggestions",
+    "reports.movements",
+    "reports.stock_by_category",
+    "checkpoints.stocks_as_of",
+    "checkpoints.item_stock_as_of",
+    "exports.export_transactions",
+    "exports.export_stocks",
+    "exports.export_stocktake_lines",
+})
+
+# The primary's WAL position after a write, sent back by the client on its next reads
+LSN_COOKIE = "db_lsn"
+LSN_HEADER = "X-DB-LSN"
+# Replicas normally pass a write within milliseconds; this only bounds a stale cookie
+LSN_COOKIE_MAX_AGE = 300
+
+# Replayed position and replay lag. A server that is not in recovery (the primary under a
+# second URL) is never behind; neither is a standby that has replayed all it received,
+# whose last replay timestamp only tells how long the primary has been idle.
+STATUS_QUERY = text("""
+    SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+                ELSE pg_current_wal_lsn() END::text AS lsn,
+           CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+                THEN 0
+                ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END AS lag
+""")
+PRIMARY_LSN_QUERY = "SELECT pg_current_wal_lsn()::text"
+
+
+def parse_lsn(value: str) -> int:
+    """
+    Parse a WAL position (``16/B374D848``) into a comparable number.
+
+    Raises:
+        ValueError: If the value is not a WAL position
+    """
+    high, sep, low = value.partition("/")
+    if not sep or not 0 < len(high) <= 8 or not 0 < len(low) <= 8:
+        raise ValueError("not a WAL position")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+def is_read_only(endpoint: str | None) -> bool:
+    if endpoint is None:
+        return False
+    return endpoint.rpartition(".")[2].startswith(READ_ONLY_PREFIXES) or endpoint in READ_ONLY_ENDPOINTS
+
+
+class Replica:
+    """One read replica and what its last status check found."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.lsn = 0
+        self.lag = 0.0
+        self.checked_at: float | None = None
+        self.error: str | None = None
+        self.reads = 0
+
+    def check(self, timeout_ms: int) -> None:
+        try:
+            with self.engine.connect() as conn:
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+                row = conn.execute(STATUS_QUERY).one()
+        except SQLAlchemyError as e:
+            if self.error is None:
+                log.warning("read replica %s is unavailable: %s", self.name, e)
+            self.error = str(e).splitlines()[0]
+        else:
+            if self.error is not None:
+                log.info("read replica %s is available again", self.name)
+            self.error = None
+            # NULL before a standby has replayed anything
+            self.lsn = parse_lsn(row.lsn) if row.lsn else 0
+            self.lag = float(row.lag)
+        self.checked_at = time.monotonic()
+
+
+class ReadRouter:
+    """
+    Picks the replica that serves a read-only request, or None for the primary.
+
+    Replicas are taken in turn. One thread per replica checks its replay
+    position and lag every ``check_interval`` seconds (started with the
+    first request, like the stock change listener); requests only read the
+    last result. A replica is skipped while it is unreachable, while its
+    last result is more than two intervals old (a check that hangs), while
+    it is more than ``max_lag`` seconds behind (0 accepts any lag), and for
+    a client that has to see its own write, until a check has found it
+    replayed up to that write's WAL position. When no replica qualifies the
+    request stays on the primary.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = False
+        self.replicas: list[Replica] = []
+        self._turn = itertools.count()
+        self.max_lag = 5.0
+        self.check_interval = 1.0
+        self.fallbacks = {"unavailable": 0, "lagging": 0, "read_your_writes": 0}
+
+    def configure(self, engines: list[Engine], max_lag: float = 5.0, check_interval: float = 1.0) -> None:
+        with self._lock:
+            self.replicas = [Replica(engine) for engine in engines]
+            self.max_lag = max(max_lag, 0.0)
+            self.check_interval = max(check_interval, 0.05)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            for i, replica in enumerate(self.replicas):
+                threading.Thread(
+                    target=self._monitor, args=(replica,), name=f"replica-monitor-{i}", daemon=True
+                ).start()
+
+    def _monitor(self, replica: Replica) -> None:
+        while True:
+            started = time.monotonic()
+            replica.check(max(int(self.check_interval * 1000), 100))
+            time.sleep(max(self.check_interval - (time.monotonic() - started), 0))
+
+    def _skip_reason(self, replica: Replica, min_lsn: int) -> str | None:
+        checked_at = replica.checked_at
+        if checked_at is None or replica.error is not None:
+            return "unavailable"
+        if time.monotonic() - checked_at > 2 * self.check_interval:
+            return "unavailable"
+        if self.max_lag and replica.lag > self.max_lag:
+            return "lagging"
+        if min_lsn > replica.lsn:
+            return "read_your_writes"
+        return None
+
+    def choose(self, min_lsn: int = 0) -> Engine | None:
+        """
+        Return the engine of a replica fit to serve a read that must see
+        ``min_lsn`` (0 for any), or None to read from the primary. Never
+        waits on a replica.
+        """
+        replicas = self.replicas
+        if not replicas:
+            return None
+        if not self._running:
+            self._start()
+        start = next(self._turn)
+        reason = "unavailable"
+        for i in range(len(replicas)):
+            replica = replicas[(start + i) % len(replicas)]
+            reason = self._skip_reason(replica, min_lsn)
+            if reason is None:
+                replica.reads += 1
+                return replica.engine
+        with self._lock:
+            self.fallbacks[reason] += 1
+        return None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "max_lag_ms": self.max_lag * 1000,
+                "check_interval_ms": self.check_interval * 1000,
+                "fallbacks": dict(self.fallbacks),
+                "replicas": [
+                    {
+                        "url": r.name,
+                        "available": r.checked_at is not None and r.error is None,
+                        "error": r.error,
+                        "lag_ms": r.lag * 1000,
+                        "checked_ms_ago": (now - r.checked_at) * 1000 if r.checked_at is not None else None,
+                        "reads": r.reads,
+                        "pool_checked_out": r.engine.pool.checkedout(),
+                    }
+                    for r in self.replicas
+                ],
+            }
+
+
+# Shared by every request in the process; configured in create_app
+read_router = ReadRouter()
+
+
+def init_replica_routing(app: Flask) -> None:
+    """
+    Serve read-only requests from the DATABASE_REPLICA_URLS replicas.
+
+    GET requests to ``list_*`` / ``get_*`` endpoints and to
+    READ_ONLY_ENDPOINTS (suggestions, reports, as-of stock, exports) read
+    through get_session() or get_read_engine() from a replica chosen by
+    read_router. Every
+    other request uses the primary. A successful write answers with the
+    primary's WAL position in a ``db_lsn`` cookie and an ``X-DB-LSN``
+    header; reads that send it back (either way) are only served by a
+    replica that has replayed that far, so a client always sees its own
+    writes. Does nothing without replicas.
+    """
+    if not read_router.replicas:
+        return
+    app.before_request(_route_request)
+    app.after_request(_remember_write)
+    app.teardown_request(_teardown_request)
+
+
+def _required_lsn() -> int:
+    value = request.headers.get(LSN_HEADER) or request.cookies.get(LSN_COOKIE)
+    if not value:
+        return 0
+    try:
+        return parse_lsn(value)
+    except ValueError:
+        return 0
+
+
+def _route_request() -> None:
+    if request.method not in ("GET", "HEAD") or not is_read_only(request.endpoint):
+        return
+    engine = read_router.choose(_required_lsn())
+    if engine is not None:
+        g.replica_token = current_replica.set(engine)
+
+
+def _remember_write(response: Response) -> Response:
+    if request.method in ("GET", "HEAD", "OPTIONS") or response.status_code >= 400:
+        return response
+    try:
+        with get_engine().connect() as conn:
+            lsn = conn.exec_driver_sql(PRIMARY_LSN_QUERY).scalar_one()
+    except SQLAlchemyError as e:
+        log.warning("cannot read the primary's WAL position: %s", e)
+        return response
+    response.headers[LSN_HEADER] = lsn
+    response.set_cookie(LSN_COOKIE, lsn, max_age=LSN_COOKIE_MAX_AGE, httponly=True, samesite="Lax")
+    return response
+
+
+def _teardown_request(exc: BaseException | None) -> None:
+    token = g.pop("replica_token", None)
+    if token is not None:
+        ReplicaSessionLocal.remove()
+        current_replica.reset(token)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from uuid import UUID
+
+from flask import Blueprint, request
+from sqlalchemy import select
+
+from inventory_app.db import get_session
+from inventory_app.http import error, ok
+from inventory_app.models import Item, StockCheckpoint
+from inventory_app.services.checkpoints import (
+    AsOfBasis,
+    HistoryUnavailableError,
+    choose_basis,
+    stock_as_of_query,
+    take_checkpoint,
+)
+
+bp = Blueprint("checkpoints", __name__)
+
+
+def _as_of_arg() -> datetime:
+    """
+    Parse the required ``at`` ISO 8601 timestamp (UTC when no offset is given).
+
+    Raises:
+        ValueError: If ``at`` is missing or malformed
+    """
+    try:
+        at = datetime.fromisoformat(request.args["at"])
+    except (KeyError, ValueError) as e:
+        raise ValueError("at must be an ISO 8601 timestamp") from e
+    return at if at.tzinfo is not None else at.replace(tzinfo=UTC)
+
+
+def _basis_body(basis: AsOfBasis) -> dict:
+    return {
+        "direction": basis.direction,
+        "checkpoint_id": basis.checkpoint_id,
+        "checkpoint_taken_at": basis.taken_at,
+    }
+
+
+@bp.get("/checkpoints")
+def list_checkpoints():
+    rows = get_session().execute(
+        select(StockCheckpoint.id, StockCheckpoint.taken_at, StockCheckpoint.items_count)
+        .order_by(StockCheckpoint.taken_at.desc())
+        .limit(100)
+    ).all()
+    return ok([r._asdict() for r in rows])
+
+
+@bp.post("/checkpoints")
+def create_checkpoint():
+    """Snapshot all stock quantities now (normally run from `flask checkpoints take`)."""
+    s = get_session()
+    checkpoint = take_checkpoint(s)
+    s.commit()
+    return ok(
+        {"id": checkpoint.id, "taken_at": checkpoint.taken_at, "items_count": checkpoint.items_count},
+        201,
+    )
+
+
+@bp.get("/stocks/as-of")
+def stocks_as_of():
+    """Every item's quantity at ``at`` (optionally one ``category``)."""
+    try:
+        at = _as_of_arg()
+    except ValueError as e:
+        return error(str(e), 400)
+
+    s = get_session()
+    try:
+        basis = choose_basis(s, at)
+    except HistoryUnavailableError as e:
+        return error(str(e), 409)
+    rows = s.execute(
+        stock_as_of_query(basis, at, category=request.args.get("category") or None)
+    ).all()
+    return ok({"at": at, "basis": _basis_body(basis), "items": [r._asdict() for r in rows]})
+
+
+@bp.get("/items/<uuid:item_id>/stock-as-of")
+def item_stock_as_of(item_id: UUID):
+    """One item's quantity at ``at``, from the nearest checkpoint plus the ledger in between."""
+    try:
+        at = _as_of_arg()
+    except ValueError as e:
+        return error(str(e), 400)
+
+    s = get_session()
+    if s.get(Item, item_id) is None:
+        return error("Item not found", 404)
+    try:
+        basis = choose_basis(s, at)
+    except HistoryUnavailableError as e:
+        return error(str(e), 409)
+    row = s.execute(stock_as_of_query(basis, at, item_id=item_id)).one()
+    return ok({"at": at, "basis": _basis_body(basis), **row._asdict()})
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from flask import Blueprint, Response, request
+from sqlalchemy import Select, func, select
+
+from inventory_app.db import get_read_engine
+from inventory_app.http import error
+from inventory_app.models import InventoryTransaction, Item, Stock, StocktakeLine
+from inventory_app.services.stock_changes import HORIZON_QUERY, changed_between, parse_token
+
+bp = Blueprint("exports", __name__)
+
+# Rows fetched per server-side cursor round-trip and written per output chunk
+EXPORT_CHUNK_SIZE = 2000
+
+# Sent with every stock export; pass it back as ``since_token`` for the stocks changed since
+EXPORT_TOKEN_HEADER = "X-Export-Token"
+
+
+def _plain(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _stream(stmt: Select, fmt: str, filename: str) -> Response:
+    """
+    Stream the rows of a Core select as NDJSON or CSV.
+
+    The query runs on its own connection with a server-side cursor
+    (yield_per), so only one chunk of rows is held in memory at a time. The
+    engine (the request's replica, if routed to one) is picked here: the
+    body is generated after the request has ended.
+    """
+    engine = get_read_engine()
+
+    def generate():
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=EXPORT_CHUNK_SIZE).execute(stmt)
+            columns = list(result.keys())
+            if fmt == "csv":
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                writer.writerow(columns)
+                for rows in result.partitions():
+                    writer.writerows([[_plain(v) for v in row] for row in rows])
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+                yield buf.getvalue()
+            else:
+                for rows in result.partitions():
+                    yield "".join(
+                        json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False) + "\n"
+                        for row in rows
+                    )
+
+    return Response(
+        generate(),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+def _export_args() -> tuple[str, datetime | None]:
+    """
+    Parse ``format`` and ``since`` query parameters.
+
+    Raises:
+        ValueError: If either parameter is invalid
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError("format must be one of: ndjson, csv")
+    since = request.args.get("since")
+    if since:
+        try:
+            return fmt, datetime.fromisoformat(since)
+        except ValueError as e:
+            raise ValueError("since must be an ISO 8601 timestamp") from e
+    return fmt, None
+
+
+@bp.get("/exports/transactions")
+def export_transactions():
+    """
+    Export the ledger (oldest first); ``since`` filters on created_at.
+
+    created_at is the writing transaction's start time, not its commit
+    time: a row committed after a pull can carry a created_at before that
+    pull's newest row. Incremental pulls have to overlap (start ``since``
+    at least the longest write transaction earlier) and drop the rows they
+    already have by transaction_id.
+    """
+    try:
+        fmt, since = _export_args()
+    except ValueError as e:
+        return error(str(e), 400)
+
+    stmt = (
+        select(
+            InventoryTransaction.id.label("transaction_id"),
+            InventoryTransaction.item_id,
+            Item.sku.label("item_sku"),
+            InventoryTransaction.delta_quantity,
+            InventoryTransaction.txn_type,
+            InventoryTransaction.reason,
+            InventoryTransaction.reverses_transaction_id,
+            InventoryTransaction.created_at,
+        )
+        .join(Item, Item.id == InventoryTransaction.item_id)
+        .order_by(InventoryTransaction.created_at.asc(), InventoryTransaction.id.asc())
+    )
+    if since:
+        stmt = stmt.where(InventoryTransaction.created_at >= since)
+    return _stream(stmt, fmt, "transactions")
+
+
+@bp.get("/exports/stocks")
+def export_stocks():
+    """
+    Export the stock list.
+
+    Every response carries an ``X-Export-Token``. Passed back as
+    ``since_token``, it selects the stocks whose quantity or shelf location
+    changed since, by commit order (see services.stock_changes), so no
+    change is missed however late it commits; a row may come again in the
+    next pull, so apply rows by id. ``since`` filters on updated_at (a
+    transaction start time) and can miss late commits.
+    """
+    try:
+        fmt, since = _export_args()
+        since_token = request.args.get("since_token")
+        after = parse_token(since_token) if since_token else None
+    except ValueError as e:
+        return error(str(e), 400)
+
+    stmt = (
+        select(
+            Stock.id,
+            Stock.item_id,
+            Item.sku,
+            Item.name,
+            Item.unit,
+            Stock.quantity,
+            Stock.shelf_location,
+            Stock.shelf_location_note,
+            Stock.updated_at,
+        )
+        .join(Item, Item.id == Stock.item_id)
+        .order_by(Stock.id.asc())
+    )
+    if since:
+        stmt = stmt.where(Stock.updated_at >= since)
+    # taken before the export runs: every stamp below it is already visible to the export
+    with get_read_engine().connect() as conn:
+        horizon = int(conn.execute(HORIZON_QUERY).scalar_one())
+    if after is not None:
+        stmt = stmt.where(changed_between(after, horizon))
+    response = _stream(stmt, fmt, "stocks")
+    response.headers[EXPORT_TOKEN_HEADER] = str(horizon)
+    return response
+
+
+@bp.get("/exports/stocktake-lines")
+def export_stocktake_lines():
+    """
+    Export stocktake lines; filter by ``stocktake_id`` and/or ``since``.
+
+    ``since`` matches lines counted (or, if never counted, created) since
+    then, so recounts are exported again. The times are transaction start
+    times: overlap incremental pulls as for /exports/transactions.
+    """
+    try:
+        fmt, since = _export_args()
+    except ValueError as e:
+        return error(str(e), 400)
+
+    stmt = (
+        select(
+            StocktakeLine.id,
+            StocktakeLine.stocktake_id,
+            StocktakeLine.item_id,
+            Item.sku,
+            Item.name,
+            StocktakeLine.expected_quantity,
+            StocktakeLine.counted_quantity,
+            StocktakeLine.shelf_location,
+            StocktakeLine.shelf_location_note,
+            StocktakeLine.note,
+            StocktakeLine.counted_at,
+            StocktakeLine.created_at,
+        )
+        .join(Item, Item.id == StocktakeLine.item_id)
+        .order_by(StocktakeLine.id.asc())
+    )
+    stocktake_id = request.args.get("stocktake_id")
+    if stocktake_id:
+        try:
+            stmt = stmt.where(StocktakeLine.stocktake_id == UUID(stocktake_id))
+        except ValueError:
+            return error("stocktake_id must be a UUID", 400)
+    if since:
+        stmt = stmt.where(func.coalesce(StocktakeLine.counted_at, StocktakeLine.created_at) >= since)
+    return _stream(stmt, fmt, "stocktake_lines")
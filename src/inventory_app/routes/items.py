@@ -1,23 +1,110 @@
 from __future__ import annotations
 
+import io
+from collections.abc import Mapping
 from uuid import UUID
 
 from flask import Blueprint, request
-from sqlalchemy import select
+from sqlalchemy import Select, select
 
 from inventory_app.db import get_session
-from inventory_app.http import error, ok
+from inventory_app.http import conditional, error, ok
 from inventory_app.models import Item, Stock
+from inventory_app.pagination import SortSpec, keyset_page, parse_datetime
 from inventory_app.schemas.items import ItemCreate, ItemOut
+from inventory_app.services.imports import ImportFormatError, detect_format, import_items
+from inventory_app.services.versions import row_version_query, table_version_query
 
 bp = Blueprint("items", __name__)
 
 
+# Columns of ItemOut (plus timestamps), selected directly so list endpoints skip ORM hydration
+ITEM_COLUMNS = (
+    Item.id,
+    Item.sku,
+    Item.name,
+    Item.unit,
+    Item.category,
+    Item.usage,
+    Item.manufacturer,
+    Item.created_at,
+    Item.updated_at,
+)
+
+ITEM_SORTS = {
+    "name": SortSpec("name", Item.name, str),
+    "created_at": SortSpec("created_at", Item.created_at, parse_datetime),
+    "updated_at": SortSpec("updated_at", Item.updated_at, parse_datetime),
+}
+
+
+def filter_items(query: Select, args: Mapping[str, str]) -> Select:
+    """
+    Apply ``category``, ``manufacturer`` and ``updated_since`` filters.
+
+    Raises:
+        ValueError: If updated_since is not an ISO 8601 timestamp
+    """
+    if category := args.get("category"):
+        query = query.where(Item.category == category)
+    if manufacturer := args.get("manufacturer"):
+        query = query.where(Item.manufacturer == manufacturer)
+    if updated_since := args.get("updated_since"):
+        query = query.where(Item.updated_at >= parse_datetime(updated_since))
+    return query
+
+
 @bp.get("/items")
+@conditional(lambda: table_version_query("items"))
 def list_items():
+    """
+    List items.
+
+    Without ``cursor`` every matching item is returned as a plain list (the
+    original behaviour). With ``cursor`` (empty for the first page) the
+    response is ``{"items": [...], "meta": {...}}`` paged by a keyset on
+    ``sort`` (``name``, ``created_at`` or ``updated_at``; prefix ``-`` for
+    descending) and ``limit``.
+    """
     s = get_session()
-    q = s.execute(select(Item).order_by(Item.id.desc())).scalars().all()
-    return ok([ItemOut.from_orm(i).model_dump() for i in q])
+    try:
+        query = filter_items(select(*ITEM_COLUMNS), request.args)
+    except ValueError:
+        return error("updated_since must be an ISO 8601 timestamp", 400)
+
+    if "cursor" not in request.args:
+        rows = s.execute(query.order_by(Item.id.desc())).all()
+        return ok([r._asdict() for r in rows])
+
+    sort_key = request.args.get("sort", "name")
+    sort = ITEM_SORTS.get(sort_key.removeprefix("-"))
+    if sort is None:
+        return error(f"sort must be one of: {', '.join(ITEM_SORTS)}", 400)
+    limit = min(max(request.args.get("limit", default=50, type=int) or 50, 1), 200)
+
+    try:
+        rows, next_cursor = keyset_page(
+            s,
+            query,
+            sort_key=sort_key,
+            sort=sort,
+            id_column=Item.id,
+            id_field="id",
+            parse_id=UUID,
+            cursor=request.args.get("cursor"),
+            limit=limit,
+        )
+    except ValueError:
+        return error("Invalid cursor", 400)
+
+    meta = {
+        "limit": limit,
+        "count": len(rows),
+        "sort": sort_key,
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
+    }
+    return ok({"items": [r._asdict() for r in rows], "meta": meta})
 
 
 @bp.post("/items")
@@ -45,7 +132,46 @@ def create_item():
     return ok(ItemOut.from_orm(item).model_dump(), 201)
 
 
+@bp.post("/items/import")
+def bulk_import_items():
+    """
+    Upsert items by SKU from a CSV or XLSX catalogue.
+
+    The file is the multipart ``file`` field or the raw request body; its
+    format comes from the file name or content type unless ``format`` is
+    given. Invalid rows are skipped and listed in ``errors``; the valid
+    ones are applied in one transaction.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        stream, filename, content_type = upload.stream, upload.filename, upload.content_type
+    else:
+        stream, filename, content_type = io.BufferedReader(request.stream), None, request.content_type
+
+    s = get_session()
+    try:
+        fmt = request.args.get("format") or detect_format(filename, content_type)
+        if fmt == "xlsx" and not stream.seekable():  # zip archives are read from the end
+            stream = io.BytesIO(stream.read())
+        result = import_items(s, stream, fmt)
+    except ImportFormatError as e:
+        s.rollback()
+        return error(str(e), 400)
+    s.commit()
+    return ok(
+        {
+            "rows": result.rows,
+            "inserted": result.inserted,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+            "failed": len(result.errors),
+            "errors": [e._asdict() for e in result.errors],
+        }
+    )
+
+
 @bp.get("/items/<uuid:item_id>")
+@conditional(lambda item_id: row_version_query("items", item_id))
 def get_item(item_id: UUID):
     s = get_session()
     item = s.get(Item, item_id)
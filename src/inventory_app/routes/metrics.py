@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from flask import Blueprint, Response
+
+from inventory_app.db import get_pool_status
+from inventory_app.metrics import render_metrics
+
+bp = Blueprint("metrics", __name__)
+
+
+def _pool_lines() -> list[str]:
+    pool = get_pool_status()
+    series = (
+        ("db_pool_size", "gauge", "Configured pool size.", pool["size"]),
+        ("db_pool_checked_out", "gauge", "Connections currently checked out.", pool["checked_out"]),
+        ("db_pool_checkouts_total", "counter", "Successful connection checkouts.", pool["checkouts"]),
+        ("db_pool_checkout_failures_total", "counter", "Checkouts that timed out or failed.",
+         pool["checkout_failures"]),
+        ("db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection.",
+         pool["checkout_wait_seconds_total"]),
+    )
+    lines = []
+    for name, kind, documentation, value in series:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value:g}"]
+    return lines
+
+
+@bp.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (per-process values; see metrics.render_metrics)."""
+    return Response(render_metrics(_pool_lines()), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import time
+from uuid import UUID
+
+from flask import Blueprint, request
+
+from inventory_app.db import get_session
+from inventory_app.http import error, ok
+from inventory_app.pagination import int_arg
+from inventory_app.services.reconciliation import reconcile, write_adjustments
+
+bp = Blueprint("reconciliation", __name__)
+
+MAX_CHUNKS = 1024
+
+
+def _full_pass(chunks: int) -> tuple[list, float]:
+    start = time.perf_counter()
+    found = [d for result in reconcile(get_session(), chunks=chunks) for d in result.discrepancies]
+    return found, time.perf_counter() - start
+
+
+@bp.get("/reconciliation")
+def get_reconciliation():
+    """
+    Compare stocks with the ledger and list the items that disagree.
+
+    Runs the ranges one after another in this worker; use
+    `flask ledger reconcile --workers N` for large ledgers.
+    """
+    chunks = min(max(int_arg(request.args, "chunks", 16), 1), MAX_CHUNKS)
+    found, seconds = _full_pass(chunks)
+    return ok({
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "discrepancies_count": len(found),
+        "discrepancies": [d._asdict() for d in found],
+    })
+
+
+@bp.post("/reconciliation/adjustments")
+def create_reconciliation_adjustments():
+    """
+    Write ADJUST ledger rows so the ledger matches stocks.
+
+    Body: ``{"item_ids": [...]}`` to correct only those items (typically
+    from a previous GET); without it a full pass is run first.
+    """
+    payload = request.get_json(silent=True) or {}
+    s = get_session()
+    if "item_ids" in payload:
+        try:
+            item_ids = [UUID(str(i)) for i in payload["item_ids"]]
+        except (TypeError, ValueError):
+            return error("item_ids must be a list of UUIDs", 400)
+    else:
+        found, _ = _full_pass(16)
+        item_ids = [d.item_id for d in found]
+        s.rollback()
+
+    corrected = write_adjustments(s, item_ids)
+    s.commit()
+    return ok({
+        "adjusted_count": len(corrected),
+        "adjusted": [d._asdict() for d in corrected],
+    }, 201 if corrected else 200)
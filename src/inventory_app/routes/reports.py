@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from uuid import UUID
+
+from flask import Blueprint, request
+
+from inventory_app.db import get_session
+from inventory_app.http import error, ok
+from inventory_app.pagination import int_arg
+from inventory_app.services.reports import (
+    ledger_today,
+    movement_report_query,
+    stock_by_category_query,
+)
+
+bp = Blueprint("reports", __name__)
+
+MAX_REPORT_DAYS = 3660
+
+
+def _report_window() -> tuple[date, date]:
+    """
+    Parse ``since`` / ``until`` (ISO dates) or ``days`` (default 90, ending today).
+
+    Raises:
+        ValueError: If a date is malformed or the window is empty or too long
+    """
+    days = int_arg(request.args, "days", 90)
+    if not 1 <= days <= MAX_REPORT_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_REPORT_DAYS}")
+    try:
+        until = date.fromisoformat(request.args["until"]) if "until" in request.args else ledger_today()
+        since = date.fromisoformat(request.args["since"]) if "since" in request.args else None
+    except ValueError as e:
+        raise ValueError("since / until must be ISO 8601 dates") from e
+    if since is None:
+        try:
+            since = until - timedelta(days=days - 1)
+        except OverflowError as e:
+            raise ValueError("the report window starts before the first supported date") from e
+    if since > until:
+        raise ValueError("since must not be after until")
+    if (until - since).days >= MAX_REPORT_DAYS:
+        raise ValueError(f"the report window must be shorter than {MAX_REPORT_DAYS} days")
+    return since, until
+
+
+@bp.get("/reports/movements")
+def movements():
+    """
+    Stock movement totals from the daily rollup.
+
+    ``group_by`` is ``category`` (default), ``item`` or ``day``; the window is
+    ``since`` / ``until`` or the last ``days`` days (default 90). ``category``
+    and ``item_id`` narrow the report. Days are ledger_day() reporting days (UTC).
+    """
+    try:
+        since, until = _report_window()
+    except ValueError as e:
+        return error(str(e), 400)
+    try:
+        item_id = UUID(request.args["item_id"]) if request.args.get("item_id") else None
+    except ValueError:
+        return error("item_id must be a UUID", 400)
+
+    try:
+        query = movement_report_query(
+            group_by=request.args.get("group_by", "category"),
+            since=since,
+            until=until,
+            category=request.args.get("category") or None,
+            item_id=item_id,
+        )
+    except ValueError as e:
+        return error(str(e), 400)
+
+    rows = get_session().execute(query).all()
+    return ok(
+        {
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "rows": [r._asdict() for r in rows],
+        }
+    )
+
+
+@bp.get("/reports/stock-by-category")
+def stock_by_category():
+    """Current on-hand quantity, item count and out-of-stock count per category."""
+    rows = get_session().execute(stock_by_category_query()).all()
+    return ok([r._asdict() for r in rows])
@@ -1,38 +1,196 @@
 from __future__ import annotations
 
-from flask import Blueprint, request
-from sqlalchemy import select
+from collections.abc import Iterator, Mapping
+from decimal import Decimal, InvalidOperation
+from uuid import UUID
+
+from flask import Blueprint, Response, current_app, request
+from sqlalchemy import Select, func, select
 
 from inventory_app.db import get_session
-from inventory_app.http import error, ok
+from inventory_app.http import conditional, error, ok
+from inventory_app.jsonprovider import dumps_bytes
 from inventory_app.models import Item, Stock
+from inventory_app.pagination import SortSpec, keyset_page, parse_datetime, parse_decimal
+from inventory_app.services.stock_changes import (
+    StockSubscription,
+    StreamUnavailableError,
+    parse_token,
+    stock_change_hub,
+)
+from inventory_app.services.versions import table_version_query
 
 bp = Blueprint("stocks", __name__)
 
 
+STOCK_COLUMNS = (
+    Stock.id,
+    Stock.item_id,
+    Item.sku,
+    Item.name,
+    Item.unit,
+    Stock.quantity,
+    Stock.shelf_location,
+    Stock.shelf_location_note,
+    Stock.updated_at,
+)
+
+STOCK_SORTS = {
+    "name": SortSpec("name", Item.name, str),
+    "quantity": SortSpec("quantity", Stock.quantity, parse_decimal),
+    "shelf_location": SortSpec("shelf_location", func.coalesce(Stock.shelf_location, ""), lambda v: v or ""),
+    "updated_at": SortSpec("updated_at", Stock.updated_at, parse_datetime),
+}
+
+
+def filter_stocks(query: Select, args: Mapping[str, str]) -> Select:
+    """
+    Apply ``category``, ``manufacturer``, ``shelf_location_prefix``,
+    ``max_quantity`` (``0`` for out-of-stock, ``n`` for low stock) and
+    ``updated_since`` filters.
+
+    Raises:
+        ValueError: If a filter value cannot be parsed
+    """
+    if category := args.get("category"):
+        query = query.where(Item.category == category)
+    if manufacturer := args.get("manufacturer"):
+        query = query.where(Item.manufacturer == manufacturer)
+    if prefix := args.get("shelf_location_prefix"):
+        query = query.where(Stock.shelf_location.startswith(prefix, autoescape=True))
+    if (max_quantity := args.get("max_quantity")) is not None:
+        try:
+            query = query.where(Stock.quantity <= Decimal(max_quantity))
+        except InvalidOperation as e:
+            raise ValueError("max_quantity must be a number") from e
+    if updated_since := args.get("updated_since"):
+        try:
+            query = query.where(Stock.updated_at >= parse_datetime(updated_since))
+        except ValueError as e:
+            raise ValueError("updated_since must be an ISO 8601 timestamp") from e
+    return query
+
+
 @bp.get("/stocks")
+@conditional(lambda: table_version_query("items", "stocks"))
 def list_stocks():
+    """
+    List stocks joined with their items.
+
+    Without ``cursor`` every matching row is returned as a plain list ordered
+    by item name (the original behaviour). With ``cursor`` (empty for the
+    first page) the response is ``{"items": [...], "meta": {...}}`` paged by
+    a keyset on ``sort`` (``name``, ``quantity``, ``shelf_location`` or
+    ``updated_at``; prefix ``-`` for descending) and ``limit``.
+    """
     s = get_session()
-    rows = (
-        s.execute(select(Stock, Item).join(Item, Item.id == Stock.item_id).order_by(Item.name.asc()))
-        .all()
-    )
-    data = []
-    for st, it in rows:
-        data.append(
-            {
-                "id": st.id,
-                "item_id": str(it.id),
-                "sku": it.sku,
-                "name": it.name,
-                "unit": it.unit,
-                "quantity": float(st.quantity or 0),
-                "shelf_location": st.shelf_location,
-                "shelf_location_note": st.shelf_location_note,
-                "updated_at": st.updated_at.isoformat() if st.updated_at else None,
-            }
+    try:
+        query = filter_stocks(select(*STOCK_COLUMNS).join(Item, Item.id == Stock.item_id), request.args)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    if "cursor" not in request.args:
+        rows = s.execute(query.order_by(Item.name.asc())).all()
+        return ok([r._asdict() for r in rows])
+
+    sort_key = request.args.get("sort", "name")
+    sort = STOCK_SORTS.get(sort_key.removeprefix("-"))
+    if sort is None:
+        return error(f"sort must be one of: {', '.join(STOCK_SORTS)}", 400)
+    limit = min(max(request.args.get("limit", default=50, type=int) or 50, 1), 200)
+
+    try:
+        rows, next_cursor = keyset_page(
+            s,
+            query,
+            sort_key=sort_key,
+            sort=sort,
+            id_column=Stock.id,
+            id_field="id",
+            parse_id=int,
+            cursor=request.args.get("cursor"),
+            limit=limit,
         )
-    return ok(data)
+    except ValueError:
+        return error("Invalid cursor", 400)
+
+    meta = {
+        "limit": limit,
+        "count": len(rows),
+        "sort": sort_key,
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
+    }
+    return ok({"items": [r._asdict() for r in rows], "meta": meta})
+
+
+def _sse(event: str, data, token: int) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (token, event.encode(), dumps_bytes(data))
+
+
+def _stock_change_events(subscription: StockSubscription, heartbeat: float) -> Iterator[bytes]:
+    try:
+        rows, token = subscription.take(0)
+        if rows:  # changes since Last-Event-ID
+            yield _sse("changes", rows, token)
+        yield _sse("ready", {"token": str(token)}, token)
+        while True:
+            rows, latest = subscription.take(heartbeat)
+            if rows:
+                yield _sse("changes", rows, latest)
+            elif latest != token:
+                # no matching changes, but the resume point moved on
+                yield b"id: %d\n\n" % latest
+            else:
+                yield b": keepalive\n\n"
+            token = latest
+    finally:
+        # runs when the server closes the response after the client disconnects
+        stock_change_hub.unsubscribe(subscription)
+
+
+@bp.get("/stocks/changes")
+def stream_stock_changes():
+    """
+    Server-Sent Events stream of committed stock changes.
+
+    Each ``changes`` event carries a list of /api/stocks rows: the current
+    state of every stock whose quantity or shelf location changed since the
+    previous event, in commit order, one row per item however many writes
+    it took. Open the stream, wait for ``ready``, then fetch /api/stocks
+    once and apply the rows by ``item_id``. Filters: ``item_id``
+    (repeatable or comma-separated) and ``shelf_location_prefix``.
+
+    Every event id is a resume token. EventSource sends the last one back
+    as ``Last-Event-ID`` when it reconnects (``last_event_id`` does the
+    same as a query parameter), and the stream then starts with the
+    changes the client missed.
+    """
+    token = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        since = parse_token(token) if token else None
+    except ValueError:
+        return error("Last-Event-ID must be an event id sent by this stream", 400)
+    try:
+        item_ids = [UUID(i) for v in request.args.getlist("item_id") for i in v.split(",") if i.strip()]
+    except ValueError:
+        return error("item_id must be a UUID", 400)
+
+    try:
+        subscription = stock_change_hub.subscribe(
+            get_session(),
+            since,
+            item_ids=item_ids,
+            shelf_location_prefix=request.args.get("shelf_location_prefix") or None,
+        )
+    except StreamUnavailableError as e:
+        return error(str(e), 503)
+
+    return Response(
+        _stock_change_events(subscription, current_app.config["STOCK_STREAM_HEARTBEAT_SECONDS"]),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @bp.patch("/stocks/<int:stock_id>")
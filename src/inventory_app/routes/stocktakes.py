@@ -1,71 +1,158 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
+from typing import NamedTuple
 from uuid import UUID
 
 from flask import Blueprint, request
-from sqlalchemy import and_, func, select
+from pydantic import ValidationError
+from sqlalchemy import Row, Select, func, select
 
 from inventory_app.db import get_session
-from inventory_app.http import error, ok
-from inventory_app.models import Item, Stock, Stocktake, StocktakeLine
-from inventory_app.schemas.stocktakes import StocktakeCreate
-from inventory_app.services.inventory import InsufficientStockError, apply_inventory_delta
+from inventory_app.http import conditional, error, idempotent, ok
+from inventory_app.models import Item, Stocktake, StocktakeLine
+from inventory_app.pagination import SortSpec, int_arg, keyset_query, keyset_result
+from inventory_app.schemas.stocktakes import StocktakeCountRequest, StocktakeCreate
+from inventory_app.services.stocktakes import (
+    StocktakeAlreadyConfirmedError,
+    StocktakeNotFoundError,
+    apply_stocktake_counts,
+    generate_stocktake_lines,
+    record_counts,
+)
+from inventory_app.services.versions import row_version_query
 
 bp = Blueprint("stocktakes", __name__)
 
 
-@bp.get("/stocktakes")
-def list_stocktakes():
-    s = get_session()
+STOCKTAKE_LINE_SORTS = {
+    "name": SortSpec("name", Item.name, str),
+    "id": SortSpec("id", StocktakeLine.id, int),
+}
 
-    lines_count_sq = (
-        select(func.count(StocktakeLine.id))
-        .where(StocktakeLine.stocktake_id == Stocktake.id)
-        .correlate(Stocktake)
-        .scalar_subquery()
-    )
 
-    diff_count_sq = (
-        select(func.count(StocktakeLine.id))
-        .where(
-            and_(
-                StocktakeLine.stocktake_id == Stocktake.id,
-                StocktakeLine.counted_quantity != StocktakeLine.expected_quantity,
-            )
+class LinePage(NamedTuple):
+    """The lines query of a stocktake detail request; ``sort`` is None for the plain (unpaged) list."""
+    query: Select
+    sort_key: str | None = None
+    sort: SortSpec | None = None
+    limit: int | None = None
+
+
+def stocktake_list_query() -> Select:
+    # the counters are maintained by triggers on stocktake_lines, so no line is read here
+    return select(
+        Stocktake.id,
+        Stocktake.title,
+        Stocktake.started_at,
+        Stocktake.completed_at,
+        Stocktake.created_at,
+        Stocktake.lines_count,
+        Stocktake.diff_count,
+        Stocktake.counted_count,
+        Stocktake.variance_total,
+    ).order_by(Stocktake.id.desc())
+
+
+def stocktake_lines_query(stocktake_id: UUID, *, diff_only: bool = False) -> Select:
+    # include shelf_location_note per request
+    query = (
+        select(
+            StocktakeLine.id,
+            StocktakeLine.item_id,
+            Item.sku,
+            Item.name,
+            Item.unit,
+            StocktakeLine.expected_quantity,
+            StocktakeLine.counted_quantity,
+            StocktakeLine.shelf_location,
+            StocktakeLine.shelf_location_note,
+            StocktakeLine.note,
+            StocktakeLine.counted_at,
+            (StocktakeLine.counted_quantity != StocktakeLine.expected_quantity).label("is_diff"),
         )
-        .correlate(Stocktake)
-        .scalar_subquery()
+        .join(Item, Item.id == StocktakeLine.item_id)
+        .where(StocktakeLine.stocktake_id == stocktake_id)
     )
+    if diff_only:
+        # matches the partial index ix_stocktake_lines_diff
+        query = query.where(StocktakeLine.counted_quantity != StocktakeLine.expected_quantity)
+    return query
 
-    rows = s.execute(
-        select(
-            Stocktake.id,
-            Stocktake.title,
-            Stocktake.started_at,
-            Stocktake.completed_at,
-            Stocktake.created_at,
-            lines_count_sq.label("lines_count"),
-            diff_count_sq.label("diff_count"),
-        ).order_by(Stocktake.id.desc())
-    ).all()
-
-    data = []
-    for r in rows:
-        data.append(
-            {
-                "id": str(r.id),
-                "title": r.title,
-                "started_at": r.started_at.isoformat() if r.started_at else None,
-                "completed_at": r.completed_at.isoformat() if r.completed_at else None,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-                "lines_count": int(r.lines_count or 0),
-                "diff_count": int(r.diff_count or 0),
-            }
+
+def stocktake_lines_page(stocktake_id: UUID, args: Mapping[str, str]) -> LinePage:
+    """
+    Build the lines query for GET /stocktakes/<id> from its query parameters.
+
+    ``diff_only=true`` keeps only lines whose count differs from the
+    expected quantity. Without ``cursor`` every line is returned ordered by
+    item name (the original behaviour); with ``cursor`` (empty for the first
+    page) lines are paged by a keyset on ``sort`` (``name`` or ``id``;
+    prefix ``-`` for descending) and ``limit``.
+
+    Raises:
+        ValueError: If ``sort`` or ``cursor`` is invalid
+    """
+    diff_only = args.get("diff_only", "").lower() in ("1", "true", "yes")
+    query = stocktake_lines_query(stocktake_id, diff_only=diff_only)
+    if "cursor" not in args:
+        return LinePage(query.order_by(Item.name.asc()))
+
+    sort_key = args.get("sort", "name")
+    sort = STOCKTAKE_LINE_SORTS.get(sort_key.removeprefix("-"))
+    if sort is None:
+        raise ValueError(f"sort must be one of: {', '.join(STOCKTAKE_LINE_SORTS)}")
+    limit = min(max(int_arg(args, "limit", 100), 1), 500)
+    try:
+        query = keyset_query(
+            query,
+            sort_key=sort_key,
+            sort=sort,
+            id_column=StocktakeLine.id,
+            parse_id=int,
+            cursor=args.get("cursor"),
+            limit=limit,
         )
-    return ok(data)
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+    return LinePage(query, sort_key, sort, limit)
+
+
+def stocktake_detail_body(st: Stocktake, lines: list[Row], page: LinePage | None = None) -> dict:
+    body = {
+        "id": st.id,
+        "title": st.title,
+        "started_at": st.started_at,
+        "completed_at": st.completed_at,
+        "created_at": st.created_at,
+        "lines_count": st.lines_count,
+        "diff_count": st.diff_count,
+        "counted_count": st.counted_count,
+        "variance_total": st.variance_total,
+    }
+    if page is None or page.sort is None:
+        return {**body, "lines": [r._asdict() for r in lines]}
+
+    lines, next_cursor = keyset_result(lines, sort_key=page.sort_key, sort=page.sort, id_field="id", limit=page.limit)
+    meta = {
+        "limit": page.limit,
+        "count": len(lines),
+        "sort": page.sort_key,
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
+    }
+    return {**body, "lines": [r._asdict() for r in lines], "meta": meta}
+
+
+@bp.get("/stocktakes")
+def list_stocktakes():
+    s = get_session()
+    rows = s.execute(stocktake_list_query()).all()
+    return ok([r._asdict() for r in rows])
 
 
 @bp.post("/stocktakes")
+@idempotent
 def create_stocktake():
     payload = request.get_json(force=True)
     data = StocktakeCreate(**payload)
@@ -75,78 +162,36 @@ def create_stocktake():
     s.add(st)
     s.flush()
 
-    # Generate lines from current stock
-    rows = s.execute(select(Stock, Item).join(Item, Item.id == Stock.item_id)).all()
-    for stock, item in rows:
-        line = StocktakeLine(
-            stocktake_id=st.id,
-            item_id=item.id,
-            expected_quantity=stock.quantity,
-            counted_quantity=stock.quantity,  # Initialize with expected_quantity, not null
-            shelf_location=stock.shelf_location,
-            shelf_location_note=stock.shelf_location_note,
-        )
-        s.add(line)
+    # Generate lines from current stock (optionally scoped for cycle counts)
+    lines_count = generate_stocktake_lines(
+        s,
+        st.id,
+        shelf_location_prefix=data.shelf_location_prefix,
+        category=data.category,
+    )
 
     s.commit()
-    return ok({"id": str(st.id)}, 201)
+    return ok({"id": str(st.id), "lines_count": lines_count}, 201)
 
 
 @bp.get("/stocktakes/<uuid:stocktake_id>")
+@conditional(lambda stocktake_id: row_version_query("stocktakes", stocktake_id, "items"))
 def get_stocktake(stocktake_id: UUID):
     s = get_session()
     st = s.get(Stocktake, stocktake_id)
     if not st:
         return error("棚卸が見つかりません", 404)
 
-    lines = s.execute(
-        select(StocktakeLine, Item)
-        .join(Item, Item.id == StocktakeLine.item_id)
-        .where(StocktakeLine.stocktake_id == stocktake_id)
-        .order_by(Item.name.asc())
-    ).all()
-
-    line_data = []
-    diff_count = 0
-    for line, item in lines:
-        expected = float(line.expected_quantity or 0)
-        counted = float(line.counted_quantity)
-        is_diff = counted != expected
-        if is_diff:
-            diff_count += 1
-
-        # include shelf_location_note per request
-        line_data.append(
-            {
-                "id": line.id,
-                "item_id": str(item.id),
-                "sku": item.sku,
-                "name": item.name,
-                "unit": item.unit,
-                "expected_quantity": expected,
-                "counted_quantity": counted,
-                "shelf_location": line.shelf_location,
-                "shelf_location_note": line.shelf_location_note,
-                "note": line.note,
-                "is_diff": is_diff,
-            }
-        )
-
-    return ok(
-        {
-            "id": str(st.id),
-            "title": st.title,
-            "started_at": st.started_at.isoformat() if st.started_at else None,
-            "completed_at": st.completed_at.isoformat() if st.completed_at else None,
-            "created_at": st.created_at.isoformat() if st.created_at else None,
-            "lines": line_data,
-            "lines_count": len(line_data),
-            "diff_count": diff_count,
-        }
-    )
+    try:
+        page = stocktake_lines_page(stocktake_id, request.args)
+    except ValueError as e:
+        return error(str(e), 400)
+    lines = s.execute(page.query).all()
+    return ok(stocktake_detail_body(st, lines, page))
 
 
 @bp.patch("/stocktakes/lines/<int:line_id>")
+@idempotent
 def update_stocktake_line(line_id: int):
     s = get_session()
     line = s.get(StocktakeLine, line_id)
@@ -166,6 +211,10 @@ def update_stocktake_line(line_id: int):
         except (ValueError, TypeError):
             return error("カウント数量は有効な数値である必要があります", 400)
     
+    # the line counter trigger updates the stocktake row; lock it before the line, like record_counts
+    s.execute(select(Stocktake.id).where(Stocktake.id == line.stocktake_id).with_for_update(key_share=True))
+    if "counted_quantity" in payload:
+        line.counted_at = func.now()
     for field in ["counted_quantity", "note"]:
         if field in payload:
             setattr(line, field, payload[field])
@@ -174,44 +223,69 @@ def update_stocktake_line(line_id: int):
     return ok({"status": "ok"})
 
 
+@bp.post("/stocktakes/<uuid:stocktake_id>/counts")
+@idempotent
+def submit_counts(stocktake_id: UUID):
+    """
+    Apply a batch of scanned counts, identified by SKU or item id.
+
+    ``mode`` is ``set`` (replace the count) or ``add`` (scan += quantity).
+    A batch with a ``device_id`` / ``sequence`` pair that was already applied
+    is acknowledged with ``replayed: true`` and changes nothing. Records
+    that match no line are listed in ``results`` and the rest is applied.
+    """
+    try:
+        data = StocktakeCountRequest(**request.get_json(force=True))
+    except (TypeError, ValidationError) as e:
+        return error(str(e), 400)
+
+    s = get_session()
+    try:
+        result = record_counts(
+            s,
+            stocktake_id,
+            [(c.sku, c.item_id, c.counted_quantity, c.note) for c in data.counts],
+            mode=data.mode,
+            device_id=data.device_id,
+            sequence=data.sequence,
+        )
+        s.commit()
+    except StocktakeNotFoundError:
+        s.rollback()
+        return error("棚卸が見つかりません", 404)
+    except StocktakeAlreadyConfirmedError:
+        s.rollback()
+        return error("この棚卸は既に確定済みです", 409)
+
+    return ok(
+        {
+            "applied": result.applied,
+            "rejected": result.rejected,
+            "replayed": result.replayed,
+            "results": [r._asdict() for r in result.results],
+        }
+    )
+
+
 @bp.post("/stocktakes/<uuid:stocktake_id>/confirm")
+@idempotent
 def confirm_stocktake(stocktake_id: UUID):
     """Apply counted quantities to stocks using transaction-based approach."""
     s = get_session()
-    st = s.get(Stocktake, stocktake_id)
-    if not st:
+    try:
+        result = apply_stocktake_counts(s, stocktake_id)
+        s.commit()
+    except StocktakeNotFoundError:
+        s.rollback()
         return error("棚卸が見つかりません", 404)
+    except StocktakeAlreadyConfirmedError:
+        s.rollback()
+        return error("この棚卸は既に確定済みです", 409)
 
-    lines = s.execute(
-        select(StocktakeLine).where(StocktakeLine.stocktake_id == stocktake_id)
-    ).scalars().all()
-
-    # Validate and apply counted quantities using transaction-based approach
-    for line in lines:
-        if line.counted_quantity < 0:
-            return error("カウント数量は0以上である必要があります", 400)
-        
-        # Get current stock quantity (or treat as 0 if no stock record)
-        stock = s.execute(select(Stock).where(Stock.item_id == line.item_id)).scalar_one_or_none()
-        current_quantity = float(stock.quantity) if stock else 0.0
-        
-        # Calculate delta: counted - current
-        delta = float(line.counted_quantity) - current_quantity
-        
-        # Only create transaction if there's a difference
-        if delta != 0:
-            try:
-                apply_inventory_delta(
-                    session=s,
-                    item_id=line.item_id,
-                    delta=delta,
-                    txn_type="STOCKTAKE",
-                    reason=f"Stocktake: {st.title}",
-                )
-            except InsufficientStockError as e:
-                s.rollback()
-                return error(str(e), 409)
-
-    st.completed_at = func.now()
-    s.commit()
-    return ok({"status": "ok"})
+    return ok(
+        {
+            "status": "ok",
+            "completed_at": result.completed_at.isoformat(),
+            "transactions_count": result.transactions_count,
+        }
+    )
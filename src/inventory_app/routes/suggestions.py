@@ -1,25 +1,41 @@
 from __future__ import annotations
 
 from flask import Blueprint, request
-from sqlalchemy import select
 
 from inventory_app.db import get_session
 from inventory_app.http import ok
-from inventory_app.models import Item
+from inventory_app.services.search import normalize_search_text, search_items, suggestion_cache
 
 bp = Blueprint("suggestions", __name__)
 
+SUGGESTIONS_LIMIT = 10
+
 
 @bp.get("/suggestions")
 def suggestions():
-    q = request.args.get("q", "").strip()
-    s = get_session()
+    q = normalize_search_text(request.args.get("q", ""))
     if not q:
         return ok([])
 
-    rows = (
-        s.execute(select(Item).where(Item.name.ilike(f"%{q}%")).order_by(Item.name.asc()).limit(10))
-        .scalars()
-        .all()
-    )
-    return ok([{"id": str(i.id), "name": i.name, "sku": i.sku} for i in rows])
+    key = (q, SUGGESTIONS_LIMIT)
+    data = suggestion_cache.get(key)
+    if data is None:
+        s = get_session()
+        rows = search_items(s, q, limit=SUGGESTIONS_LIMIT)
+        data = [
+            {
+                "id": str(r.id),
+                "name": r.name,
+                "sku": r.sku,
+                "category": r.category,
+                "manufacturer": r.manufacturer,
+            }
+            for r in rows
+        ]
+        suggestion_cache.set(key, data)
+    return ok(data)
+
+
+@bp.get("/suggestions/cache")
+def suggestions_cache_stats():
+    return ok(suggestion_cache.stats())
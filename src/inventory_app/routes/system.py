@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from flask import Blueprint
+
+from inventory_app.db import get_pool_status
+from inventory_app.http import ok
+from inventory_app.replicas import read_router
+from inventory_app.services.coalescing import delta_coalescer
+from inventory_app.services.stock_changes import stock_change_hub
+
+bp = Blueprint("system", __name__)
+
+
+@bp.get("/system/db-pool")
+def db_pool():
+    """Connection pool utilization and checkout wait-time counters."""
+    return ok(get_pool_status())
+
+
+@bp.get("/system/db-replicas")
+def db_replicas():
+    """Read replicas: their last status check, reads served and why reads fell back to the primary."""
+    return ok(read_router.stats())
+
+
+@bp.get("/system/hot-items")
+def hot_items():
+    """Items in contention mode and how well their writes are being coalesced."""
+    return ok(delta_coalescer.stats())
+
+
+@bp.get("/system/stock-stream")
+def stock_stream():
+    """Subscribers of /api/stocks/changes in this process and the listener's counters."""
+    return ok(stock_change_hub.stats())
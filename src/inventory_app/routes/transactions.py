@@ -1,79 +1,252 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from typing import NamedTuple
 from uuid import UUID
 
 from flask import Blueprint, request
-from sqlalchemy import func, select
+from sqlalchemy import Row, Select, func, select, tuple_
+from sqlalchemy.orm import Session
 
 from inventory_app.db import get_session
-from inventory_app.http import error, ok
+from inventory_app.http import error, idempotent, ok
 from inventory_app.models import InventoryTransaction, Item
-from inventory_app.schemas.transactions import AdjustmentRequest, TransactionRequest, TransactionResponse
+from inventory_app.pagination import decode_cursor, encode_cursor, estimate_row_count, int_arg
+from inventory_app.schemas.transactions import (
+    AdjustmentRequest,
+    BatchTransactionRequest,
+    TransactionRequest,
+    TransactionResponse,
+)
+from inventory_app.services.coalescing import delta_coalescer
+from inventory_app.services.idempotency import IDEMPOTENCY_HEADER
 from inventory_app.services.inventory import (
     AlreadyReversedError,
+    BatchRejectedError,
+    DeltaResult,
     InsufficientStockError,
     ItemNotFoundError,
     TransactionNotFoundError,
     apply_inventory_delta,
+    apply_inventory_deltas,
 )
 
 bp = Blueprint("transactions", __name__)
 
+LEDGER_COLUMNS = (
+    InventoryTransaction.id.label("transaction_id"),
+    InventoryTransaction.item_id,
+    InventoryTransaction.delta_quantity,
+    InventoryTransaction.txn_type,
+    InventoryTransaction.reason,
+    InventoryTransaction.reverses_transaction_id,
+    InventoryTransaction.created_at,
+)
 
-@bp.get("/transactions")
-def list_transactions():
-    """List transactions across all items with pagination."""
-    session = get_session()
 
-    limit = request.args.get("limit", default=50, type=int) or 50
-    limit = min(max(limit, 1), 100)
-    offset = request.args.get("offset", default=0, type=int) or 0
-    offset = max(offset, 0)
+def _delta_result_to_dict(r: DeltaResult) -> dict:
+    return {
+        "item_id": str(r.item_id),
+        "delta_quantity": r.delta,
+        "txn_type": r.txn_type,
+        "status": r.status,
+        "quantity": r.quantity,
+        "transaction_id": str(r.transaction_id) if r.transaction_id else None,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+        "error": r.error,
+    }
+
+
+class LedgerPage(NamedTuple):
+    """Parsed paging state for the global ledger listing."""
+    query: Select
+    count_query: Select
+    limit: int
+    offset: int
+    cursor_mode: bool
+    total_mode: str
+
+
+def ledger_range(args: Mapping[str, str]) -> list:
+    """
+    Conditions for the ``since`` (inclusive) / ``until`` (exclusive) ISO 8601 timestamps.
+
+    Both bound created_at, the ledger's partition key, so Postgres only scans
+    the monthly partitions that overlap the range. Timestamps without an
+    offset are taken as UTC.
+
+    Raises:
+        ValueError: If a timestamp is malformed
+    """
+    conditions = []
+    for name in ("since", "until"):
+        if value := args.get(name):
+            try:
+                bound = datetime.fromisoformat(value)
+            except ValueError as e:
+                raise ValueError(f"{name} must be an ISO 8601 timestamp") from e
+            if bound.tzinfo is None:
+                bound = bound.replace(tzinfo=UTC)
+            column = InventoryTransaction.created_at
+            conditions.append(column >= bound if name == "since" else column < bound)
+    return conditions
 
-    total = session.execute(select(func.count()).select_from(InventoryTransaction)).scalar_one()
 
-    rows = (
-        session.execute(
-            select(InventoryTransaction, Item)
-            .join(Item, Item.id == InventoryTransaction.item_id)
-            .order_by(InventoryTransaction.created_at.desc())
-            .offset(offset)
-            .limit(limit)
+def ledger_page_query(args: Mapping[str, str]) -> LedgerPage:
+    """
+    Build the page query for GET /transactions from its query parameters.
+
+    Raises:
+        ValueError: If ``total``, ``cursor``, ``since`` or ``until`` is invalid
+    """
+    limit = min(max(int_arg(args, "limit", 50), 1), 100)
+    conditions = ledger_range(args)
+    cursor_mode = "cursor" in args
+
+    total_mode = args.get("total", "none" if cursor_mode else "exact")
+    if total_mode not in ("exact", "estimate", "none"):
+        raise ValueError("total must be one of: exact, estimate, none")
+
+    query = (
+        select(
+            *LEDGER_COLUMNS,
+            Item.name.label("item_name"),
+            Item.sku.label("item_sku"),
+            Item.unit.label("item_unit"),
         )
-        .all()
+        .join(Item, Item.id == InventoryTransaction.item_id)
+        .where(*conditions)
+        .order_by(InventoryTransaction.created_at.desc(), InventoryTransaction.id.desc())
     )
+    count_query = select(func.count()).select_from(InventoryTransaction).where(*conditions)
+
+    offset = 0
+    if cursor_mode:
+        cursor = args.get("cursor", "")
+        if cursor:
+            try:
+                created_at, txn_id = decode_cursor(cursor)
+                if not isinstance(created_at, str) or not isinstance(txn_id, str):
+                    raise TypeError("Invalid cursor")
+                after = (datetime.fromisoformat(created_at), UUID(txn_id))
+            except (TypeError, ValueError) as e:
+                raise ValueError("Invalid cursor") from e
+            query = query.where(
+                tuple_(InventoryTransaction.created_at, InventoryTransaction.id) < after,
+                # redundant with the row comparison, but lets newer partitions be pruned
+                InventoryTransaction.created_at <= after[0],
+            )
+        query = query.limit(limit + 1)
+    else:
+        offset = max(int_arg(args, "offset", 0), 0)
+        query = query.offset(offset).limit(limit + 1)
+
+    return LedgerPage(query, count_query, limit, offset, cursor_mode, total_mode)
+
 
-    items = [
-        {
-            "transaction_id": str(t.id),
-            "item_id": str(t.item_id),
-            "item_name": it.name,
-            "item_sku": it.sku,
-            "item_unit": it.unit,
-            "delta_quantity": float(t.delta_quantity),
-            "txn_type": t.txn_type,
-            "reason": t.reason,
-            "reverses_transaction_id": str(t.reverses_transaction_id)
-            if t.reverses_transaction_id
-            else None,
-            "created_at": t.created_at.isoformat(),
-        }
-        for t, it in rows
-    ]
+def ledger_page_body(page: LedgerPage, rows: list[Row], total: int | None) -> dict:
+    """Shape the rows fetched for a LedgerPage into the response body."""
+    has_next = len(rows) > page.limit
+    rows = rows[: page.limit]
 
     meta = {
         "total": total,
-        "limit": limit,
-        "offset": offset,
-        "count": len(items),
-        "has_next": offset + limit < total,
-        "has_prev": offset > 0,
+        "total_is_estimate": page.total_mode == "estimate",
+        "limit": page.limit,
+        "count": len(rows),
+        "has_next": has_next,
     }
+    if page.cursor_mode:
+        last = rows[-1] if rows else None
+        meta["next_cursor"] = (
+            encode_cursor([last.created_at.isoformat(), str(last.transaction_id)]) if has_next else None
+        )
+    else:
+        meta["offset"] = page.offset
+        meta["has_prev"] = page.offset > 0
+
+    return {"items": [r._asdict() for r in rows], "meta": meta}
+
 
-    return ok({"items": items, "meta": meta})
+@bp.get("/transactions")
+def list_transactions():
+    """
+    List transactions across all items (newest first).
+
+    Two paging modes are supported:
+      - offset mode (default): ``limit`` / ``offset``
+      - cursor mode: pass ``cursor`` (empty for the first page) and follow
+        ``meta.next_cursor``; pages are resolved by a ``(created_at, id)``
+        keyset, so deep pages cost the same as the first one.
+
+    ``total`` selects how the total is reported: ``exact`` (count(*)),
+    ``estimate`` (planner statistics) or ``none``. It defaults to ``exact``
+    in offset mode and ``none`` in cursor mode.
+
+    ``since`` / ``until`` restrict the range of created_at and only touch the
+    partitions that overlap it. An exact total counts the same range; an
+    estimate is always for the whole ledger.
+    """
+    session = get_session()
+    try:
+        page = ledger_page_query(request.args)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    rows = session.execute(page.query).all()
+
+    total = None
+    if page.total_mode == "exact":
+        total = session.execute(page.count_query).scalar_one()
+    elif page.total_mode == "estimate":
+        total = estimate_row_count(session, InventoryTransaction.__tablename__)
+
+    return ok(ledger_page_body(page, rows, total))
+
+
+def _record_delta(
+    session: Session, item_id: UUID, delta: float, txn_type: str, reason: str | None
+) -> TransactionResponse:
+    """
+    Apply and commit one receipt / issue / adjustment.
+
+    Hot items (HOT_ITEM_IDS) are handed to delta_coalescer, which commits
+    them together with concurrent requests for the same item. Requests with
+    an Idempotency-Key are not: their key has to commit in the same
+    transaction as the write (see http.idempotent).
+    """
+    if delta_coalescer.handles(item_id) and IDEMPOTENCY_HEADER not in request.headers:
+        result = delta_coalescer.submit(item_id, delta, txn_type, reason)
+        return TransactionResponse(
+            transaction_id=str(result.transaction_id),
+            item_id=str(result.item_id),
+            delta_quantity=float(result.delta),
+            txn_type=result.txn_type,
+            reason=reason,
+            created_at=result.created_at.isoformat(),
+        )
+
+    txn = apply_inventory_delta(
+        session=session,
+        item_id=item_id,
+        delta=delta,
+        txn_type=txn_type,
+        reason=reason,
+    )
+    session.commit()
+    return TransactionResponse(
+        transaction_id=str(txn.id),
+        item_id=str(txn.item_id),
+        delta_quantity=float(txn.delta_quantity),
+        txn_type=txn.txn_type,
+        reason=txn.reason,
+        created_at=txn.created_at.isoformat(),
+    )
 
 
 @bp.post("/items/<uuid:item_id>/receipts")
+@idempotent
 def create_receipt(item_id: UUID):
     """Create a receipt transaction (increase stock)."""
     try:
@@ -84,23 +257,7 @@ def create_receipt(item_id: UUID):
     
     session = get_session()
     try:
-        txn = apply_inventory_delta(
-            session=session,
-            item_id=item_id,
-            delta=data.quantity,
-            txn_type="RECEIPT",
-            reason=data.reason,
-        )
-        session.commit()
-        
-        response = TransactionResponse(
-            transaction_id=str(txn.id),
-            item_id=str(txn.item_id),
-            delta_quantity=float(txn.delta_quantity),
-            txn_type=txn.txn_type,
-            reason=txn.reason,
-            created_at=txn.created_at.isoformat(),
-        )
+        response = _record_delta(session, item_id, data.quantity, "RECEIPT", data.reason)
         return ok(response.model_dump(), 201)
     except ItemNotFoundError:
         session.rollback()
@@ -110,9 +267,23 @@ def create_receipt(item_id: UUID):
         return error(str(e), 400)
 
 
+def item_ledger_query(item_id: UUID, limit: int, conditions: list | None = None) -> Select:
+    return (
+        select(*LEDGER_COLUMNS)
+        .where(InventoryTransaction.item_id == item_id, *(conditions or ()))
+        .order_by(InventoryTransaction.created_at.desc(), InventoryTransaction.id.desc())
+        .limit(limit)
+    )
+
+
 @bp.get("/items/<uuid:item_id>/transactions")
 def list_item_transactions(item_id: UUID):
-    """List recent transactions for an item (newest first)."""
+    """List recent transactions for an item (newest first); ``since`` / ``until`` as for /transactions."""
+    try:
+        conditions = ledger_range(request.args)
+    except ValueError as e:
+        return error(str(e), 400)
+
     session = get_session()
 
     # Ensure item exists
@@ -120,39 +291,14 @@ def list_item_transactions(item_id: UUID):
     if not item:
         return error("Item not found", 404)
 
-    limit = request.args.get("limit", default=20, type=int) or 20
-    limit = min(max(limit, 1), 100)
-
-    txns = (
-        session.execute(
-            select(InventoryTransaction)
-            .where(InventoryTransaction.item_id == item_id)
-            .order_by(InventoryTransaction.created_at.desc())
-            .limit(limit)
-        )
-        .scalars()
-        .all()
-    )
-
-    data = [
-        {
-            "transaction_id": str(t.id),
-            "item_id": str(t.item_id),
-            "delta_quantity": float(t.delta_quantity),
-            "txn_type": t.txn_type,
-            "reason": t.reason,
-            "reverses_transaction_id": str(t.reverses_transaction_id)
-            if t.reverses_transaction_id
-            else None,
-            "created_at": t.created_at.isoformat(),
-        }
-        for t in txns
-    ]
+    limit = min(max(int_arg(request.args, "limit", 20), 1), 100)
 
-    return ok(data)
+    rows = session.execute(item_ledger_query(item_id, limit, conditions)).all()
+    return ok([r._asdict() for r in rows])
 
 
 @bp.post("/items/<uuid:item_id>/issues")
+@idempotent
 def create_issue(item_id: UUID):
     """Create an issue transaction (decrease stock)."""
     try:
@@ -163,23 +309,7 @@ def create_issue(item_id: UUID):
     
     session = get_session()
     try:
-        txn = apply_inventory_delta(
-            session=session,
-            item_id=item_id,
-            delta=-data.quantity,  # Negative delta for issue
-            txn_type="ISSUE",
-            reason=data.reason,
-        )
-        session.commit()
-        
-        response = TransactionResponse(
-            transaction_id=str(txn.id),
-            item_id=str(txn.item_id),
-            delta_quantity=float(txn.delta_quantity),
-            txn_type=txn.txn_type,
-            reason=txn.reason,
-            created_at=txn.created_at.isoformat(),
-        )
+        response = _record_delta(session, item_id, -data.quantity, "ISSUE", data.reason)
         return ok(response.model_dump(), 201)
     except ItemNotFoundError:
         session.rollback()
@@ -193,6 +323,7 @@ def create_issue(item_id: UUID):
 
 
 @bp.post("/items/<uuid:item_id>/adjustments")
+@idempotent
 def create_adjustment(item_id: UUID):
     """Create an adjustment transaction (positive or negative delta)."""
     try:
@@ -203,23 +334,7 @@ def create_adjustment(item_id: UUID):
     
     session = get_session()
     try:
-        txn = apply_inventory_delta(
-            session=session,
-            item_id=item_id,
-            delta=data.delta,
-            txn_type="ADJUST",
-            reason=data.reason,
-        )
-        session.commit()
-        
-        response = TransactionResponse(
-            transaction_id=str(txn.id),
-            item_id=str(txn.item_id),
-            delta_quantity=float(txn.delta_quantity),
-            txn_type=txn.txn_type,
-            reason=txn.reason,
-            created_at=txn.created_at.isoformat(),
-        )
+        response = _record_delta(session, item_id, data.delta, "ADJUST", data.reason)
         return ok(response.model_dump(), 201)
     except ItemNotFoundError:
         session.rollback()
@@ -233,6 +348,7 @@ def create_adjustment(item_id: UUID):
 
 
 @bp.post("/transactions/<uuid:transaction_id>/reverse")
+@idempotent
 def reverse_transaction(transaction_id: UUID):
     """Reverse a transaction by creating an opposite transaction."""
     session = get_session()
@@ -279,3 +395,44 @@ def reverse_transaction(transaction_id: UUID):
     except Exception as e:
         session.rollback()
         return error(str(e), 400)
+
+
+@bp.post("/transactions/batch")
+@idempotent
+def create_batch():
+    """
+    Apply many receipt/issue/adjustment lines in one request.
+
+    An atomic batch with a failing line, and a non-atomic batch of which no
+    line applied, are answered 409 with the per-line results.
+    """
+    try:
+        payload = request.get_json(force=True)
+        data = BatchTransactionRequest(**payload)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    session = get_session()
+    try:
+        results = apply_inventory_deltas(
+            session,
+            [(line.item_id, line.delta, line.txn_type, line.reason) for line in data.lines],
+            atomic=data.atomic,
+        )
+        session.commit()
+    except BatchRejectedError as e:
+        session.rollback()
+        return error(str(e), 409, results=[_delta_result_to_dict(r) for r in e.results])
+    except InsufficientStockError as e:
+        session.rollback()
+        return error(str(e), 409)
+    except Exception as e:
+        session.rollback()
+        return error(str(e), 400)
+
+    applied = sum(1 for r in results if r.status == "applied")
+    meta = {"count": len(results), "applied": applied, "failed": len(results) - applied}
+    lines = [_delta_result_to_dict(r) for r in results]
+    if not applied:
+        return error(f"Batch rejected: all {len(results)} lines failed", 409, results=lines, meta=meta)
+    return ok({"results": lines, "meta": meta}, 201)
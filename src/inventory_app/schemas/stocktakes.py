@@ -1,7 +1,42 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
+from typing import Literal
+from uuid import UUID
+
+from pydantic import BaseModel, Field, model_validator
 
 
 class StocktakeCreate(BaseModel):
     title: str
+    shelf_location_prefix: str | None = None
+    category: str | None = None
+
+
+class StocktakeCountRecord(BaseModel):
+    """One scanned count, identified by SKU or item id."""
+    sku: str | None = None
+    item_id: UUID | None = None
+    counted_quantity: float = Field(description="The count (mode=set) or the amount to add to it (mode=add)")
+    note: str | None = None
+
+    @model_validator(mode="after")
+    def validate_identity(self) -> StocktakeCountRecord:
+        if (self.sku is None) == (self.item_id is None):
+            raise ValueError("Exactly one of sku and item_id is required")
+        return self
+
+
+class StocktakeCountRequest(BaseModel):
+    """Schema for batched stocktake count submissions."""
+    counts: list[StocktakeCountRecord] = Field(min_length=1, max_length=5000)
+    mode: Literal["set", "add"] = Field("set", description="Replace the counts, or add to them (scan += 1)")
+    device_id: str | None = Field(None, min_length=1, max_length=100)
+    sequence: int | None = Field(None, ge=0, description="Per-device batch number; resubmissions are ignored")
+
+    @model_validator(mode="after")
+    def validate_sequence(self) -> StocktakeCountRequest:
+        if (self.device_id is None) != (self.sequence is None):
+            raise ValueError("device_id and sequence must be given together")
+        if self.mode == "set" and any(c.counted_quantity < 0 for c in self.counts):
+            raise ValueError("counted_quantity must be 0 or more when mode is set")
+        return self
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field, field_validator
+from typing import Literal
+from uuid import UUID
+
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class TransactionRequest(BaseModel):
@@ -30,3 +33,27 @@ class TransactionResponse(BaseModel):
     txn_type: str
     reason: str | None
     created_at: str
+
+
+class BatchTransactionLine(BaseModel):
+    """One line of a batch transaction request."""
+    item_id: UUID
+    txn_type: Literal["RECEIPT", "ISSUE", "ADJUST"]
+    delta: float = Field(description="Signed delta quantity (RECEIPT > 0, ISSUE < 0, ADJUST != 0)")
+    reason: str | None = None
+
+    @model_validator(mode="after")
+    def validate_delta_sign(self) -> BatchTransactionLine:
+        if self.delta == 0:
+            raise ValueError("Delta cannot be zero")
+        if self.txn_type == "RECEIPT" and self.delta < 0:
+            raise ValueError("RECEIPT delta must be positive")
+        if self.txn_type == "ISSUE" and self.delta > 0:
+            raise ValueError("ISSUE delta must be negative")
+        return self
+
+
+class BatchTransactionRequest(BaseModel):
+    """Schema for batch transaction requests."""
+    lines: list[BatchTransactionLine] = Field(min_length=1, max_length=5000)
+    atomic: bool = Field(True, description="Reject the whole batch if any line fails")
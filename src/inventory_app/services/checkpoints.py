@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, time
+from typing import NamedTuple
+from uuid import UUID
+
+from sqlalchemy import Select, and_, delete, exists, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from inventory_app.models import (
+    InventoryTransaction,
+    Item,
+    ItemDailyMovement,
+    Stock,
+    StockCheckpoint,
+    StockCheckpointLine,
+)
+from inventory_app.services.partitions import retained_since
+
+
+class HistoryUnavailableError(Exception):
+    """Raised when an as-of query needs ledger rows that have been archived."""
+    pass
+
+
+class AsOfBasis(NamedTuple):
+    """
+    Where an as-of quantity starts from.
+
+    ``direction`` is ``forward`` (checkpoint plus the deltas in
+    ``(taken_at, at]``), ``backward`` (a later checkpoint minus the deltas in
+    ``(at, taken_at]``) or ``ledger`` (no usable checkpoint: the sum of all
+    retained deltas up to ``at``).
+    """
+    direction: str
+    checkpoint_id: int | None
+    taken_at: datetime | None
+
+
+def take_checkpoint(session: Session) -> StockCheckpoint:
+    """
+    Snapshot every non-zero stocks.quantity.
+
+    Holds SHARE on stocks until the caller commits: running ledger writers
+    are waited for and new ones block, so the snapshot matches exactly the
+    ledger rows with created_at <= taken_at (see migration 5b8f0c3e1d72).
+    Reads are not blocked; writes pause for the duration of one
+    INSERT ... SELECT over stocks.
+
+    Returns:
+        The new checkpoint (flushed, with items_count set)
+    """
+    session.execute(text("LOCK TABLE stocks IN SHARE MODE"))
+    taken_at = session.execute(select(func.clock_timestamp())).scalar_one()
+
+    checkpoint = StockCheckpoint(taken_at=taken_at)
+    session.add(checkpoint)
+    session.flush()
+
+    lines = StockCheckpointLine.__table__
+    result = session.execute(
+        insert(lines).from_select(
+            [lines.c.checkpoint_id, lines.c.item_id, lines.c.quantity],
+            select(
+                literal(checkpoint.id, type_=lines.c.checkpoint_id.type),
+                Stock.item_id,
+                Stock.quantity,
+            ).where(Stock.quantity != 0),
+        ),
+        execution_options={"preserve_rowcount": True},
+    )
+    checkpoint.items_count = result.rowcount
+    session.flush()
+    return checkpoint
+
+
+def prune_checkpoints(session: Session, *, before: datetime) -> int:
+    """Delete checkpoints taken before ``before``; returns the number deleted."""
+    result = session.execute(
+        delete(StockCheckpoint).where(StockCheckpoint.taken_at < before),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
+
+
+def choose_basis(session: Session, at: datetime) -> AsOfBasis:
+    """
+    Pick the checkpoint nearest to ``at`` whose ledger window is still retained.
+
+    The bare ledger is only a basis while no ledger history has been
+    archived: the daily movement rollup outlives archived partitions, so
+    rollup days before the oldest retained partition mean the ledger no
+    longer starts at zero.
+
+    Raises:
+        HistoryUnavailableError: If ``at`` is before the retained ledger, or
+            every usable basis needs archived ledger rows
+    """
+    floor_day = retained_since(session)
+    floor = datetime.combine(floor_day, time.min, UTC) if floor_day else None
+    if floor is not None and at < floor:
+        raise HistoryUnavailableError(f"ledger history before {floor_day} is not retained")
+
+    before = session.execute(
+        select(StockCheckpoint.id, StockCheckpoint.taken_at)
+        .where(StockCheckpoint.taken_at <= at)
+        .order_by(StockCheckpoint.taken_at.desc())
+        .limit(1)
+    ).first()
+    after = session.execute(
+        select(StockCheckpoint.id, StockCheckpoint.taken_at)
+        .where(StockCheckpoint.taken_at > at)
+        .order_by(StockCheckpoint.taken_at.asc())
+        .limit(1)
+    ).first()
+
+    candidates = []
+    if before is not None and (floor is None or before.taken_at >= floor):
+        candidates.append((at - before.taken_at, AsOfBasis("forward", before.id, before.taken_at)))
+    if after is not None:
+        candidates.append((after.taken_at - at, AsOfBasis("backward", after.id, after.taken_at)))
+    if candidates:
+        return min(candidates, key=lambda c: c[0])[1]
+    if floor_day is not None and session.execute(
+        select(exists().where(ItemDailyMovement.day < floor_day))
+    ).scalar_one():
+        raise HistoryUnavailableError(f"ledger history before {floor_day} has been archived")
+    return AsOfBasis("ledger", None, None)
+
+
+def stock_as_of_query(
+    basis: AsOfBasis,
+    at: datetime,
+    *,
+    item_id: UUID | None = None,
+    category: str | None = None,
+) -> Select:
+    """
+    Quantity of each item at ``at`` from ``basis`` plus one grouped pass over the ledger window.
+
+    The ledger is only read between the checkpoint and ``at``, so the cost
+    is bounded by the checkpoint interval rather than the ledger's size.
+    Without ``item_id``, items created after ``at`` are left out.
+    """
+    ledger = InventoryTransaction
+    if basis.direction == "backward":
+        window = [ledger.created_at > at, ledger.created_at <= basis.taken_at]
+        sign = -1
+    else:
+        window = [ledger.created_at <= at]
+        if basis.direction == "forward":
+            window.append(ledger.created_at > basis.taken_at)
+        sign = 1
+    if item_id is not None:
+        window.append(ledger.item_id == item_id)
+
+    deltas = (
+        select(
+            ledger.item_id,
+            func.sum(ledger.delta_quantity).label("delta"),
+            func.count().label("ledger_rows"),
+        )
+        .where(*window)
+        .group_by(ledger.item_id)
+        .subquery()
+    )
+
+    line = StockCheckpointLine
+    base = func.coalesce(line.quantity, 0) if basis.checkpoint_id is not None else literal(0)
+    query = (
+        select(
+            Item.id.label("item_id"),
+            Item.sku,
+            Item.name,
+            Item.unit,
+            (base + sign * func.coalesce(deltas.c.delta, 0)).label("quantity"),
+            func.coalesce(deltas.c.ledger_rows, 0).label("ledger_rows"),
+        )
+        .select_from(Item)
+        .outerjoin(deltas, deltas.c.item_id == Item.id)
+        .order_by(Item.name.asc(), Item.id.asc())
+    )
+    if basis.checkpoint_id is not None:
+        query = query.outerjoin(
+            line, and_(line.checkpoint_id == basis.checkpoint_id, line.item_id == Item.id)
+        )
+    if item_id is not None:
+        query = query.where(Item.id == item_id)
+    else:
+        query = query.where(Item.created_at <= at)
+    if category:
+        query = query.where(Item.category == category)
+    return query
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from collections.abc import Iterable
+from uuid import UUID
+
+from inventory_app.db import SessionLocal
+from inventory_app.services.inventory import (
+    DeltaResult,
+    InsufficientStockError,
+    InventoryDelta,
+    ItemNotFoundError,
+    apply_inventory_deltas,
+)
+
+
+class _Pending:
+    """One submitted delta waiting for (or leading) a batch."""
+
+    __slots__ = ("error", "event", "lead", "line", "result")
+
+    def __init__(self, line: InventoryDelta):
+        self.line = line
+        self.event = threading.Event()
+        self.lead = False
+        self.result: DeltaResult | None = None
+        self.error: Exception | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None or self.error is not None
+
+
+class DeltaCoalescer:
+    """
+    Group commit for hot items: concurrent deltas to one item share a transaction.
+
+    Requests for a flagged item queue up per item. One of them leads: it
+    takes everything queued (up to ``max_batch``), applies it with
+    apply_inventory_deltas(atomic=False), commits, hands each waiter its own
+    result and passes the lead to the next queued request. The stock row is
+    locked once per batch instead of once per request, while every line is
+    still validated against the running quantity, so stock never goes
+    negative and a line that would overdraw fails on its own.
+
+    Batching is per process and only happens while a batch is in flight, so
+    an idle item adds no latency; it needs a threaded server (e.g. gunicorn
+    ``--threads``) to have concurrent requests to group.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues: dict[UUID, deque[_Pending]] = {}
+        self._leading: set[UUID] = set()  # items with a batch in flight
+        self.item_ids: frozenset[UUID] = frozenset()
+        self.max_batch = 256
+        self.batches = 0
+        self.lines = 0
+
+    def configure(self, item_ids: Iterable[UUID], max_batch: int = 256) -> None:
+        with self._lock:
+            self.item_ids = frozenset(item_ids)
+            self.max_batch = max(max_batch, 1)
+
+    def handles(self, item_id: UUID) -> bool:
+        return item_id in self.item_ids
+
+    def submit(self, item_id: UUID, delta: float, txn_type: str, reason: str | None = None) -> DeltaResult:
+        """
+        Apply one delta as part of the next batch for ``item_id`` and wait for it to commit.
+
+        Raises:
+            ItemNotFoundError: If the item does not exist
+            InsufficientStockError: If the delta would make stock negative
+        """
+        pending = _Pending(InventoryDelta(item_id, delta, txn_type, reason))
+        with self._lock:
+            self._queues.setdefault(item_id, deque()).append(pending)
+            if item_id not in self._leading:
+                self._leading.add(item_id)
+                pending.lead = True
+
+        if not pending.lead:
+            pending.event.wait()
+        if not pending.finished:
+            self._run_batch(item_id)
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run_batch(self, item_id: UUID) -> None:
+        with self._lock:
+            queue = self._queues[item_id]
+            batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch))]
+
+        try:
+            self._apply(batch)
+        except BaseException as e:
+            error = e if isinstance(e, Exception) else RuntimeError("the batch was interrupted")
+            for p in batch:
+                if not p.finished:
+                    p.error = error
+            raise
+        finally:
+            # whatever happened, hand the lead on and wake the batch: waiters have no timeout
+            with self._lock:
+                self.batches += 1
+                self.lines += len(batch)
+                if queue:
+                    queue[0].lead = True
+                    queue[0].event.set()
+                else:
+                    self._leading.discard(item_id)
+            for p in batch:
+                p.event.set()
+
+    def _apply(self, batch: list[_Pending]) -> None:
+        session = SessionLocal.session_factory()
+        try:
+            results = apply_inventory_deltas(session, [p.line for p in batch], atomic=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            for p in batch:
+                p.error = e
+        else:
+            for p, r in zip(batch, results, strict=True):
+                if r.status == "applied":
+                    p.result = r
+                elif r.status == "item_not_found":
+                    p.error = ItemNotFoundError(r.error)
+                elif r.status == "insufficient_stock":
+                    p.error = InsufficientStockError(r.error)
+                else:
+                    p.error = ValueError(r.error)
+        finally:
+            session.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": sorted(str(i) for i in self.item_ids),
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "lines": self.lines,
+                "mean_batch": self.lines / self.batches if self.batches else None,
+            }
+
+
+# Hot items (HOT_ITEM_IDS) whose receipts / issues / adjustments are coalesced;
+# configured in create_app. Empty by default, i.e. every request locks the row itself.
+delta_coalescer = DeltaCoalescer()
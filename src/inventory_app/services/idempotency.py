@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import timedelta
+from typing import NamedTuple
+
+from sqlalchemy import Insert, Select, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from inventory_app.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class StoredRequest(NamedTuple):
+    """An existing Idempotency-Key row; status_code is None while the first request is in flight."""
+    request_hash: str
+    status_code: int | None
+    content_type: str | None
+    response_body: bytes | None
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    """Hash identifying the request a key was first used for."""
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def replay_error(stored: StoredRequest, fingerprint: str) -> tuple[str, int] | None:
+    """Why a stored request cannot be replayed for this one, or None if it can."""
+    if stored.request_hash != fingerprint:
+        return f"{IDEMPOTENCY_HEADER} was already used for a different request", 422
+    if stored.status_code is None:
+        return f"A request with this {IDEMPOTENCY_HEADER} is still in progress", 409
+    return None
+
+
+def claim_statement(key: str, request_hash: str, ttl: timedelta) -> Insert:
+    """
+    Claim ``key`` for this request: one INSERT probing the primary key.
+
+    A row whose TTL has passed (but has not been purged yet) is taken over
+    in the same statement. Returns a row only when the key was claimed; a
+    concurrent claim of the same key waits for the first transaction.
+    """
+    t = IdempotencyKey.__table__
+    stmt = pg_insert(t).values(key=key, request_hash=request_hash, expires_at=func.now() + ttl)
+    return stmt.on_conflict_do_update(
+        index_elements=[t.c.key],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "status_code": None,
+            "content_type": None,
+            "response_body": None,
+            "created_at": func.now(),
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=t.c.expires_at <= func.now(),
+    ).returning(t.c.key)
+
+
+def stored_request_query(key: str) -> Select:
+    k = IdempotencyKey
+    return select(k.request_hash, k.status_code, k.content_type, k.response_body).where(k.key == key)
+
+
+def claim_idempotency_key(session: Session, key: str, request_hash: str, ttl: timedelta) -> StoredRequest | None:
+    """
+    Claim ``key`` in the session's transaction.
+
+    Returns:
+        None if the key is now held by this transaction (the caller runs
+        the request), otherwise the stored request it was first used for
+    """
+    if session.execute(claim_statement(key, request_hash, ttl)).first() is not None:
+        return None
+    row = session.execute(stored_request_query(key)).one()
+    return StoredRequest(*row)
+
+
+def save_response_statement(key: str, status_code: int, content_type: str | None, body: bytes):
+    k = IdempotencyKey
+    return (
+        update(k)
+        .where(k.key == key)
+        .values(status_code=status_code, content_type=content_type, response_body=body)
+    )
+
+
+def purge_expired_keys(session: Session) -> int:
+    """Delete keys past their TTL; returns the number deleted."""
+    result = session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= func.now()),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import csv
+import io
+import zipfile
+from collections.abc import Iterator
+from itertools import islice
+from typing import IO, NamedTuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from inventory_app.schemas.items import ItemCreate
+
+try:  # optional: pip install -e ".[xlsx]"
+    import openpyxl
+except ImportError:  # pragma: no cover - exercised when openpyxl is absent
+    openpyxl = None
+
+IMPORT_FORMATS = ("csv", "xlsx")
+# Rows parsed, validated and copied to the staging table at a time
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_COLUMNS = tuple(ItemCreate.model_fields)
+STAGING_TABLE = "item_import_staging"
+
+
+class ImportFormatError(Exception):
+    """Raised when a file cannot be read as an item catalogue (format, encoding or header)."""
+    pass
+
+
+class ImportRowError(NamedTuple):
+    """A rejected row; ``row`` is its 1-based line in the file, the header being line 1."""
+    row: int
+    sku: str | None
+    errors: list[str]
+
+
+class ImportResult(NamedTuple):
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    errors: list[ImportRowError]
+
+
+def detect_format(filename: str | None, content_type: str | None = None) -> str:
+    """
+    Pick the import format from a file name, falling back to its content type.
+
+    Raises:
+        ImportFormatError: If neither identifies CSV or XLSX
+    """
+    if filename and "." in filename:
+        suffix = filename.rsplit(".", 1)[1].lower()
+        if suffix in IMPORT_FORMATS:
+            return suffix
+    if content_type:
+        if content_type.startswith(("text/csv", "text/plain")):
+            return "csv"
+        if content_type.startswith("application/vnd.openxmlformats-officedocument.spreadsheetml"):
+            return "xlsx"
+    raise ImportFormatError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+
+
+def _header(cells) -> list[str]:
+    header = [str(c).strip().lower() if c is not None else "" for c in cells]
+    if "name" not in header:
+        raise ImportFormatError("the header row must include a name column")
+    if "sku" not in header:
+        raise ImportFormatError("the header row must include a sku column")
+    return header
+
+
+def _records(header: list[str], rows: Iterator) -> Iterator[tuple[int, dict[str, str]]]:
+    for line, cells in enumerate(rows, start=2):
+        record = {}
+        for column, value in zip(header, cells, strict=False):
+            if column not in IMPORT_COLUMNS or value is None:
+                continue
+            value = str(value).strip()
+            if value:
+                record[column] = value
+        if record:  # blank lines are skipped
+            yield line, record
+
+
+def read_rows(stream: IO[bytes], fmt: str) -> tuple[list[str], Iterator[tuple[int, dict[str, str]]]]:
+    """
+    Read an item catalogue lazily.
+
+    Unknown columns are ignored and empty cells are left out, so the
+    ItemCreate defaults apply to them.
+
+    Returns:
+        The known columns present in the header, and an iterator of
+        (line number, row) pairs
+
+    Raises:
+        ImportFormatError: If the file cannot be read or has no sku/name header
+    """
+    if fmt == "csv":
+        reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+        try:
+            header = _header(next(reader, []))
+        except UnicodeDecodeError as e:
+            raise ImportFormatError("CSV files must be UTF-8 encoded") from e
+        rows = reader
+    elif fmt == "xlsx":
+        if openpyxl is None:
+            raise ImportFormatError('XLSX import needs openpyxl (pip install -e ".[xlsx]")')
+        try:
+            # read_only streams rows instead of loading the whole sheet
+            workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, KeyError, OSError, ValueError) as e:
+            raise ImportFormatError(f"not a readable XLSX file: {e}") from e
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+    else:
+        raise ImportFormatError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+    return [c for c in header if c in IMPORT_COLUMNS], _records(header, rows)
+
+
+def validate_rows(records: list[tuple[int, dict[str, str]]]) -> tuple[list[tuple], list[ImportRowError]]:
+    """
+    Validate one chunk of rows with ItemCreate.
+
+    Returns:
+        Staging tuples (line, *IMPORT_COLUMNS) for the valid rows, and the errors
+    """
+    valid, errors = [], []
+    for line, record in records:
+        try:
+            item = ItemCreate(**record)
+        except ValidationError as e:
+            messages = [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+            errors.append(ImportRowError(line, record.get("sku"), messages))
+            continue
+        if not item.sku:
+            errors.append(ImportRowError(line, None, ["sku: required for import"]))
+            continue
+        valid.append((line, *(getattr(item, c) for c in IMPORT_COLUMNS)))
+    return valid, errors
+
+
+def _copy_to_staging(session: Session, rows: list[tuple]) -> None:
+    cursor = session.connection().connection.driver_connection.cursor()
+    with cursor.copy(f"COPY {STAGING_TABLE} (line, {', '.join(IMPORT_COLUMNS)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def _upsert_statement(columns: list[str]):
+    """
+    One statement that upserts every staged row and creates the stock rows of new items.
+
+    Only the columns present in the file are updated on existing items, and
+    items whose values do not change are left alone (no updated_at bump).
+    When a SKU appears on several lines the last one wins.
+    """
+    assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "sku")
+    current = ", ".join(f"items.{c}" for c in columns if c != "sku")
+    incoming = ", ".join(f"EXCLUDED.{c}" for c in columns if c != "sku")
+    item_columns = ", ".join(IMPORT_COLUMNS)
+    return text(
+        f"WITH latest AS ("
+        f"  SELECT DISTINCT ON (sku) {item_columns} FROM {STAGING_TABLE} ORDER BY sku, line DESC"
+        f"), upserted AS ("
+        f"  INSERT INTO items ({item_columns}) SELECT {item_columns} FROM latest"
+        f"  ON CONFLICT (sku) DO UPDATE SET {assignments}, updated_at = now()"
+        f"  WHERE ({current}) IS DISTINCT FROM ({incoming})"
+        f"  RETURNING id, (xmax = 0) AS inserted"
+        f"), stocked AS ("
+        f"  INSERT INTO stocks (item_id, quantity) SELECT id, 0 FROM upserted WHERE inserted"
+        f"  ON CONFLICT (item_id) DO NOTHING"
+        f") "
+        f"SELECT count(*) FILTER (WHERE inserted) AS inserted, count(*) FILTER (WHERE NOT inserted) AS updated "
+        f"FROM upserted"
+    )
+
+
+def import_items(
+    session: Session, stream: IO[bytes], fmt: str, *, chunk_size: int = IMPORT_CHUNK_SIZE
+) -> ImportResult:
+    """
+    Upsert an item catalogue by SKU.
+
+    The file is parsed and validated ``chunk_size`` rows at a time and the
+    valid rows are COPYed into a temporary staging table; a single
+    INSERT ... ON CONFLICT (sku) then creates or updates the items and
+    creates stock rows (quantity 0) for the new ones. Invalid rows are
+    reported and skipped, the rest is applied in the caller's transaction.
+
+    Raises:
+        ImportFormatError: If the file cannot be read as a catalogue
+    """
+    columns, records = read_rows(stream, fmt)
+    session.execute(text(
+        f"CREATE TEMPORARY TABLE {STAGING_TABLE} (line integer NOT NULL, "
+        + ", ".join(f"{c} text" for c in IMPORT_COLUMNS)
+        + ") ON COMMIT DROP"
+    ))
+
+    rows, staged, errors = 0, 0, []
+    try:
+        while chunk := list(islice(records, chunk_size)):
+            valid, rejected = validate_rows(chunk)
+            rows += len(chunk)
+            errors.extend(rejected)
+            if valid:
+                _copy_to_staging(session, valid)
+                staged += len(valid)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"line {rows + 2}: {e}") from e
+
+    if not staged:
+        return ImportResult(rows, 0, 0, 0, errors)
+
+    # lines overridden by a later line with the same SKU
+    duplicates = session.execute(text(
+        f"SELECT line, sku, last FROM ("
+        f"  SELECT line, sku, max(line) OVER (PARTITION BY sku) AS last FROM {STAGING_TABLE}"
+        f") AS s WHERE line <> last"
+    )).all()
+    errors.extend(
+        ImportRowError(d.line, d.sku, [f"sku: duplicated on line {d.last}, which was imported instead"])
+        for d in duplicates
+    )
+    errors.sort(key=lambda e: e.row)
+
+    counts = session.execute(_upsert_statement(columns)).one()
+    if counts.inserted or counts.updated:
+        session.info["items_changed"] = True  # drop cached suggestions on commit
+    unique = staged - len(duplicates)
+    return ImportResult(rows, counts.inserted, counts.updated, unique - counts.inserted - counts.updated, errors)
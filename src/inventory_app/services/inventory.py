@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
+from datetime import datetime
+from typing import TYPE_CHECKING, NamedTuple
 from uuid import UUID
 
-from sqlalchemy import select, text
+from sqlalchemy import Executable, Numeric, column, func, insert, select, text, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from inventory_app.models import InventoryTransaction, Item, Stock
 
+if TYPE_CHECKING:  # the async stack is optional: pip install -e ".[asgi]"
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 
 class InsufficientStockError(Exception):
     """Raised when a transaction would cause negative stock."""
@@ -28,6 +36,74 @@ class AlreadyReversedError(Exception):
     pass
 
 
+class BatchRejectedError(Exception):
+    """Raised when an all-or-nothing batch contains at least one failing line."""
+
+    def __init__(self, results: list[DeltaResult]):
+        self.results = results
+        failed = sum(1 for r in results if r.status not in ("applied", "skipped"))
+        super().__init__(f"Batch rejected: {failed} of {len(results)} lines failed")
+
+
+class InventoryDelta(NamedTuple):
+    """One line of a batch passed to apply_inventory_deltas."""
+    item_id: UUID
+    delta: float
+    txn_type: str
+    reason: str | None = None
+
+
+class DeltaResult(NamedTuple):
+    """Per-line outcome of apply_inventory_deltas."""
+    item_id: UUID
+    delta: float
+    txn_type: str
+    status: str  # applied, item_not_found, insufficient_stock, invalid_delta, skipped
+    quantity: float | None = None
+    transaction_id: UUID | None = None
+    created_at: datetime | None = None
+    error: str | None = None
+
+
+def stock_delta_statement(item_id: UUID, delta: float) -> Executable:
+    """
+    Add ``delta`` to an item's stock with one relative statement, so
+    concurrent writers add up instead of overwriting each other.
+
+    A decrement only matches while the stock covers it; an increment
+    creates the stock row if there is none. Returns the new quantity, or no
+    row when the stock is insufficient.
+    """
+    if delta < 0:
+        return text(
+            "UPDATE stocks SET quantity = quantity + :delta, updated_at = now() "
+            "WHERE item_id = :item_id AND quantity + :delta >= 0 "
+            "RETURNING quantity"
+        ).bindparams(delta=delta, item_id=item_id)
+    t = Stock.__table__
+    stmt = pg_insert(t).values(item_id=item_id, quantity=delta)
+    return stmt.on_conflict_do_update(
+        index_elements=[t.c.item_id],
+        set_={"quantity": t.c.quantity + stmt.excluded.quantity, "updated_at": func.now()},
+    ).returning(t.c.quantity)
+
+
+def _ledger_entry(
+    item_id: UUID, delta: float, txn_type: str, reason: str | None, reverses_transaction_id: UUID | None
+) -> InventoryTransaction:
+    return InventoryTransaction(
+        item_id=item_id,
+        delta_quantity=delta,
+        txn_type=txn_type,
+        reason=reason,
+        reverses_transaction_id=reverses_transaction_id,
+    )
+
+
+def _insufficient_stock(item_id: UUID, delta: float) -> InsufficientStockError:
+    return InsufficientStockError(f"Insufficient stock for item {item_id}. Cannot apply delta {delta}")
+
+
 def apply_inventory_delta(
     session: Session,
     item_id: UUID,
@@ -38,7 +114,9 @@ def apply_inventory_delta(
 ) -> InventoryTransaction:
     """
     Apply an inventory delta and create a transaction record atomically.
-    
+
+    The stock changes through stock_delta_statement(), whatever the sign.
+
     Args:
         session: SQLAlchemy session
         item_id: UUID of the item
@@ -46,64 +124,175 @@ def apply_inventory_delta(
         txn_type: Type of transaction (RECEIPT, ISSUE, ADJUST, STOCKTAKE, REVERSAL)
         reason: Optional reason for the transaction
         reverses_transaction_id: Optional ID of transaction being reversed
-        
+
     Returns:
         Created InventoryTransaction instance
-        
+
     Raises:
         ItemNotFoundError: If the item does not exist
         InsufficientStockError: If the operation would cause negative stock
     """
-    # Verify item exists
-    item = session.get(Item, item_id)
-    if not item:
+    if session.get(Item, item_id) is None:
         raise ItemNotFoundError(f"Item {item_id} not found")
-    
-    # Get or create stock record
-    stock = session.execute(
-        select(Stock).where(Stock.item_id == item_id)
-    ).scalar_one_or_none()
-    
-    if not stock:
-        # Create new stock record only if delta is positive or zero
-        if delta < 0:
-            raise InsufficientStockError(f"Cannot reduce stock for item {item_id}: no stock record exists")
-        stock = Stock(item_id=item_id, quantity=0)
-        session.add(stock)
-        session.flush()
-    
-    # For decrements, use atomic conditional UPDATE to prevent race conditions
-    if delta < 0:
-        # Use raw SQL with RETURNING to atomically check and update
-        result = session.execute(
-            text(
-                "UPDATE stocks SET quantity = quantity + :delta, updated_at = now() "
-                "WHERE item_id = :item_id AND quantity + :delta >= 0 "
-                "RETURNING quantity"
-            ),
-            {"delta": delta, "item_id": item_id}
-        )
-        row = result.fetchone()
-        if row is None:
-            # No row was updated, meaning insufficient stock
-            raise InsufficientStockError(
-                f"Insufficient stock for item {item_id}. Cannot apply delta {delta}"
-            )
-        # Refresh the stock object to get updated quantity
-        session.expire(stock)
-    else:
-        # For positive deltas, simple update is safe
-        stock.quantity = float(stock.quantity) + delta
-    
-    # Create transaction record
-    txn = InventoryTransaction(
-        item_id=item_id,
-        delta_quantity=delta,
-        txn_type=txn_type,
-        reason=reason,
-        reverses_transaction_id=reverses_transaction_id,
-    )
+    if session.execute(stock_delta_statement(item_id, delta)).first() is None:
+        raise _insufficient_stock(item_id, delta)
+
+    txn = _ledger_entry(item_id, delta, txn_type, reason, reverses_transaction_id)
     session.add(txn)
     session.flush()
-    
     return txn
+
+
+async def apply_inventory_delta_async(
+    session: AsyncSession,
+    item_id: UUID,
+    delta: float,
+    txn_type: str,
+    reason: str | None = None,
+    reverses_transaction_id: UUID | None = None,
+) -> InventoryTransaction:
+    """
+    Async counterpart of apply_inventory_delta for the ASGI app.
+
+    Same arguments, return value and exceptions; see apply_inventory_delta.
+    """
+    if await session.get(Item, item_id) is None:
+        raise ItemNotFoundError(f"Item {item_id} not found")
+    if (await session.execute(stock_delta_statement(item_id, delta))).first() is None:
+        raise _insufficient_stock(item_id, delta)
+
+    txn = _ledger_entry(item_id, delta, txn_type, reason, reverses_transaction_id)
+    session.add(txn)
+    await session.flush()
+    # created_at is server-generated; load it now since async sessions cannot lazy-load
+    await session.refresh(txn, ["created_at"])
+    return txn
+
+
+def apply_inventory_deltas(
+    session: Session,
+    deltas: Sequence[InventoryDelta | tuple],
+    *,
+    atomic: bool = True,
+) -> list[DeltaResult]:
+    """
+    Apply many inventory deltas with a constant number of statements.
+
+    Items are checked with one query, the affected stock rows are locked with
+    one ``SELECT ... FOR UPDATE``, every line is validated against the running
+    quantity in order, and the surviving lines are written with a single
+    ``UPDATE ... FROM (VALUES ...)`` plus one multi-row ledger INSERT.
+
+    Args:
+        session: SQLAlchemy session
+        deltas: Sequence of (item_id, delta, txn_type, reason) tuples
+        atomic: If True, any failing line rejects the whole batch;
+            otherwise failing lines are skipped and the rest are applied
+
+    Returns:
+        One DeltaResult per input line, in input order
+
+    Raises:
+        BatchRejectedError: If atomic is True and any line fails
+        InsufficientStockError: If stock changed underneath the row locks
+    """
+    lines = [InventoryDelta(*d) for d in deltas]
+    if not lines:
+        return []
+
+    item_ids = {line.item_id for line in lines}
+    found = set(session.execute(select(Item.id).where(Item.id.in_(item_ids))).scalars())
+
+    # Lock in a stable order so concurrent batches cannot deadlock each other
+    current = {
+        row.item_id: float(row.quantity)
+        for row in session.execute(
+            select(Stock.item_id, Stock.quantity)
+            .where(Stock.item_id.in_(found))
+            .order_by(Stock.item_id)
+            .with_for_update()
+        )
+    }
+
+    running = dict(current)
+    results: list[DeltaResult] = []
+    for line in lines:
+        delta = float(line.delta)
+        if line.item_id not in found:
+            results.append(
+                DeltaResult(line.item_id, delta, line.txn_type, "item_not_found",
+                            error=f"Item {line.item_id} not found")
+            )
+            continue
+        if delta == 0:
+            results.append(
+                DeltaResult(line.item_id, delta, line.txn_type, "invalid_delta",
+                            error="Delta cannot be zero")
+            )
+            continue
+        after = running.get(line.item_id, 0.0) + delta
+        if after < 0:
+            results.append(
+                DeltaResult(line.item_id, delta, line.txn_type, "insufficient_stock",
+                            error=f"Insufficient stock for item {line.item_id}. "
+                                  f"Cannot apply delta {delta}")
+            )
+            continue
+        running[line.item_id] = after
+        results.append(DeltaResult(line.item_id, delta, line.txn_type, "applied", quantity=after))
+
+    if atomic and any(r.status != "applied" for r in results):
+        raise BatchRejectedError(
+            [r if r.status != "applied" else r._replace(status="skipped", quantity=None)
+             for r in results]
+        )
+
+    applied = [(i, line) for i, (line, r) in enumerate(zip(lines, results)) if r.status == "applied"]
+    if not applied:
+        return results
+
+    net: dict[UUID, float] = {}
+    for _, line in applied:
+        net[line.item_id] = net.get(line.item_id, 0.0) + float(line.delta)
+
+    missing = [item_id for item_id in net if item_id not in current]
+    if missing:
+        session.execute(
+            pg_insert(Stock)
+            .values([{"item_id": item_id, "quantity": 0} for item_id in missing])
+            .on_conflict_do_nothing(index_elements=[Stock.item_id])
+        )
+
+    v = values(
+        column("item_id", PG_UUID(as_uuid=True)),
+        column("delta", Numeric(14, 3)),
+        name="v",
+    ).data(list(net.items()))
+    updated = session.execute(
+        update(Stock)
+        .where(Stock.item_id == v.c.item_id, Stock.quantity + v.c.delta >= 0)
+        .values(quantity=Stock.quantity + v.c.delta, updated_at=func.now())
+        .returning(Stock.item_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if len(updated) != len(net):
+        raise InsufficientStockError("Stock changed while applying batch; retry the request")
+
+    txns = session.execute(
+        insert(InventoryTransaction)
+        .returning(InventoryTransaction.id, InventoryTransaction.created_at, sort_by_parameter_order=True),
+        [
+            {
+                "item_id": line.item_id,
+                "delta_quantity": line.delta,
+                "txn_type": line.txn_type,
+                "reason": line.reason,
+            }
+            for _, line in applied
+        ],
+    ).all()
+
+    for (i, _), txn in zip(applied, txns):
+        results[i] = results[i]._replace(transaction_id=txn.id, created_at=txn.created_at)
+
+    return results
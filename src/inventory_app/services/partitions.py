@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import gzip
+import os
+import re
+from datetime import UTC, date, datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from inventory_app.models import InventoryTransaction
+
+# Monthly range partitions of the ledger, created by migration e7d24b6a9c51
+# and by ensure_ledger_partitions. Bounds are UTC month starts.
+LEDGER_TABLE = InventoryTransaction.__tablename__
+DEFAULT_PARTITION = f"{LEDGER_TABLE}_default"
+_PARTITION_NAME = re.compile(rf"^{LEDGER_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+class LedgerPartition(NamedTuple):
+    """A monthly ledger partition covering ``start`` (inclusive) to ``end`` (exclusive)."""
+    name: str
+    start: date
+    end: date
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> date:
+    return datetime.now(UTC).date().replace(day=1)
+
+
+def partition_for(month: date) -> LedgerPartition:
+    month = month.replace(day=1)
+    return LedgerPartition(
+        f"{LEDGER_TABLE}_y{month.year:04d}m{month.month:02d}", month, add_months(month, 1)
+    )
+
+
+def _bound(day: date) -> str:
+    return f"{day.isoformat()} 00:00:00+00"
+
+
+def list_ledger_partitions(session: Session) -> list[LedgerPartition]:
+    """Monthly partitions currently attached to the ledger, oldest first."""
+    names = session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ),
+        {"parent": LEDGER_TABLE},
+    ).scalars()
+    partitions = []
+    for name in names:
+        if m := _PARTITION_NAME.match(name):
+            partitions.append(partition_for(date(int(m[1]), int(m[2]), 1)))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+def retained_since(session: Session) -> date | None:
+    """First day still covered by an attached monthly partition (None if unpartitioned)."""
+    partitions = list_ledger_partitions(session)
+    return partitions[0].start if partitions else None
+
+
+def _set_lock_timeout(session: Session, lock_timeout_ms: int) -> None:
+    # DDL on the parent waits behind running queries; fail fast instead of queueing everyone
+    session.execute(text("SELECT set_config('lock_timeout', :v, true)"), {"v": f"{lock_timeout_ms}ms"})
+
+
+def ensure_ledger_partitions(
+    session: Session, *, months_ahead: int = 3, months_back: int = 0, lock_timeout_ms: int = 5000
+) -> list[str]:
+    """
+    Create any missing monthly partitions from ``months_back`` months ago to ``months_ahead`` months out.
+
+    Rows that already landed in the DEFAULT partition for a month being
+    created are moved into the new partition in the same transaction.
+    Statement-level triggers on the parent do not fire for the move, so the
+    movement rollup is not counted twice.
+
+    Returns:
+        Names of the partitions created
+    """
+    _set_lock_timeout(session, lock_timeout_ms)
+    existing = {p.name for p in list_ledger_partitions(session)}
+    created = []
+    month = add_months(current_month(), -months_back)
+    for _ in range(months_back + months_ahead + 1):
+        p = partition_for(month)
+        month = p.end
+        if p.name in existing:
+            continue
+
+        bounds = {"start": _bound(p.start), "end": _bound(p.end)}
+        where = "created_at >= CAST(:start AS timestamptz) AND created_at < CAST(:end AS timestamptz)"
+        stray = session.execute(
+            text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {where}"), bounds
+        ).scalar_one()
+        if stray:
+            session.execute(
+                text(
+                    f"CREATE TEMPORARY TABLE ledger_partition_move ON COMMIT DROP AS "
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {where} RETURNING *) "
+                    "SELECT * FROM moved"
+                ),
+                bounds,
+            )
+        session.execute(
+            text(
+                f"CREATE TABLE {p.name} PARTITION OF {LEDGER_TABLE} "
+                f"FOR VALUES FROM ('{_bound(p.start)}') TO ('{_bound(p.end)}')"
+            )
+        )
+        if stray:
+            session.execute(text(f"INSERT INTO {p.name} SELECT * FROM ledger_partition_move"))
+            session.execute(text("DROP TABLE ledger_partition_move"))
+        created.append(p.name)
+    return created
+
+
+def expired_ledger_partitions(session: Session, *, keep_months: int) -> list[LedgerPartition]:
+    """Attached partitions that end before the first of the ``keep_months`` most recent months."""
+    cutoff = add_months(current_month(), -(keep_months - 1))
+    return [p for p in list_ledger_partitions(session) if p.end <= cutoff]
+
+
+def archive_ledger_partition(
+    session: Session,
+    partition: LedgerPartition,
+    *,
+    archive_dir: Path | None,
+    lock_timeout_ms: int = 5000,
+) -> Path | None:
+    """
+    Detach one partition from the ledger and optionally archive it.
+
+    With ``archive_dir`` the partition is written to
+    ``<archive_dir>/<name>.csv.gz`` (CSV with header, via COPY) and dropped;
+    the file is complete on disk before the caller commits the drop.
+    Without it the partition is only detached and stays as a plain table.
+    Daily movement rollups for the archived month are kept.
+
+    Returns:
+        Path of the archive file, or None if the partition was only detached
+    """
+    _set_lock_timeout(session, lock_timeout_ms)
+    session.execute(text(f"ALTER TABLE {LEDGER_TABLE} DETACH PARTITION {partition.name}"))
+    if archive_dir is None:
+        return None
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{partition.name}.csv.gz"
+    partial = path.with_suffix(".gz.partial")
+    cursor = session.connection().connection.driver_connection.cursor()
+    with gzip.open(partial, "wb") as out, cursor.copy(
+        f"COPY (SELECT * FROM {partition.name} ORDER BY created_at, id) TO STDOUT WITH (FORMAT csv, HEADER)"
+    ) as copy:
+        for chunk in copy:
+            out.write(chunk)
+    with open(partial, "rb") as f:
+        os.fsync(f.fileno())
+    partial.replace(path)
+
+    session.execute(text(f"DROP TABLE {partition.name}"))
+    return path
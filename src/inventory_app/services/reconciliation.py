@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import multiprocessing
+import time as clock
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, date, datetime, time
+from typing import NamedTuple
+from uuid import UUID
+
+from sqlalchemy import Numeric, Select, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from inventory_app.db import get_session, init_db
+from inventory_app.models import InventoryTransaction, ItemDailyMovement, Stock
+from inventory_app.services.partitions import retained_since
+
+RECONCILE_REASON = "reconciliation"
+_UUID_SPACE = 1 << 128
+
+
+class Discrepancy(NamedTuple):
+    """An item whose stocks.quantity differs from the sum of its ledger deltas."""
+    item_id: UUID
+    stock_quantity: float
+    ledger_quantity: float
+    difference: float  # stock_quantity - ledger_quantity
+
+
+class ReconcileChunk(NamedTuple):
+    """One item_id range of a reconciliation pass; ``hi`` is None for the last one."""
+    lo: UUID
+    hi: UUID | None
+
+
+class ChunkResult(NamedTuple):
+    chunk: ReconcileChunk
+    discrepancies: list[Discrepancy]
+    seconds: float
+
+
+def item_id_chunks(count: int) -> list[ReconcileChunk]:
+    """
+    Split the item_id space into ``count`` contiguous ranges.
+
+    Item ids are random (gen_random_uuid), so equal slices of the UUID
+    space hold roughly equal numbers of items and ledger rows.
+    """
+    count = max(count, 1)
+    bounds = [UUID(int=i * _UUID_SPACE // count) for i in range(count)]
+    return [ReconcileChunk(lo, hi) for lo, hi in zip(bounds, [*bounds[1:], None], strict=True)]
+
+
+def discrepancy_query(
+    *,
+    floor: date | None,
+    chunk: ReconcileChunk | None = None,
+    item_ids: Sequence[UUID] | None = None,
+) -> Select:
+    """
+    Items in ``chunk`` (or ``item_ids``) whose stock differs from their ledger.
+
+    One statement, so stocks and the ledger are read from the same snapshot.
+    The expected quantity is the ledger sum from ``floor`` on plus the
+    rollups of the days before it, whose ledger rows may have been archived;
+    with ``floor`` None (nothing partitioned) it is the plain ledger sum.
+    The ledger branch is an index-only scan of
+    ix_inventory_transactions_item_id_created_at_cover over the range.
+    A missing stocks row counts as 0.
+
+    Args:
+        floor: First day still in the ledger (services.partitions.retained_since)
+        chunk: Item id range to check
+        item_ids: Explicit items to check instead of a range
+    """
+    ledger = InventoryTransaction
+    m = ItemDailyMovement
+
+    def scope(column) -> list:
+        if item_ids is not None:
+            return [column.in_(item_ids)]
+        if chunk is None:
+            return []
+        conditions = [column >= chunk.lo]
+        if chunk.hi is not None:
+            conditions.append(column < chunk.hi)
+        return conditions
+
+    zero = literal(0, type_=Numeric(14, 3))
+    ledger_rows = select(ledger.item_id, zero, ledger.delta_quantity).where(*scope(ledger.item_id))
+    parts = [select(Stock.item_id, Stock.quantity, zero).where(*scope(Stock.item_id))]
+    if floor is not None:
+        ledger_rows = ledger_rows.where(ledger.created_at >= datetime.combine(floor, time.min, UTC))
+        parts.append(
+            select(m.item_id, zero, m.qty_in - m.qty_out).where(*scope(m.item_id), m.day < floor)
+        )
+    parts.append(ledger_rows)
+
+    combined = union_all(*parts).subquery()
+    item_id, stock, expected = combined.c
+    stock_sum = func.sum(stock)
+    expected_sum = func.sum(expected)
+    return (
+        select(
+            item_id.label("item_id"),
+            stock_sum.label("stock_quantity"),
+            expected_sum.label("ledger_quantity"),
+            (stock_sum - expected_sum).label("difference"),
+        )
+        .group_by(item_id)
+        .having(stock_sum != expected_sum)
+        .order_by(item_id)
+    )
+
+
+def reconcile_chunk(session: Session, chunk: ReconcileChunk, floor: date | None) -> ChunkResult:
+    """Run one range of a reconciliation pass (read only)."""
+    start = clock.perf_counter()
+    rows = session.execute(discrepancy_query(floor=floor, chunk=chunk)).all()
+    return ChunkResult(chunk, [Discrepancy(*r) for r in rows], clock.perf_counter() - start)
+
+
+def _worker_init() -> None:
+    init_db()
+
+
+def _worker_chunk(chunk: ReconcileChunk, floor: date | None) -> ChunkResult:
+    session = get_session()
+    try:
+        return reconcile_chunk(session, chunk, floor)
+    finally:
+        session.rollback()
+
+
+def reconcile(session: Session, *, chunks: int = 64, workers: int = 1) -> Iterator[ChunkResult]:
+    """
+    Compare stocks with the ledger, one item_id range at a time.
+
+    Each range is a single set-based statement, so memory stays bounded by
+    the number of discrepancies rather than the ledger's size. With
+    ``workers`` > 1 the ranges run in a process pool, each worker with its
+    own engine (spawned, not forked, so no connection is shared); results
+    are yielded as ranges finish.
+
+    Args:
+        session: Session used to read the retained-ledger floor (and to run
+            the ranges when ``workers`` is 1)
+        chunks: Number of item_id ranges
+        workers: Worker processes
+    """
+    floor = retained_since(session)
+    ranges = item_id_chunks(chunks)
+    if workers <= 1:
+        for chunk in ranges:
+            yield reconcile_chunk(session, chunk, floor)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_worker_init) as pool:
+        yield from pool.map(_worker_chunk, ranges, [floor] * len(ranges))
+
+
+def write_adjustments(
+    session: Session, item_ids: Sequence[UUID], *, reason: str = RECONCILE_REASON
+) -> list[Discrepancy]:
+    """
+    Append ADJUST ledger rows so the ledger matches stocks for ``item_ids``.
+
+    stocks is left as is: it is what the stocktakes counted and what
+    issues were checked against, so the ledger is the side brought in line.
+    The stocks rows are locked first (in item_id order, like
+    apply_inventory_deltas) and the discrepancies recomputed under the
+    lock, so an item that changed since the report gets the right delta and
+    one that is already consistent gets none. Does not commit.
+
+    Returns:
+        The discrepancies that were corrected
+    """
+    if not item_ids:
+        return []
+    session.execute(
+        select(Stock.item_id)
+        .where(Stock.item_id.in_(item_ids))
+        .order_by(Stock.item_id)
+        .with_for_update()
+    ).all()
+    floor = retained_since(session)
+    rows = session.execute(discrepancy_query(floor=floor, item_ids=item_ids)).all()
+    found = [Discrepancy(*r) for r in rows]
+    if found:
+        session.execute(
+            insert(InventoryTransaction),
+            [
+                {"item_id": d.item_id, "delta_quantity": d.difference, "txn_type": "ADJUST", "reason": reason}
+                for d in found
+            ],
+        )
+    return found
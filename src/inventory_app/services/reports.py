@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from datetime import UTC, date, datetime, time, timedelta
+from uuid import UUID
+
+from sqlalchemy import Select, delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from inventory_app.models import InventoryTransaction, Item, ItemDailyMovement, Stock
+from inventory_app.services.partitions import retained_since
+
+MOVEMENT_GROUPS = ("category", "item", "day")
+
+
+def ledger_today() -> date:
+    """Today's reporting day; matches the ledger_day() SQL function (UTC)."""
+    return datetime.now(UTC).date()
+
+
+def _net(txn_type: str):
+    m = ItemDailyMovement
+    return func.coalesce(func.sum(m.qty_in - m.qty_out).filter(m.txn_type == txn_type), 0)
+
+
+def movement_report_query(
+    *,
+    group_by: str,
+    since: date,
+    until: date,
+    category: str | None = None,
+    item_id: UUID | None = None,
+) -> Select:
+    """
+    Aggregate item_daily_movements over ``since``..``until`` (inclusive).
+
+    Reads only the rollup rows for the window (at most one per item, day and
+    transaction type), never the ledger itself.
+
+    Args:
+        group_by: ``category``, ``item`` or ``day``
+        since: First reporting day
+        until: Last reporting day
+        category: Only items in this category
+        item_id: Only this item
+
+    Raises:
+        ValueError: If group_by is not one of MOVEMENT_GROUPS
+    """
+    m = ItemDailyMovement
+    if group_by == "category":
+        keys = (Item.category,)
+        order = (Item.category.asc().nulls_last(),)
+    elif group_by == "item":
+        keys = (m.item_id, Item.sku, Item.name, Item.unit, Item.category)
+        order = (Item.name.asc(), m.item_id.asc())
+    elif group_by == "day":
+        keys = (m.day,)
+        order = (m.day.asc(),)
+    else:
+        raise ValueError(f"group_by must be one of: {', '.join(MOVEMENT_GROUPS)}")
+
+    query = (
+        select(
+            *keys,
+            func.coalesce(func.sum(m.qty_in).filter(m.txn_type == "RECEIPT"), 0).label("receipts"),
+            func.coalesce(func.sum(m.qty_out).filter(m.txn_type == "ISSUE"), 0).label("issues"),
+            _net("ADJUST").label("adjustments"),
+            _net("STOCKTAKE").label("stocktake_variance"),
+            _net("REVERSAL").label("reversals"),
+            func.sum(m.qty_in).label("qty_in"),
+            func.sum(m.qty_out).label("qty_out"),
+            func.sum(m.qty_in - m.qty_out).label("net_change"),
+            func.sum(m.txn_count).label("txn_count"),
+        )
+        .where(m.day.between(since, until))
+        .group_by(*keys)
+        .order_by(*order)
+    )
+    if group_by != "day" or category:
+        query = query.join(Item, Item.id == m.item_id)
+    if category:
+        query = query.where(Item.category == category)
+    if item_id:
+        query = query.where(m.item_id == item_id)
+    return query
+
+
+def stock_by_category_query() -> Select:
+    """Current on-hand totals per item category, computed from stocks (one row per item)."""
+    quantity = func.coalesce(Stock.quantity, 0)
+    return (
+        select(
+            Item.category,
+            func.count(Item.id).label("items_count"),
+            func.sum(quantity).label("total_quantity"),
+            func.count(Item.id).filter(quantity <= 0).label("out_of_stock_count"),
+        )
+        .select_from(Item)
+        .outerjoin(Stock, Stock.item_id == Item.id)
+        .group_by(Item.category)
+        .order_by(Item.category.asc().nulls_last())
+    )
+
+
+def rebuild_daily_movements(session: Session, *, since: date | None = None) -> int:
+    """
+    Recompute item_daily_movements from the ledger.
+
+    The trigger keeps the rollup current, so this is only needed to repair
+    it (e.g. after ledger rows were changed by hand or ledger_day() was
+    redefined). Days before the oldest attached ledger partition keep their
+    rollups, since their ledger rows may have been archived. Writers to
+    inventory_transactions are blocked until the caller commits.
+
+    Args:
+        session: SQLAlchemy session
+        since: Only rebuild reporting days on or after this date (default: all)
+
+    Returns:
+        Number of rollup rows written
+    """
+    ledger = InventoryTransaction.__table__
+    session.execute(text("LOCK TABLE inventory_transactions IN SHARE MODE"))
+    floor = retained_since(session)
+    if floor is not None and (since is None or since < floor):
+        since = floor
+
+    cleared = delete(ItemDailyMovement)
+    day = func.ledger_day(ledger.c.created_at)
+    query = select(
+        day,
+        ledger.c.item_id,
+        ledger.c.txn_type,
+        func.sum(func.greatest(ledger.c.delta_quantity, 0)),
+        func.sum(func.greatest(-ledger.c.delta_quantity, 0)),
+        func.count(),
+    ).group_by(day, ledger.c.item_id, ledger.c.txn_type)
+    if since is not None:
+        cleared = cleared.where(ItemDailyMovement.day >= since)
+        # coarse created_at bound so the ledger index can be used, then the exact day
+        lower = datetime.combine(since, time.min, UTC) - timedelta(days=1)
+        query = query.where(ledger.c.created_at >= lower, day >= since)
+    session.execute(cleared)
+
+    m = ItemDailyMovement.__table__
+    result = session.execute(
+        insert(m).from_select(
+            [m.c.day, m.c.item_id, m.c.txn_type, m.c.qty_in, m.c.qty_out, m.c.txn_count], query
+        ),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import unicodedata
+from itertools import chain
+
+from sqlalchemy import Row, Select, event, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from inventory_app.cache import LRUCache
+from inventory_app.models import Item
+
+# Katakana (ァ..ヶ) folds onto hiragana (ぁ..ゖ) so either script matches both.
+# Must stay in sync with the search_normalize() SQL function created by
+# migration 9b0f3c2d7e41 (whitespace collapsing since c3e9a1d5f720).
+KATAKANA = "".join(chr(c) for c in range(0x30A1, 0x30F7))
+HIRAGANA = "".join(chr(c) for c in range(0x3041, 0x3097))
+_KATAKANA_TO_HIRAGANA = str.maketrans(KATAKANA, HIRAGANA)
+
+# Serialized /api/suggestions results keyed by (normalized query, limit).
+# Sized from SUGGESTIONS_CACHE_SIZE / SUGGESTIONS_CACHE_TTL in create_app.
+suggestion_cache = LRUCache()
+
+
+def normalize_search_text(value: str) -> str:
+    """
+    Normalize text for searching.
+
+    NFKC folds full-width ASCII to half-width and half-width kana to
+    full-width, then the text is lower-cased, katakana is folded onto
+    hiragana and runs of whitespace are collapsed.
+    """
+    value = unicodedata.normalize("NFKC", value).lower().translate(_KATAKANA_TO_HIRAGANA)
+    return " ".join(value.split())
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+_COLUMNS = (Item.id, Item.name, Item.sku, Item.category, Item.manufacturer)
+
+
+def sku_prefix_query(q: str, limit: int) -> Select:
+    """Items whose normalized SKU starts with the normalized query ``q`` (btree prefix probe)."""
+    norm_sku = func.search_normalize(Item.sku)
+    return (
+        select(*_COLUMNS)
+        .where(norm_sku.like(_escape_like(q) + "%", escape="\\"))
+        .order_by(norm_sku.asc())
+        .limit(limit)
+    )
+
+
+def ranked_search_query(q: str, limit: int, exclude_ids: list | None = None) -> Select:
+    """pg_trgm search of the normalized query ``q`` over name, SKU and manufacturer."""
+    norm_name = func.search_normalize(Item.name)
+    norm_sku = func.search_normalize(Item.sku)
+    norm_manufacturer = func.search_normalize(Item.manufacturer)
+
+    contains = "%" + _escape_like(q) + "%"
+    rank = func.greatest(
+        func.word_similarity(q, norm_name),
+        func.word_similarity(q, norm_sku),
+        func.word_similarity(q, norm_manufacturer),
+    )
+    query = (
+        select(*_COLUMNS)
+        .where(
+            or_(
+                norm_name.like(contains, escape="\\"),
+                norm_sku.like(contains, escape="\\"),
+                norm_manufacturer.like(contains, escape="\\"),
+                literal(q).op("<%")(norm_name),
+                literal(q).op("<%")(norm_sku),
+                literal(q).op("<%")(norm_manufacturer),
+            )
+        )
+        .order_by(rank.desc(), Item.name.asc())
+        .limit(limit)
+    )
+    if exclude_ids:
+        query = query.where(Item.id.not_in(exclude_ids))
+    return query
+
+
+def search_items(session: Session, query: str, *, limit: int = 10) -> list[Row]:
+    """
+    Search items by name, SKU and manufacturer.
+
+    Items whose normalized SKU starts with the query are returned first from
+    a btree prefix probe; if they fill the page no trigram search runs. The
+    rest of the page is filled by a pg_trgm search over the normalized
+    name, SKU and manufacturer, ranked by word similarity.
+
+    Args:
+        session: SQLAlchemy session
+        query: Raw user input
+        limit: Maximum number of rows to return
+
+    Returns:
+        Rows with id, name, sku, category and manufacturer
+    """
+    q = normalize_search_text(query)
+    if not q:
+        return []
+
+    rows = list(session.execute(sku_prefix_query(q, limit)).all())
+    if len(rows) < limit:
+        ranked = ranked_search_query(q, limit - len(rows), [r.id for r in rows])
+        rows.extend(session.execute(ranked).all())
+    return rows
+
+
+@event.listens_for(Session, "after_flush")
+def _track_item_writes(session: Session, flush_context) -> None:
+    if any(isinstance(obj, Item) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["items_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_suggestions(session: Session) -> None:
+    # Any committed insert, update or delete of an Item drops cached suggestions
+    if session.info.pop("items_changed", False):
+        suggestion_cache.clear()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_item_writes(session: Session, previous_transaction) -> None:
+    session.info.pop("items_changed", None)
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from typing import NamedTuple
+from uuid import UUID
+
+import psycopg
+from sqlalchemy import TextClause, literal_column, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from inventory_app.db import SessionLocal, get_listen_url
+from inventory_app.models import Item, Stock
+
+log = logging.getLogger("inventory_app.stock_changes")
+
+# Notified (payload: transaction id) by a statement trigger on stocks
+CHANNEL = "stock_changes"
+
+# The same fields as /api/stocks rows, so a dashboard can replace its rows by item_id
+STOCK_CHANGE_COLUMNS = (
+    Stock.id,
+    Stock.item_id,
+    Item.sku,
+    Item.name,
+    Item.unit,
+    Stock.quantity,
+    Stock.shelf_location,
+    Stock.shelf_location_note,
+    Stock.updated_at,
+)
+
+
+# Every transaction below this id has finished; resume token of the stream and of stock exports
+HORIZON_QUERY = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+
+
+class StreamUnavailableError(Exception):
+    """Raised when the LISTEN connection for stock changes cannot be opened."""
+    pass
+
+
+class StockChange(NamedTuple):
+    """A stock row as of the transaction (``xid``) that last changed it."""
+    xid: int
+    row: dict
+
+
+def parse_token(value: str) -> int:
+    """
+    Parse a resume token sent as an event id by the stock change stream.
+
+    Raises:
+        ValueError: If the value is not a token
+    """
+    if not value.isdigit() or len(value) > 20:
+        raise ValueError("not a stock change token")
+    return int(value)
+
+
+def changed_between(since: int, horizon: int) -> TextClause:
+    """Stocks stamped in [since, horizon): changed after token ``since`` and final as of token ``horizon``."""
+    return text(
+        "stocks.change_xid >= CAST(:since AS xid8) AND stocks.change_xid < CAST(:horizon AS xid8)"
+    ).bindparams(since=str(since), horizon=str(horizon))
+
+
+def fetch_stock_changes(session: Session, since: int | None) -> tuple[list[StockChange], int]:
+    """
+    Read the stocks changed since a resume token.
+
+    A trigger stamps every stock row with the id of the transaction that
+    last changed its quantity or shelf location (``stocks.change_xid``). A
+    token is a transaction-id horizon: every transaction below it has
+    finished, so rows stamped below it are final. The rows stamped in
+    [since, horizon) are the current state of every stock changed since
+    ``since``; anything committed later is stamped at or above the returned
+    horizon and is read by the next call.
+
+    Returns:
+        The changed rows ordered by transaction, and the new token. With
+        ``since=None`` only the current token is returned.
+    """
+    horizon = int(session.execute(HORIZON_QUERY).scalar_one())
+    if since is None or since >= horizon:
+        return [], horizon
+    rows = session.execute(
+        select(*STOCK_CHANGE_COLUMNS, literal_column("stocks.change_xid::text").label("change_xid"))
+        .join(Item, Item.id == Stock.item_id)
+        .where(changed_between(since, horizon))
+        .order_by(literal_column("stocks.change_xid"))
+    ).all()
+    changes = []
+    for r in rows:
+        row = r._asdict()
+        changes.append(StockChange(int(row.pop("change_xid")), row))
+    return changes, horizon
+
+
+class StockSubscription:
+    """
+    One stream client: the newest unsent change of each stock it follows.
+
+    A change offered while an earlier one for the same item is still unsent
+    replaces it, so a burst of writes or a slow client costs one row per
+    item. ``token`` is the horizon everything pending (or already taken)
+    is complete up to.
+    """
+
+    def __init__(self, item_ids: Iterable[UUID] = (), shelf_location_prefix: str | None = None):
+        self.item_ids = frozenset(item_ids)
+        self.shelf_location_prefix = shelf_location_prefix
+        self.token = 0
+        self._cond = threading.Condition()
+        self._pending: dict[UUID, StockChange] = {}
+
+    def matches(self, change: StockChange) -> bool:
+        if self.item_ids and change.row["item_id"] not in self.item_ids:
+            return False
+        if self.shelf_location_prefix:
+            return (change.row["shelf_location"] or "").startswith(self.shelf_location_prefix)
+        return True
+
+    def offer(self, changes: Iterable[StockChange], horizon: int) -> None:
+        with self._cond:
+            for change in changes:
+                if not self.matches(change):
+                    continue
+                current = self._pending.get(change.row["item_id"])
+                if current is None or change.xid >= current.xid:
+                    self._pending[change.row["item_id"]] = change
+            self.token = max(self.token, horizon)
+            if self._pending:
+                self._cond.notify()
+
+    def take(self, timeout: float) -> tuple[list[dict], int]:
+        """
+        Wait up to ``timeout`` seconds for changes.
+
+        Returns:
+            The pending rows in commit order (possibly none), and the token
+            to resume after them
+        """
+        with self._cond:
+            if not self._pending and timeout > 0:
+                self._cond.wait(timeout)
+            changes = sorted(self._pending.values(), key=lambda c: c.xid)
+            self._pending.clear()
+            return [c.row for c in changes], self.token
+
+
+class StockChangeHub:
+    """
+    Fans committed stock changes out to stream subscriptions.
+
+    One thread per process LISTENs on the ``stock_changes`` channel, which
+    a trigger on stocks notifies when a transaction that changed a quantity
+    or shelf location commits. After a notification it collects the rest of
+    the burst for ``coalesce`` seconds, reads every stock changed since its
+    cursor with one query and offers the rows to every subscription. It also
+    reads every ``poll`` seconds without a notification, which covers
+    notifications lost while reconnecting and rows held back by a
+    transaction that was still running. The thread starts with the first
+    subscription and stops once the last one has gone.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: set[StockSubscription] = set()
+        self._running = False
+        self.cursor: int | None = None
+        self.coalesce = 0.2
+        self.poll = 15.0
+        self.notifications = 0
+        self.fetches = 0
+        self.changes = 0
+        self.reconnects = 0
+
+    def configure(self, coalesce: float = 0.2, poll: float = 15.0) -> None:
+        with self._lock:
+            self.coalesce = max(coalesce, 0.0)
+            self.poll = max(poll, 0.1)
+
+    def subscribe(
+        self,
+        session: Session,
+        since: int | None = None,
+        *,
+        item_ids: Iterable[UUID] = (),
+        shelf_location_prefix: str | None = None,
+    ) -> StockSubscription:
+        """
+        Follow stock changes, starting after the resume token ``since``.
+
+        The rows changed since ``since`` are read with ``session`` and
+        queued straight away; without a token the subscription starts from
+        now. Call unsubscribe() when the client goes away.
+
+        Raises:
+            StreamUnavailableError: If the LISTEN connection cannot be opened
+        """
+        subscription = StockSubscription(item_ids, shelf_location_prefix)
+        with self._lock:
+            if not self._running:
+                self._start()
+            self._subscriptions.add(subscription)
+        # Registered first, so the live changes overlap this catch-up instead of missing any;
+        # the newer version of a stock wins either way
+        try:
+            changes, horizon = fetch_stock_changes(session, since)
+        except Exception:
+            self.unsubscribe(subscription)
+            raise
+        subscription.offer(changes, horizon)
+        return subscription
+
+    def unsubscribe(self, subscription: StockSubscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def _connect(self) -> psycopg.Connection:
+        try:
+            conn = psycopg.connect(get_listen_url(), autocommit=True)
+        except psycopg.Error as e:
+            raise StreamUnavailableError(f"cannot listen for stock changes: {e}") from e
+        try:
+            conn.execute(f"LISTEN {CHANNEL}")
+        except psycopg.Error as e:
+            conn.close()
+            raise StreamUnavailableError(f"cannot listen for stock changes: {e}") from e
+        return conn
+
+    def _start(self) -> None:
+        # LISTEN before taking the cursor, so nothing committed after it goes unnotified
+        conn = self._connect()
+        try:
+            with SessionLocal.session_factory() as session:
+                _, self.cursor = fetch_stock_changes(session, None)
+        except SQLAlchemyError as e:
+            conn.close()
+            raise StreamUnavailableError(f"cannot read stock changes: {e}") from e
+        self._running = True
+        threading.Thread(target=self._run, args=(conn,), name="stock-change-hub", daemon=True).start()
+
+    def _wait(self, conn: psycopg.Connection, timeout: float) -> int | None:
+        """Wait for a notification and the rest of its burst; return the highest transaction id."""
+        notified = None
+        for window, stop_after in ((timeout, 1), (self.coalesce, None)):
+            for notify in conn.notifies(timeout=window, stop_after=stop_after):
+                notified = max(notified or 0, int(notify.payload))
+                self.notifications += 1
+            if notified is None or not self.coalesce:
+                break
+        return notified
+
+    def _fetch(self) -> int | None:
+        """Read and offer the changes since the cursor; None once nobody is subscribed."""
+        with self._lock:
+            if not self._subscriptions:
+                self._running = False
+                return None
+            cursor = self.cursor
+        with SessionLocal.session_factory() as session:
+            changes, horizon = fetch_stock_changes(session, cursor)
+        with self._lock:
+            self.cursor = horizon
+            self.fetches += 1
+            self.changes += len(changes)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(changes, horizon)
+        return horizon
+
+    def _run(self, conn: psycopg.Connection | None) -> None:
+        held = None  # highest notified transaction the horizon had not passed yet
+        delay = self.coalesce
+        backoff = 0.5
+        while True:
+            try:
+                if conn is None:
+                    conn = self._connect()
+                    self.reconnects += 1
+                    log.info("stock change listener reconnected")
+                notified = self._wait(conn, delay if held is not None else self.poll)
+                horizon = self._fetch()
+            except (StreamUnavailableError, psycopg.Error, SQLAlchemyError) as e:
+                log.warning("stock change listener failed, retrying in %.1fs: %s", backoff, e)
+                if conn is not None:
+                    conn.close()
+                conn = None
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.poll)
+                with self._lock:
+                    if not self._subscriptions:
+                        self._running = False
+                        return
+                continue
+            backoff = 0.5
+            if horizon is None:
+                conn.close()
+                return
+            newest = max(held or 0, notified or 0)
+            if newest >= horizon:
+                # a transaction older than the notified one is still running; look again soon
+                held = newest
+                delay = min(max(delay * 2, 0.05), self.poll)
+            else:
+                held = None
+                delay = self.coalesce
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "subscribers": len(self._subscriptions),
+                "cursor": str(self.cursor) if self.cursor is not None else None,
+                "coalesce_ms": self.coalesce * 1000,
+                "poll_seconds": self.poll,
+                "notifications": self.notifications,
+                "fetches": self.fetches,
+                "changes": self.changes,
+                "reconnects": self.reconnects,
+            }
+
+
+# Shared by every /api/stocks/changes stream in the process; configured in create_app
+stock_change_hub = StockChangeHub()
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import datetime
+from typing import NamedTuple
+from uuid import UUID
+
+from sqlalchemy import (
+    Integer,
+    Numeric,
+    Text,
+    column,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from inventory_app.models import (
+    InventoryTransaction,
+    Item,
+    Stock,
+    Stocktake,
+    StocktakeCountBatch,
+    StocktakeLine,
+)
+
+
+class StocktakeNotFoundError(Exception):
+    """Raised when a stocktake does not exist."""
+    pass
+
+
+class StocktakeAlreadyConfirmedError(Exception):
+    """Raised when confirming a stocktake whose completed_at is already set."""
+    pass
+
+
+class ConfirmResult(NamedTuple):
+    """Outcome of apply_stocktake_counts."""
+    stocktake_id: UUID
+    completed_at: datetime
+    transactions_count: int
+
+
+class StocktakeCount(NamedTuple):
+    """One scanned count passed to record_counts; exactly one of sku and item_id is set."""
+    sku: str | None
+    item_id: UUID | None
+    counted_quantity: float
+    note: str | None = None
+
+
+class CountResult(NamedTuple):
+    """Per-record outcome of record_counts."""
+    status: str  # applied, not_found, negative_count
+    line_id: int | None = None
+    item_id: UUID | None = None
+    sku: str | None = None
+    counted_quantity: float | None = None  # the line's count after this record
+    error: str | None = None
+
+
+class CountBatchResult(NamedTuple):
+    """Outcome of record_counts; ``results`` is empty when the batch was a resubmission."""
+    applied: int
+    rejected: int
+    replayed: bool
+    results: list[CountResult]
+
+
+def generate_stocktake_lines(
+    session: Session,
+    stocktake_id: UUID,
+    *,
+    shelf_location_prefix: str | None = None,
+    category: str | None = None,
+) -> int:
+    """
+    Snapshot current stock into stocktake_lines with one INSERT ... SELECT.
+
+    No ORM objects are created, so memory use does not depend on the number
+    of stock rows. Lines start with counted_quantity equal to the expected
+    quantity.
+
+    Args:
+        session: SQLAlchemy session
+        stocktake_id: UUID of the stocktake to fill
+        shelf_location_prefix: Only snapshot stocks whose shelf_location starts with this
+        category: Only snapshot stocks whose item has this category
+
+    Returns:
+        Number of lines created
+    """
+    stocks = Stock.__table__
+    query = select(
+        literal(stocktake_id, type_=StocktakeLine.stocktake_id.type),
+        stocks.c.item_id,
+        stocks.c.quantity,
+        stocks.c.quantity,
+        stocks.c.shelf_location,
+        stocks.c.shelf_location_note,
+    )
+    if shelf_location_prefix:
+        query = query.where(stocks.c.shelf_location.startswith(shelf_location_prefix, autoescape=True))
+    if category:
+        query = query.join(Item.__table__, Item.id == stocks.c.item_id).where(Item.category == category)
+
+    return session.execute(
+        insert(StocktakeLine.__table__).from_select(
+            [
+                "stocktake_id",
+                "item_id",
+                "expected_quantity",
+                "counted_quantity",
+                "shelf_location",
+                "shelf_location_note",
+            ],
+            query,
+        ),
+        execution_options={"preserve_rowcount": True},
+    ).rowcount
+
+
+def apply_stocktake_counts(session: Session, stocktake_id: UUID) -> ConfirmResult:
+    """
+    Apply counted quantities of a stocktake to stocks with set-based statements.
+
+    The stocktake is claimed first with a conditional UPDATE on completed_at,
+    so a concurrent or repeated confirmation blocks on the row lock and then
+    fails instead of applying the counts twice. All deltas are computed from
+    one join between stocktake_lines and the locked stocks rows, written to
+    the ledger with one INSERT ... SELECT and applied with one UPDATE.
+
+    The caller owns the transaction and must commit or roll back.
+
+    Args:
+        session: SQLAlchemy session
+        stocktake_id: UUID of the stocktake
+
+    Returns:
+        ConfirmResult with the completion time and number of ledger rows written
+
+    Raises:
+        StocktakeNotFoundError: If the stocktake does not exist
+        StocktakeAlreadyConfirmedError: If the stocktake was already confirmed
+    """
+    claimed = session.execute(
+        update(Stocktake)
+        .where(Stocktake.id == stocktake_id, Stocktake.completed_at.is_(None))
+        .values(completed_at=func.now())
+        .returning(Stocktake.title, Stocktake.completed_at)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if claimed is None:
+        exists = session.execute(
+            select(Stocktake.id).where(Stocktake.id == stocktake_id)
+        ).scalar_one_or_none()
+        if exists is None:
+            raise StocktakeNotFoundError(f"Stocktake {stocktake_id} not found")
+        raise StocktakeAlreadyConfirmedError(f"Stocktake {stocktake_id} is already confirmed")
+
+    lines = StocktakeLine.__table__
+    stocks = Stock.__table__
+
+    # Items counted above zero without a stock row get one, so they join below
+    session.execute(
+        pg_insert(stocks)
+        .from_select(
+            ["item_id", "quantity"],
+            select(lines.c.item_id, literal(0)).where(
+                lines.c.stocktake_id == stocktake_id, lines.c.counted_quantity != 0
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[stocks.c.item_id])
+    )
+
+    locked = (
+        select(stocks.c.item_id, stocks.c.quantity)
+        .join(lines, lines.c.item_id == stocks.c.item_id)
+        .where(lines.c.stocktake_id == stocktake_id)
+        .with_for_update(of=stocks)
+        .cte("locked")
+    )
+    written = session.execute(
+        insert(InventoryTransaction.__table__).from_select(
+            ["item_id", "delta_quantity", "txn_type", "reason"],
+            select(
+                lines.c.item_id,
+                lines.c.counted_quantity - locked.c.quantity,
+                literal("STOCKTAKE"),
+                literal(f"Stocktake: {claimed.title}"),
+            )
+            .join(locked, locked.c.item_id == lines.c.item_id)
+            .where(
+                lines.c.stocktake_id == stocktake_id,
+                lines.c.counted_quantity != locked.c.quantity,
+            ),
+        ),
+        execution_options={"preserve_rowcount": True},
+    ).rowcount
+
+    session.execute(
+        update(stocks)
+        .where(
+            lines.c.stocktake_id == stocktake_id,
+            lines.c.item_id == stocks.c.item_id,
+            lines.c.counted_quantity != stocks.c.quantity,
+        )
+        .values(quantity=lines.c.counted_quantity, updated_at=func.now())
+    )
+
+    return ConfirmResult(stocktake_id, claimed.completed_at, written)
+
+
+def record_counts(
+    session: Session,
+    stocktake_id: UUID,
+    counts: Sequence[StocktakeCount | tuple],
+    *,
+    mode: str = "set",
+    device_id: str | None = None,
+    sequence: int | None = None,
+) -> CountBatchResult:
+    """
+    Apply a batch of scanned counts to a stocktake with a constant number of statements.
+
+    Records are resolved to their lines by SKU or item id with one
+    ``SELECT ... FOR UPDATE`` (in line id order, so concurrent scanners
+    cannot deadlock) and written with one ``UPDATE ... FROM (VALUES ...)``.
+    With ``mode="set"`` a record replaces the count (the last one wins when
+    a line repeats); with ``mode="add"`` it is added to it, starting from 0
+    for a line not counted yet. Records without a line in the stocktake,
+    or that would take a count below 0, are rejected and the rest applied.
+
+    With ``device_id`` and ``sequence`` the batch is recorded per device, and
+    a batch whose pair was already applied changes nothing, so queued
+    batches can be resubmitted in any order. The stocktake row is locked
+    first: the line counter trigger updates it anyway, and taking it before
+    the lines keeps the lock order of concurrent batches, line PATCHes and
+    confirmations the same.
+    Does not commit.
+
+    Returns:
+        CountBatchResult with one CountResult per record, in input order
+
+    Raises:
+        StocktakeNotFoundError: If the stocktake does not exist
+        StocktakeAlreadyConfirmedError: If the stocktake was already confirmed
+    """
+    records = [StocktakeCount(*c) for c in counts]
+    state = session.execute(
+        select(Stocktake.completed_at).where(Stocktake.id == stocktake_id).with_for_update(key_share=True)
+    ).one_or_none()
+    if state is None:
+        raise StocktakeNotFoundError(f"Stocktake {stocktake_id} not found")
+    if state.completed_at is not None:
+        raise StocktakeAlreadyConfirmedError(f"Stocktake {stocktake_id} is already confirmed")
+
+    if device_id is not None:
+        claimed = session.execute(
+            pg_insert(StocktakeCountBatch)
+            .values(stocktake_id=stocktake_id, device_id=device_id, sequence=sequence)
+            .on_conflict_do_nothing()
+            .returning(StocktakeCountBatch.sequence)
+        ).scalar_one_or_none()
+        if claimed is None:
+            done = session.execute(
+                select(StocktakeCountBatch.applied, StocktakeCountBatch.rejected).where(
+                    StocktakeCountBatch.stocktake_id == stocktake_id,
+                    StocktakeCountBatch.device_id == device_id,
+                    StocktakeCountBatch.sequence == sequence,
+                )
+            ).one()
+            return CountBatchResult(done.applied, done.rejected, True, [])
+
+    skus = {r.sku for r in records if r.sku is not None}
+    item_ids = {r.item_id for r in records if r.item_id is not None}
+    rows = session.execute(
+        select(
+            StocktakeLine.id,
+            StocktakeLine.item_id,
+            Item.sku,
+            StocktakeLine.counted_quantity,
+            StocktakeLine.counted_at,
+        )
+        .join(Item, Item.id == StocktakeLine.item_id)
+        .where(
+            StocktakeLine.stocktake_id == stocktake_id,
+            or_(Item.sku.in_(skus), StocktakeLine.item_id.in_(item_ids)),
+        )
+        .order_by(StocktakeLine.id)
+        .with_for_update(of=StocktakeLine)
+    ).all()
+    by_sku = {row.sku: row for row in rows}
+    by_item = {row.item_id: row for row in rows}
+
+    # running count per line; an uncounted line still mirrors expected_quantity, so add starts at 0
+    running = {row.id: float(row.counted_quantity) if row.counted_at is not None else 0.0 for row in rows}
+    notes: dict[int, str] = {}
+    results: list[CountResult] = []
+    for record in records:
+        row = by_sku.get(record.sku) if record.sku is not None else by_item.get(record.item_id)
+        if row is None:
+            key = f"SKU {record.sku}" if record.sku is not None else f"item {record.item_id}"
+            results.append(
+                CountResult("not_found", sku=record.sku, item_id=record.item_id,
+                            error=f"No line for {key} in this stocktake")
+            )
+            continue
+        quantity = float(record.counted_quantity)
+        after = running[row.id] + quantity if mode == "add" else quantity
+        if after < 0:
+            results.append(
+                CountResult("negative_count", row.id, row.item_id, row.sku,
+                            error=f"Count for line {row.id} cannot go below 0")
+            )
+            continue
+        running[row.id] = after
+        if record.note is not None:
+            notes[row.id] = record.note
+        results.append(CountResult("applied", row.id, row.item_id, row.sku, after))
+
+    touched = {r.line_id for r in results if r.status == "applied"}
+    if touched:
+        v = values(
+            column("id", Integer),
+            column("counted", Numeric(14, 3)),
+            column("note", Text),
+            name="v",
+        ).data([(line_id, running[line_id], notes.get(line_id)) for line_id in sorted(touched)])
+        session.execute(
+            update(StocktakeLine)
+            .where(StocktakeLine.id == v.c.id)
+            .values(
+                counted_quantity=v.c.counted,
+                note=func.coalesce(v.c.note, StocktakeLine.note),
+                counted_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    applied = sum(1 for r in results if r.status == "applied")
+    if device_id is not None:
+        session.execute(
+            update(StocktakeCountBatch)
+            .where(
+                StocktakeCountBatch.stocktake_id == stocktake_id,
+                StocktakeCountBatch.device_id == device_id,
+                StocktakeCountBatch.sequence == sequence,
+            )
+            .values(applied=applied, rejected=len(results) - applied)
+        )
+    return CountBatchResult(applied, len(results) - applied, False, results)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Sequence
+from datetime import datetime
+from typing import NamedTuple
+from uuid import UUID
+
+from sqlalchemy import Row, TextClause, text
+
+# Tables whose rows carry a change_xid stamp and whose deletes are counted
+VERSIONED_TABLES = ("items", "stocks")
+
+
+class Version(NamedTuple):
+    """A validator of the data behind a response: an opaque tag and when it last changed."""
+    tag: str
+    last_modified: datetime | None
+
+
+def _columns(tables: Sequence[str]) -> str:
+    unknown = set(tables) - set(VERSIONED_TABLES)
+    if unknown:
+        raise ValueError(f"not a versioned table: {', '.join(sorted(unknown))}")
+    columns = ["pg_current_snapshot()::text AS snapshot"]
+    for table in tables:
+        # both are backward probes of an index
+        columns.append(f"(SELECT max(change_xid) FROM {table})::text AS {table}_xid")
+        columns.append(f"(SELECT max(updated_at) FROM {table}) AS {table}_updated_at")
+    if tables:
+        names = ", ".join(f"'{t}'" for t in tables)
+        columns.append(
+            f"(SELECT coalesce(sum(deleted), 0) FROM table_deletions "
+            f"WHERE table_name IN ({names})) AS deleted"
+        )
+    return ", ".join(columns)
+
+
+def table_version_query(*tables: str) -> TextClause:
+    """
+    One statement reading the version of whole tables (for list endpoints).
+
+    Raises:
+        ValueError: If a table is not in VERSIONED_TABLES
+    """
+    return text(f"SELECT {_columns(tables)}")
+
+
+def row_version_query(table: str, row_id: UUID, *tables: str) -> TextClause:
+    """
+    One statement reading the version of one row by id (its ``xmin``, which
+    every update changes), combined with that of ``tables`` when the
+    response also joins them. It returns no row when the row does not exist.
+
+    Raises:
+        ValueError: If a table in ``tables`` is not in VERSIONED_TABLES
+    """
+    if table not in ("items", "stocktakes"):
+        raise ValueError(f"not a row-versioned table: {table}")
+    return text(
+        f"SELECT r.xmin::text AS row_xmin, r.updated_at AS row_updated_at, {_columns(tables)} "
+        f"FROM {table} AS r WHERE r.id = :row_id"
+    ).bindparams(row_id=row_id)
+
+
+def read_version(row: Row) -> Version:
+    """
+    Turn a row of table_version_query() / row_version_query() into a Version.
+
+    A table's stamp is the highest transaction id that wrote to it, but a
+    writer that started earlier can still commit rows stamped lower without
+    moving it. So the transactions below the highest stamp that were still
+    running (the snapshot's in-progress list, ``xmin:xmax:xip,...``) are
+    part of the tag: each one that finishes changes it. A later writer
+    gets a higher id and moves the stamp itself.
+    """
+    data = row._mapping
+    parts = [data["row_xmin"]] if "row_xmin" in data else []
+    stamps = [int(data[key]) for key in data if key.endswith("_xid") and data[key] is not None]
+    parts.extend(data[key] or "0" for key in data if key.endswith("_xid"))
+    if "deleted" in data:
+        parts.append(str(data["deleted"]))
+    xmin, _, in_progress = data["snapshot"].split(":")
+    if stamps and int(xmin) <= max(stamps):
+        running = [x for x in in_progress.split(",") if x and int(x) < max(stamps)]
+        parts.append("r" + "-".join(running))
+    modified = [data[key] for key in data if key.endswith("updated_at") and data[key] is not None]
+    return Version(".".join(parts), max(modified) if modified else None)
+
+
+def entity_tag(path: str, version: Version) -> str:
+    """The (unquoted) ETag of ``path`` at ``version``; every query string gets its own."""
+    return hashlib.blake2b(f"{path}\n{version.tag}".encode(), digest_size=12).hexdigest()